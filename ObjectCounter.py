@@ -6,10 +6,15 @@ import multiprocessing
 import cv2
 from joblib import Parallel, delayed
 
-from tracker import add_new_blobs, remove_duplicates, update_blob_tracker
+from tracker import add_new_blobs, get_tracker, remove_duplicates, update_blob_tracker
 from util.blob import Blob
-from util.detection_roi import get_roi_frame, draw_roi
+from util.count_series import CountSeries
+from util.line_index import CountingLineIndex
+from util.detection_roi import get_roi_frame
+from util.overlay import StaticOverlay, COUNTING_ZONE_COLOR
 from util.logger import get_logger
+from util.timing import get_stage_timer
+from util.zone import create_zone_label_map, get_zone_index
 from counter import attempt_count
 
 
@@ -30,6 +35,11 @@ class ObjectCounter:
         di,
         counting_lines,
         show_counts,
+        counting_zones=None,
+        count_series_bin_seconds=(),
+        count_series_num_bins=60,
+        on_count=None,
+        state=None,
     ):
         self.frame = initial_frame  # current frame of video
         self.detector = detector
@@ -40,12 +50,53 @@ class ObjectCounter:
         self.mctf = mctf  # maximum consecutive tracking failures
         self.detection_interval = di
         self.counting_lines = counting_lines
+        self.counting_line_index = CountingLineIndex(counting_lines)
         self.blobs: list[Blob] = []
         self.f_height, self.f_width, _ = self.frame.shape
         self.frame_count = 0  # number of frames since last detection
+        self.num_frames_processed = 0
+        self.num_detections = 1  # detection is run on the initial frame
         self.counts = {counting_line["label"]: {} for counting_line in counting_lines}
         self.show_counts = show_counts
+        self.total_count = 0
+        self.class_counts = {}  # counts by class across all counting lines
+        self.line_counts = {counting_line["label"]: 0 for counting_line in counting_lines}
+        self._counts_snapshot = None  # cached result of get_counts()
+        self.on_count = on_count  # called with the blob, line label and timestamp of each count
+        # per-line, per-class counts in time bins, one series per bin width
+        self.count_series = [
+            CountSeries(
+                bin_seconds,
+                count_series_num_bins,
+                self.line_counts.keys(),
+                self._log_count_series_bin,
+            )
+            for bin_seconds in count_series_bin_seconds
+        ]
+        self.counting_zones = counting_zones or []
+        # zone index lookup by pixel, rasterized once so finding a blob's zone is a single array access
+        self.zone_map = (
+            create_zone_label_map(self.counting_zones, (self.f_width, self.f_height))
+            if self.counting_zones
+            else None
+        )
+        self.zone_counts = {
+            counting_zone["label"]: {
+                "occupancy": 0,
+                "entries": 0,
+                "exits": 0,
+                "dwell_time": 0.0,
+            }
+            for counting_zone in self.counting_zones
+        }
+        self.zone_occupants = {}  # blob id -> (zone label, time entered, blob type)
+        self._overlay = None  # static part of the HUD, rebuilt when its config changes
+        self._overlay_config = None
 
+        if state is not None:
+            # resume from a state fetched with `get_state`, which detects on the initial frame itself
+            self.restore_state(state)
+            return
         # create blobs from initial frame
         droi_frame = get_roi_frame(self.frame, self.droi)
         self.blobs = add_new_blobs(
@@ -74,65 +125,310 @@ class ObjectCounter:
                 lines: [{line: A, count: 3}, {line: B, count: 7}]
                 lines_by_class: [{line: A, class: car, count: 1}, {line: A, class: bus, count: 2}, {line: B, class: car, count: 4}, {line: B, class: bicycle, count: 3}]
             }
+
+        The aggregates are kept up to date as objects are counted, so the formatted counts are only
+        rebuilt when something has been counted since the last call. The returned dict is shared
+        between calls and should not be modified.
         """
 
-        classes = []
-        lines = []
-        lines_by_class = []  # flattened self.counts
-        total_count = 0
-        class_counts = {}
+        if self._counts_snapshot is None:
+            self._counts_snapshot = {
+                "total_count": self.total_count,
+                "classes": [
+                    {"class": class_name, "count": class_count}
+                    for class_name, class_count in self.class_counts.items()
+                ],
+                "lines": [
+                    {"line": line_label, "count": line_count}
+                    for line_label, line_count in self.line_counts.items()
+                ],
+                "lines_by_class": [
+                    {"line": line_label, "class": class_name, "count": class_count}
+                    for line_label, counts_by_class in self.counts.items()
+                    for class_name, class_count in counts_by_class.items()
+                ],
+            }
+        return self._counts_snapshot
 
-        for line_label, counts_by_class in self.counts.items():
-            line_count = 0
+    def _record_count(self, line_label, class_name):
+        """
+        Update the count aggregates after an object has crossed a counting line.
+        """
+        self.total_count += 1
+        self.class_counts[class_name] = self.class_counts.get(class_name, 0) + 1
+        self.line_counts[line_label] += 1
+        self._counts_snapshot = None
+        for series in self.count_series:
+            series.add(line_label, class_name)
+
+    def _log_count_series_bin(self, series_bin):
+        logger.info(
+            "Count series bin completed.",
+            extra={"meta": {"label": "COUNT_SERIES", **series_bin}},
+        )
+
+    def flush_count_series(self):
+        """
+        Flush the incomplete bins of the count series e.g when processing ends.
+        """
+        for series in self.count_series:
+            series.flush()
+
+    def get_zone_counts(self):
+        """
+        Format `self.zone_counts` as a list i.e
+
+        [{zone: P1, occupancy: 2, entries: 5, exits: 3, dwell_time: 42.5, average_dwell_time: 14.17}, ...]
+
+        `dwell_time` is the total time spent in a zone by objects that have since left it.
+        """
+        zones = []
+        for zone_label, zone_count in self.zone_counts.items():
+            exits = zone_count["exits"]
+            zones.append(
+                {
+                    "zone": zone_label,
+                    "occupancy": zone_count["occupancy"],
+                    "entries": zone_count["entries"],
+                    "exits": exits,
+                    "dwell_time": round(zone_count["dwell_time"], 2),
+                    "average_dwell_time": round(zone_count["dwell_time"] / exits, 2)
+                    if exits
+                    else 0.0,
+                }
+            )
+        return zones
+
+    def _enter_zone(self, blob, zone_label, timestamp):
+        zone_count = self.zone_counts[zone_label]
+        zone_count["occupancy"] += 1
+        zone_count["entries"] += 1
+        self.zone_occupants[blob.id] = (zone_label, timestamp, blob.type)
+        logger.info(
+            "Object entered zone.",
+            extra={
+                "meta": {
+                    "label": "ZONE_ENTER",
+                    "id": blob.id,
+                    "type": blob.type,
+                    "counting_zone": zone_label,
+                    "position": blob.centroid,
+                    "entered_at": timestamp,
+                },
+            },
+        )
+
+    def _exit_zone(self, blob_id, timestamp):
+        zone_label, entered_at, blob_type = self.zone_occupants.pop(blob_id)
+        dwell_time = timestamp - entered_at
+        zone_count = self.zone_counts[zone_label]
+        zone_count["occupancy"] -= 1
+        zone_count["exits"] += 1
+        zone_count["dwell_time"] += dwell_time
+        logger.info(
+            "Object exited zone.",
+            extra={
+                "meta": {
+                    "label": "ZONE_EXIT",
+                    "id": blob_id,
+                    "type": blob_type,
+                    "counting_zone": zone_label,
+                    "exited_at": timestamp,
+                    "dwell_time": dwell_time,
+                },
+            },
+        )
+
+    def update_zones(self, timestamp):
+        """
+        Update zone occupancy, entries, exits and dwell times from the current blobs.
+        Blobs that are no longer tracked are treated as having exited their zone.
+        """
+        blob_ids = set()
+        for blob in self.blobs:
+            blob_ids.add(blob.id)
+            zone_index = get_zone_index(self.zone_map, blob.centroid)
+            zone_label = (
+                None
+                if zone_index is None
+                else self.counting_zones[zone_index]["label"]
+            )
+            occupant = self.zone_occupants.get(blob.id)
+            if (occupant[0] if occupant else None) == zone_label:
+                continue
+            if occupant:
+                self._exit_zone(blob.id, timestamp)
+            if zone_label is not None:
+                self._enter_zone(blob, zone_label, timestamp)
+
+        for blob_id in [i for i in self.zone_occupants if i not in blob_ids]:
+            self._exit_zone(blob_id, timestamp)
+
+    def get_state(self):
+        """
+        Fetch what's needed to resume counting with `restore_state` as JSON serializable data.
+        """
+        return {
+            "counts": self.counts,
+            "frame_count": self.frame_count,
+            "num_frames_processed": self.num_frames_processed,
+            "num_detections": self.num_detections,
+            "blobs": [
+                {
+                    "id": blob.id,
+                    "bounding_box": blob.bounding_box,
+                    "type": blob.type,
+                    "type_confidence": blob.type_confidence,
+                    "lines_crossed": blob.lines_crossed,
+                    "position_first_detected": blob.position_first_detected,
+                }
+                for blob in self.blobs
+            ],
+            "zone_counts": self.zone_counts,
+            "zone_occupants": self.zone_occupants,
+            "count_series": [series.get_state() for series in self.count_series],
+        }
 
+    def restore_state(self, state):
+        """
+        Resume counting from a state fetched with `get_state`, with the current frame being the frame
+        the state was fetched at. Blobs get new trackers and are refreshed with a fresh detection.
+        Pass the state to the constructor instead when resuming, to skip its detection on the initial frame.
+        """
+        self.counts = {
+            line_label: dict(state["counts"].get(line_label, {})) for line_label in self.counts
+        }
+        self.total_count = 0
+        self.class_counts = {}
+        self.line_counts = {line_label: 0 for line_label in self.counts}
+        for line_label, counts_by_class in self.counts.items():
             for class_name, class_count in counts_by_class.items():
-                # classes
-                if class_name in class_counts:
-                    class_counts[class_name] += class_count
-                else:
-                    class_counts[class_name] = class_count
-                # lines
-                line_count += class_count
-                # lines by class
-                lines_by_class.append(
-                    {"line": line_label, "class": class_name, "count": class_count}
-                )
+                self.total_count += class_count
+                self.class_counts[class_name] = self.class_counts.get(class_name, 0) + class_count
+                self.line_counts[line_label] += class_count
+        self._counts_snapshot = None
 
-            lines.append({"line": line_label, "count": line_count})
-            total_count += line_count
+        self.frame_count = state["frame_count"]
+        self.num_frames_processed = state["num_frames_processed"]
+        self.num_detections = state["num_detections"]
+        for zone_label, zone_counts in state["zone_counts"].items():
+            if zone_label in self.zone_counts:
+                self.zone_counts[zone_label] = dict(zone_counts)
+        self.zone_occupants = {
+            blob_id: tuple(occupant) for blob_id, occupant in state["zone_occupants"].items()
+        }
+        # series of bin widths the state doesn't have start over
+        series_states = {
+            series_state["bin_seconds"]: series_state
+            for series_state in state.get("count_series", [])
+        }
+        for series in self.count_series:
+            if series.bin_seconds in series_states:
+                series.restore_state(series_states[series.bin_seconds])
 
-        for class_name, class_count in class_counts.items():
-            classes.append({"class": class_name, "count": class_count})
+        blobs = []
+        for blob_state in state["blobs"]:
+            bounding_box = tuple(blob_state["bounding_box"])
+            blob = Blob(
+                bounding_box,
+                blob_state["type"],
+                blob_state["type_confidence"],
+                get_tracker(self.tracker, bounding_box, self.frame),
+            )
+            blob.id = blob_state["id"]
+            blob.lines_crossed = list(blob_state["lines_crossed"])
+            blob.position_first_detected = tuple(blob_state["position_first_detected"])
+            blobs.append(blob)
+        droi_frame = get_roi_frame(self.frame, self.droi)
+        self.blobs = add_new_blobs(
+            self.detector,
+            droi_frame,
+            blobs,
+            self.frame,
+            self.tracker,
+            self.mcdf,
+        )
+        self.blobs = remove_duplicates(self.blobs)
+        self.num_detections += 1
 
+    def get_tracking_stats(self):
+        """
+        Describe what's being tracked e.g to find out if blobs are piling up.
+        """
+        blobs = list(self.blobs)
+        blobs_by_type = {}
+        for blob in blobs:
+            blobs_by_type[blob.type] = blobs_by_type.get(blob.type, 0) + 1
         return {
-            "total_count": total_count,
-            "classes": classes,
-            "lines": lines,
-            "lines_by_class": lines_by_class,
+            "frames_processed": self.num_frames_processed,
+            "detections": self.num_detections,
+            "blobs": len(blobs),
+            "trackers": sum(1 for blob in blobs if blob.tracker is not None),
+            "blobs_by_type": blobs_by_type,
+            "max_consecutive_detection_failures": max(
+                (blob.num_consecutive_detection_failures for blob in blobs), default=0
+            ),
+            "max_consecutive_tracking_failures": max(
+                (blob.num_consecutive_tracking_failures for blob in blobs), default=0
+            ),
+            "zone_occupants": len(self.zone_occupants),
         }
 
     def get_blobs(self):
-        return [{"id": blob.id, "details": vars(blob)} for blob in self.blobs]
+        # copy each blob's attributes since log records may be formatted after the blob has changed,
+        # including the lists it adds to e.g lines_crossed
+        return [
+            {
+                "id": blob.id,
+                "details": {
+                    name: list(value) if isinstance(value, list) else value
+                    for name, value in vars(blob).items()
+                },
+            }
+            for blob in self.blobs
+        ]
 
-    def count(self, frame):
+    def count(self, frame, timestamp):
+        """
+        Track, count and (at every detection interval) detect objects in a frame.
+        `timestamp` is the position of the frame in the video in seconds, which dwell times and
+        count series bins are measured in, so that they don't depend on how fast frames are processed.
+        """
         self.frame = frame
+        for series in self.count_series:
+            series.advance(timestamp)
+
+        stage_timer = get_stage_timer()
+        _timer = stage_timer.start()
 
         # update blob trackers
         self.blobs = Parallel(n_jobs=NUM_CORES, prefer="threads")(
             delayed(update_blob_tracker)(blob, self.frame) for blob in self.blobs
         )
+        _timer = stage_timer.stop("tracking", _timer)
 
         for blob in list(self.blobs):
             # count object if it has crossed a counting line
-            self.counts = attempt_count(blob, self.counting_lines, self.counts)
+            num_lines_crossed = len(blob.lines_crossed)
+            self.counts = attempt_count(
+                blob,
+                self.counting_line_index.query(blob.bounding_box),
+                self.counts,
+            )
+            for line_label in blob.lines_crossed[num_lines_crossed:]:
+                self._record_count(line_label, blob.type)
+                if self.on_count is not None:
+                    self.on_count(blob, line_label, timestamp)
 
             # remove blob if it has reached the limit for tracking failures
             if blob.num_consecutive_tracking_failures >= self.mctf:
                 self.blobs.remove(blob)
+        _timer = stage_timer.stop("line_counting", _timer)
 
         if self.frame_count >= self.detection_interval:
             # rerun detection
             droi_frame = get_roi_frame(self.frame, self.droi)
+            _timer = stage_timer.stop("roi_masking", _timer)
             self.blobs = add_new_blobs(
                 self.detector,
                 droi_frame,
@@ -141,10 +437,25 @@ class ObjectCounter:
                 self.tracker,
                 self.mcdf,
             )
+            _timer = stage_timer.start()
             self.blobs = remove_duplicates(self.blobs)
+            _timer = stage_timer.stop("duplicate_removal", _timer)
             self.frame_count = 0
+            self.num_detections += 1
 
         self.frame_count += 1
+        self.num_frames_processed += 1
+
+        if self.counting_zones:
+            self.update_zones(timestamp)
+            stage_timer.stop("zone_counting", _timer)
+
+    def invalidate_overlay(self):
+        """
+        Rebuild the static overlay on the next call to `visualize` e.g after the detection ROI,
+        counting lines or counting zones have been modified in place.
+        """
+        self._overlay = None
 
     def visualize(self):
         frame = self.frame
@@ -169,20 +480,37 @@ class ObjectCounter:
             )
             cv2.putText(frame, object_label, (x, y - 5), font, 1, color, 2, line_type)
 
-        # draw counting lines
-        hud_color = (0, 0, 255)
-        for counting_line in self.counting_lines:
-            cv2.line(
-                frame, counting_line["line"][0], counting_line["line"][1], hud_color, 3
+        # draw counting lines and zones and show detection roi
+        overlay_config = (
+            frame.shape,
+            self.show_droi,
+            id(self.droi),
+            id(self.counting_lines),
+            id(self.counting_zones),
+        )
+        if self._overlay is None or self._overlay_config != overlay_config:
+            self._overlay = StaticOverlay(
+                frame.shape,
+                self.droi,
+                self.show_droi,
+                self.counting_lines,
+                self.counting_zones,
             )
-            cl_label_origin = (
-                counting_line["line"][0][0],
-                counting_line["line"][0][1] + 35,
+            self._overlay_config = overlay_config
+        frame = self._overlay.apply(frame)
+
+        # label counting zones with their occupancy
+        hud_color = COUNTING_ZONE_COLOR
+        for counting_zone in self.counting_zones:
+            zone_label = counting_zone["label"]
+            cz_label_origin = (
+                counting_zone["zone"][0][0],
+                counting_zone["zone"][0][1] - 10,
             )
             cv2.putText(
                 frame,
-                counting_line["label"],
-                cl_label_origin,
+                f"{zone_label}: {self.zone_counts[zone_label]['occupancy']}",
+                cz_label_origin,
                 font,
                 1,
                 hud_color,
@@ -190,10 +518,6 @@ class ObjectCounter:
                 line_type,
             )
 
-        # show detection roi
-        if self.show_droi:
-            frame = draw_roi(frame, self.droi)
-
         # show counts
         hud_color = (255, 0, 0)
         if self.show_counts:
@@ -0,0 +1,4 @@
+"""
+Throughput benchmarks of the counting pipeline on synthetic videos.
+Run with `python -m benchmarks.run`.
+"""
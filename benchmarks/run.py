@@ -0,0 +1,258 @@
+"""
+Measure the frame rate of ObjectCounter and the time spent in each of its stages on synthetic videos
+and write the results as JSON, e.g:
+
+    python -m benchmarks.run --resolutions 1280x720 1920x1080 --objects 10 50 --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticScene, FakeDetector, write_video
+
+# values of the settings without defaults, for running without a .env file or model files
+OFFLINE_SETTINGS = {
+    "VIDEO": "synthetic",
+    "COUNTING_LINES": "[]",
+    "CLASSES_PATH": "synthetic",
+    "CLASSES_OF_INTEREST_PATH": "synthetic",
+    "CONFIDENCE_THRESHOLD": "0.5",
+    "DETECTOR": "synthetic",
+    "ENABLE_CONSOLE_LOGGER": "False",
+    "ENABLE_FILE_LOGGER": "False",
+}
+
+
+def set_offline_settings():
+    """
+    Give the settings that aren't set offline values. Settings are read when they're first imported,
+    so this has to be called before anything that imports them (e.g ObjectCounter) is.
+    """
+    for key, value in OFFLINE_SETTINGS.items():
+        os.environ.setdefault(key, value)
+
+
+def get_timed_stages():
+    """
+    List the functions timed, by the module (or class) they're looked up in when called.
+    """
+    import ObjectCounter as object_counter_module  # pylint: disable=import-outside-toplevel
+
+    return (
+        (object_counter_module.ObjectCounter, "count"),
+        (object_counter_module, "add_new_blobs"),
+        (object_counter_module, "remove_duplicates"),
+        (object_counter_module, "attempt_count"),
+        (object_counter_module.ObjectCounter, "visualize"),
+    )
+
+
+@contextmanager
+def time_stages(stages=None):
+    """
+    Wrap the given functions (default: `get_timed_stages()`) to accumulate their number of calls and
+    total run time for the duration of the context. Nested stages are included in the time of the
+    stages that call them.
+    """
+    stages = stages or get_timed_stages()
+    timings = {name: {"calls": 0, "seconds": 0.0} for _, name in stages}
+    originals = []
+    for owner, name in stages:
+        original = getattr(owner, name)
+        originals.append((owner, name, original))
+
+        def timed(*args, __original=original, __timing=timings[name], **kwargs):
+            start = time.perf_counter()
+            try:
+                return __original(*args, **kwargs)
+            finally:
+                __timing["seconds"] += time.perf_counter() - start
+                __timing["calls"] += 1
+
+        setattr(owner, name, timed)
+    try:
+        yield timings
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def run_benchmark(
+    frame_size,
+    num_objects,
+    num_frames=300,
+    di=10,
+    tracker="kcf",
+    latency=0.0,
+    seed=0,
+    visualize=True,
+    video_path=None,
+):
+    """
+    Count objects in a synthetic video and report the frame rate and time per stage.
+    Frames are decoded from a video file (written to a temporary file unless `video_path` is given)
+    so that the numbers include what reading a real video costs.
+    """
+    from ObjectCounter import ObjectCounter  # pylint: disable=import-outside-toplevel
+
+    f_width, f_height = frame_size
+    scene = SyntheticScene(frame_size, num_objects, seed)
+    detector = FakeDetector(scene, latency)
+    counting_lines = [
+        {"label": "A", "line": [(0, f_height // 2), (f_width, f_height // 2)]},
+        {"label": "B", "line": [(f_width // 2, 0), (f_width // 2, f_height)]},
+    ]
+    droi = [(0, 0), (f_width, 0), (f_width, f_height), (0, f_height)]
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        path = video_path or os.path.join(temp_directory, "synthetic.avi")
+        write_video(scene, path, num_frames)
+
+        cap = cv2.VideoCapture(path)
+        decode_seconds = 0.0
+        start = time.perf_counter()
+        retval, frame = cap.read()
+        decode_seconds += time.perf_counter() - start
+
+        with time_stages() as timings:
+            object_counter = ObjectCounter(
+                frame, detector, tracker, droi, False, 2, 3, di, counting_lines, True
+            )
+            frames_processed = 0
+            start = time.perf_counter()
+            while retval:
+                detector.frame_index = frames_processed
+                object_counter.count(frame, frames_processed / 30)
+                if visualize:
+                    object_counter.visualize()
+                frames_processed += 1
+
+                decode_start = time.perf_counter()
+                retval, frame = cap.read()
+                decode_seconds += time.perf_counter() - decode_start
+            seconds = time.perf_counter() - start
+        cap.release()
+
+    return {
+        "config": {
+            "frame_size": list(frame_size),
+            "num_objects": num_objects,
+            "num_frames": num_frames,
+            "di": di,
+            "tracker": tracker,
+            "detector_latency": latency,
+            "seed": seed,
+            "visualize": visualize,
+        },
+        "frames_processed": frames_processed,
+        "seconds": round(seconds, 4),
+        "fps": round(frames_processed / seconds, 2) if seconds else None,
+        "decode_seconds": round(decode_seconds, 4),
+        "detector_invocations": detector.num_invocations,
+        "total_count": object_counter.total_count,
+        "stages": {
+            name: {
+                "calls": timing["calls"],
+                "seconds": round(timing["seconds"], 4),
+                "ms_per_frame": round(timing["seconds"] / max(frames_processed, 1) * 1000, 3),
+                "ms_per_call": round(timing["seconds"] / max(timing["calls"], 1) * 1000, 3),
+            }
+            for name, timing in timings.items()
+        },
+    }
+
+
+def get_environment():
+    """
+    Describe what the benchmarks ran on, so results are only compared with like.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _parse_resolution(value):
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f"Invalid resolution {value}. It should be <width>x<height> e.g 1280x720."
+        ) from error
+
+
+def main(args=None):
+    set_offline_settings()
+    parser = argparse.ArgumentParser(
+        description="Benchmark object counting on synthetic videos, without model files."
+    )
+    parser.add_argument(
+        "--resolutions", nargs="+", type=_parse_resolution, default=[(1280, 720)],
+        help="frame sizes as <width>x<height>",
+    )
+    parser.add_argument(
+        "--objects", nargs="+", type=int, default=[10, 50],
+        help="numbers of objects in the scene",
+    )
+    parser.add_argument("--frames", type=int, default=300, help="frames per video")
+    parser.add_argument("--di", type=int, default=10, help="detection interval")
+    parser.add_argument("--tracker", default="kcf", choices=("kcf", "csrt"))
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds the fake detector takes per detection"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-visualize", action="store_true", help="don't render the output frames"
+    )
+    parser.add_argument("--output", help="file to write the results to (default: stdout)")
+    args = parser.parse_args(args)
+
+    results = {"environment": get_environment(), "benchmarks": []}
+    for frame_size in args.resolutions:
+        for num_objects in args.objects:
+            result = run_benchmark(
+                frame_size,
+                num_objects,
+                args.frames,
+                args.di,
+                args.tracker,
+                args.latency,
+                args.seed,
+                not args.no_visualize,
+            )
+            results["benchmarks"].append(result)
+            print(
+                f"{frame_size[0]}x{frame_size[1]}, {num_objects} objects: {result['fps']} fps",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic scenes and a detector that "detects" their objects, so the counting pipeline
+can be benchmarked offline without videos or model files.
+"""
+
+import time
+import cv2
+import numpy as np
+
+from detectors import BoundingBox
+
+
+SYNTHETIC_TYPES = ("car", "truck")
+MIN_BOX_SIZE = 8  # boxes cut smaller than this by the frame's edges are not detected
+
+
+class SyntheticScene:
+    """
+    `num_objects` textured rectangles moving in straight lines at constant speeds, wrapping around
+    the frame's edges. Positions are a function of the frame index and `seed` only, so every run
+    of a scene renders and detects the same thing.
+    """
+
+    def __init__(self, frame_size, num_objects, seed=0, max_speed=8):
+        self.frame_size = frame_size
+        self.num_objects = num_objects
+        f_width, f_height = frame_size
+        rng = np.random.default_rng(seed)
+        self.sizes = np.stack(
+            (
+                rng.integers(f_width // 24, f_width // 8, num_objects),
+                rng.integers(f_height // 24, f_height // 8, num_objects),
+            ),
+            axis=1,
+        )
+        self.origins = rng.uniform(0, 1, (num_objects, 2)) * (frame_size + self.sizes)
+        angles = rng.uniform(0, 2 * np.pi, num_objects)
+        speeds = rng.uniform(1, max_speed, num_objects)
+        self.velocities = np.stack(
+            (np.cos(angles) * speeds, np.sin(angles) * speeds), axis=1
+        )
+        self.types = [SYNTHETIC_TYPES[i % len(SYNTHETIC_TYPES)] for i in range(num_objects)]
+        self.colors = [tuple(int(c) for c in color) for color in rng.integers(40, 255, (num_objects, 3))]
+        self.background = self._create_background(rng)
+
+    def _create_background(self, rng):
+        # low frequency noise so that trackers have some texture to lock on to besides the objects
+        f_width, f_height = self.frame_size
+        noise = rng.integers(0, 80, (f_height // 16 + 1, f_width // 16 + 1, 3), dtype=np.uint8)
+        return cv2.resize(noise, (f_width, f_height), interpolation=cv2.INTER_LINEAR)
+
+    def _get_corners(self, frame_index):
+        extents = np.array(self.frame_size) + self.sizes
+        return (self.origins + self.velocities * frame_index) % extents - self.sizes
+
+    def get_boxes(self, frame_index):
+        """
+        Fetch the (x, y, w, h) box and type of every object visible in a frame.
+        """
+        f_width, f_height = self.frame_size
+        corners = self._get_corners(frame_index)
+        boxes = []
+        for (x, y), (w, h), _type in zip(corners.astype(int), self.sizes, self.types):
+            x1, y1 = max(x, 0), max(y, 0)
+            x2, y2 = min(x + w, f_width), min(y + h, f_height)
+            if x2 - x1 >= MIN_BOX_SIZE and y2 - y1 >= MIN_BOX_SIZE:
+                boxes.append(((int(x1), int(y1), int(x2 - x1), int(y2 - y1)), _type))
+        return boxes
+
+    def render(self, frame_index):
+        frame = self.background.copy()
+        corners = self._get_corners(frame_index)
+        for (x, y), (w, h), color in zip(corners.astype(int), self.sizes, self.colors):
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), color, -1)
+            # a darker cross keeps objects distinguishable from each other for the trackers
+            cv2.line(frame, (int(x), int(y)), (int(x + w), int(y + h)), (0, 0, 0), 2)
+            cv2.line(frame, (int(x + w), int(y)), (int(x), int(y + h)), (0, 0, 0), 2)
+        return frame
+
+
+def write_video(scene, path, num_frames, fps=30):
+    """
+    Render a scene to an MJPG encoded video.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, scene.frame_size)
+    for frame_index in range(num_frames):
+        writer.write(scene.render(frame_index))
+    writer.release()
+
+
+class FakeDetector:
+    """
+    Detector that returns the boxes of a synthetic scene's objects in the frame at `frame_index`,
+    which must be set by whatever feeds it frames, after sleeping for `latency` seconds
+    to stand in for inference time.
+    """
+
+    def __init__(self, scene, latency=0.0):
+        self.scene = scene
+        self.latency = latency
+        self.frame_index = 0
+        self.num_invocations = 0
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        self.num_invocations += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [
+            BoundingBox(box, _type, 1.0)
+            for box, _type in self.scene.get_boxes(self.frame_index)
+        ]
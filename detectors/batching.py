@@ -0,0 +1,119 @@
+"""
+Share one detector between several video streams by gathering their detection requests
+and running them through the detector in batches.
+"""
+
+import queue
+import threading
+import time
+
+from . import BoundingBox
+
+
+class _Request:
+    def __init__(self, image):
+        self.image = image
+        self.bounding_boxes = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchingDetector:
+    """
+    Detector that can be called from several threads at once. Requests made within `max_wait`
+    seconds of the first one waiting (up to `max_batch_size` of them) are run as one batch
+    with the wrapped detector's `get_bounding_boxes_batch` if it has one, so a single copy
+    of the model serves all streams.
+    """
+
+    def __init__(self, detector, max_batch_size=8, max_wait=0.01):
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.num_batches = 0
+        self.num_images = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()  # so no request is queued after the detector is closed
+        self._thread = threading.Thread(target=self._run, name="batching_detector", daemon=True)
+        self._thread.start()
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        """
+        Queue an image for detection and wait for its batch to be run.
+        """
+        request = _Request(image)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Detector has been closed.")
+            self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.bounding_boxes
+
+    def get_mean_batch_size(self):
+        return self.num_images / self.num_batches if self.num_batches else 0
+
+    def _get_batch(self):
+        """
+        Wait for a request, then gather the ones that follow it until the batch is full
+        or `max_wait` has passed. Return None once the detector is closed.
+        """
+        request = self._queue.get()
+        if request is None:
+            return None
+        batch = [request]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # run what has been gathered, then stop
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _detect(self, batch):
+        images = [request.image for request in batch]
+        try:
+            if hasattr(self.detector, "get_bounding_boxes_batch"):
+                results = self.detector.get_bounding_boxes_batch(images)
+            else:
+                results = [self.detector.get_bounding_boxes(image) for image in images]
+        except Exception as error:  # pylint: disable=broad-except
+            for request in batch:
+                request.image = None
+                request.error = error
+                request.done.set()
+            return
+        self.num_batches += 1
+        self.num_images += len(images)
+        for request, bounding_boxes in zip(batch, results):
+            request.image = None  # the image may be a view of memory its caller will release
+            request.bounding_boxes = bounding_boxes
+            request.done.set()
+
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            if batch is None:
+                break
+            self._detect(batch)
+
+    def close(self):
+        """
+        Run the requests already queued, stop the batching thread and close the wrapped detector.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        if hasattr(self.detector, "close"):
+            self.detector.close()
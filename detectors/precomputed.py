@@ -0,0 +1,29 @@
+"""
+Return detections made elsewhere e.g by a detection process running ahead of the counting process.
+"""
+
+from . import BoundingBox
+
+
+class PrecomputedDetector:
+    """
+    Detector that takes the bounding boxes of each detection from a queue of
+    (frame index, bounding boxes) items, in the order detections are requested.
+    The frame index of the frame being counted is set on `frame_index` so that
+    detections that are out of step with the frames are caught.
+    """
+
+    def __init__(self, detections):
+        self.detections = detections
+        self.frame_index = None
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        item = self.detections.get()
+        if item is None:
+            raise RuntimeError("Detections ended before the frames did.")
+        frame_index, bounding_boxes = item
+        if self.frame_index is not None and frame_index != self.frame_index:
+            raise RuntimeError(
+                f"Detections of frame {frame_index} were given for frame {self.frame_index}."
+            )
+        return bounding_boxes
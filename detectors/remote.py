@@ -0,0 +1,199 @@
+"""
+Perform object detection in an inference server process (see inference_server.py) shared by
+several Ivy processes on the same host, so that only the server loads the model.
+
+Frames are passed through shared memory: each client owns a shared memory slot that it copies
+frames into and only sends the server the slot's name and the frame's shape over the connection.
+The server reads the frame in place and replies with the bounding boxes.
+"""
+
+import pickle
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from . import BoundingBox
+
+# seconds between checks of whether the server has been closed while waiting for a client's request
+CLIENT_POLL_INTERVAL = 0.5
+
+
+def parse_address(address):
+    """
+    Parse a `host:port` address, or the path of a Unix socket.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to a client's shared memory slot without taking over its cleanup,
+    which is left to the client that created it.
+    """
+    try:
+        return SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        shared_memory = SharedMemory(name)
+        resource_tracker.unregister(shared_memory._name, "shared_memory")  # pylint: disable=protected-access
+        return shared_memory
+
+
+class RemoteDetector:
+    def __init__(self, address, authkey):
+        self.connection = Client(parse_address(address), authkey=authkey.encode())
+        self.shared_memory = None
+
+    def _get_slot(self, size):
+        """
+        Fetch the shared memory slot frames are passed through, making a larger one if needed.
+        """
+        if self.shared_memory is None or self.shared_memory.size < size:
+            if self.shared_memory is not None:
+                self.shared_memory.close()
+                self.shared_memory.unlink()
+            self.shared_memory = SharedMemory(create=True, size=size)
+        return self.shared_memory
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        """
+        Return a list of bounding boxes of objects detected,
+        their classes and the confidences of the detections made.
+        """
+        slot = self._get_slot(image.nbytes)
+        np.ndarray(image.shape, image.dtype, slot.buf)[:] = image
+        self.connection.send(("detect", slot.name, image.shape, image.dtype.str))
+        status, result = self.connection.recv()
+        if status == "error":
+            raise result
+        return result
+
+    def close(self):
+        self.connection.close()
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            self.shared_memory = None
+
+
+def _get_sendable_error(error):
+    """
+    Fetch what to send a client for an error: the error itself if it can be unpickled on the other
+    end, otherwise a RuntimeError describing it.
+    """
+    error = error.with_traceback(None)
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:  # pylint: disable=broad-except
+        return RuntimeError(repr(error))
+    return error
+
+
+class InferenceServer:
+    """
+    Serve detections made with `detector` to RemoteDetector clients, each on a thread of its own.
+    The detector is called from several threads at once, so it should be a BatchingDetector
+    if detections from different clients are to be run together.
+    """
+
+    def __init__(self, detector, address, authkey, on_event=None):
+        self.detector = detector
+        self.authkey = authkey.encode()
+        self.listener = Listener(parse_address(address), authkey=self.authkey)
+        self.address = self.listener.address
+        self.on_event = on_event  # called with the label and details of client connections
+        self.num_clients = 0
+        self.num_detections = 0
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _emit(self, label, **details):
+        if self.on_event:
+            self.on_event(label, details)
+
+    def _serve_client(self, connection, client_id):
+        slots = {}  # name -> shared memory slot of the client
+        try:
+            while not self._closed:
+                try:
+                    if not connection.poll(CLIENT_POLL_INTERVAL):
+                        continue
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+                _, name, shape, dtype = message
+                if name not in slots:
+                    # the client made a larger slot, so its old one is gone
+                    for slot in slots.values():
+                        slot.close()
+                    slots = {name: _attach_shared_memory(name)}
+                image = np.ndarray(shape, np.dtype(dtype), slots[name].buf)
+                try:
+                    result = ("ok", self.detector.get_bounding_boxes(image))
+                except Exception as error:  # pylint: disable=broad-except
+                    result = ("error", _get_sendable_error(error))
+                del image
+                with self._lock:
+                    self.num_detections += 1
+                try:
+                    connection.send(result)
+                except Exception:  # pylint: disable=broad-except
+                    # e.g a result that can't be pickled, closing the connection fails the client's request
+                    break
+        finally:
+            for slot in slots.values():
+                slot.close()
+            connection.close()
+            with self._lock:
+                self._threads.discard(threading.current_thread())
+            self._emit("CLIENT_DISCONNECT", client_id=client_id)
+
+    def serve_forever(self):
+        """
+        Accept clients until the server is closed.
+        """
+        while not self._closed:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    break
+                continue  # e.g a client with the wrong authkey
+            if self._closed:
+                connection.close()
+                break
+            with self._lock:
+                self.num_clients += 1
+                client_id = self.num_clients
+                thread = threading.Thread(
+                    target=self._serve_client,
+                    args=(connection, client_id),
+                    name=f"inference_client_{client_id}",
+                    daemon=True,
+                )
+                self._threads.add(thread)
+            self._emit("CLIENT_CONNECT", client_id=client_id)
+            thread.start()
+
+    def close(self):
+        """
+        Stop accepting clients and wait for the requests being served to be answered,
+        so the detector can be closed after this.
+        """
+        self._closed = True
+        try:
+            # wake up serve_forever, which is waiting for a client
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.listener.close()
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
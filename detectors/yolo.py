@@ -23,16 +23,15 @@ class DarknetYOLODetector:
         self.classes = tuple(classes)
         self.classes_of_interest = tuple(classes_of_interest)
 
-    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+    def _forward(self, images):
         """
-        Return a list of bounding boxes of objects detected,
-        their classes and the confidences of the detections made.
+        Run images through the network as one batch and return the outputs of its
+        output layers, each with a leading axis of images.
         """
-
         # create image blob
         scale = 0.00392
-        image_blob = cv2.dnn.blobFromImage(
-            image, scale, (416, 416), (0, 0, 0), True, crop=False
+        image_blob = cv2.dnn.blobFromImages(
+            images, scale, (416, 416), (0, 0, 0), True, crop=False
         )
 
         # detect objects
@@ -40,7 +39,11 @@ class DarknetYOLODetector:
         layer_names = self.net.getLayerNames()
         output_layers = [layer_names[i - 1] for i in self.net.getUnconnectedOutLayers()]
         outputs = self.net.forward(output_layers)
+        return [
+            np.reshape(output, (len(images), -1, output.shape[-1])) for output in outputs
+        ]
 
+    def _get_image_bounding_boxes(self, outputs, image) -> list[BoundingBox]:
         classes = []
         confidences = []
         boxes = []
@@ -77,3 +80,21 @@ class DarknetYOLODetector:
             bounding_boxes.append(BoundingBox(boxes[i], classes[i], confidences[i]))
 
         return bounding_boxes
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        """
+        Return a list of bounding boxes of objects detected,
+        their classes and the confidences of the detections made.
+        """
+        return self.get_bounding_boxes_batch([image])[0]
+
+    def get_bounding_boxes_batch(self, images) -> list[list[BoundingBox]]:
+        """
+        Detect objects in several images with one forward pass of the network
+        and return a list of bounding boxes for each image.
+        """
+        outputs = self._forward(images)
+        return [
+            self._get_image_bounding_boxes([output[index] for output in outputs], image)
+            for index, image in enumerate(images)
+        ]
@@ -13,13 +13,7 @@ class UltralyticsYOLODetector:
         self.confidence_threshold = confidence_threshold
         self.classes_of_interest = tuple(classes_of_interest1)
 
-    def get_bounding_boxes(self, image) -> list[BoundingBox]:
-        """
-        Return a list of bounding boxes of objects detected,
-        their classes and the confidences of the detections made.
-        """
-
-        result = self.model.predict(image, verbose=False)[0]
+    def _get_result_bounding_boxes(self, result) -> list[BoundingBox]:
         bounding_boxes = []
         for box in result.boxes:
             class_name = result.names[box.cls[0].item()]
@@ -36,3 +30,21 @@ class UltralyticsYOLODetector:
                 bounding_boxes.append(BoundingBox((x, y, w, h), class_name, confidence))
 
         return bounding_boxes
+
+    def get_bounding_boxes(self, image) -> list[BoundingBox]:
+        """
+        Return a list of bounding boxes of objects detected,
+        their classes and the confidences of the detections made.
+        """
+
+        result = self.model.predict(image, verbose=False)[0]
+        return self._get_result_bounding_boxes(result)
+
+    def get_bounding_boxes_batch(self, images) -> list[list[BoundingBox]]:
+        """
+        Detect objects in several images with one call to the model
+        and return a list of bounding boxes for each image.
+        """
+
+        results = self.model.predict(list(images), verbose=False)
+        return [self._get_result_bounding_boxes(result) for result in results]
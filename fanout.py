@@ -0,0 +1,303 @@
+"""
+Count objects in VIDEO with several counting configs at once, decoding it only once, e.g:
+
+    python -m fanout configs.json --output counts.json
+
+where configs.json is a list of configs like:
+
+    [
+        {
+            "label": "cars",
+            "droi": [[750, 405], [1094, 398], [1569, 1028], [501, 1028]],
+            "counting_lines": [{"label": "A", "line": [[667, 713], [888, 713]]}],
+            "classes_of_interest": ["car", "truck"],
+            "di": 10
+        }
+    ]
+
+"droi" (default: the whole frame), "counting_zones" (default: none), "classes_of_interest"
+(default: those of CLASSES_OF_INTEREST_PATH) and "di" (default: DI) are optional.
+The detector only detects the classes in CLASSES_OF_INTEREST_PATH,
+so a config's classes of interest can only narrow them down.
+
+This process decodes the video into a ring buffer of frames in shared memory
+(PIPELINE_RING_SIZE frames) that each config's counting process reads at its own pace.
+Each counting process runs its own detector (use DETECTOR="remote" to share one model).
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+if multiprocessing.parent_process() is not None and "JOB_ID" in os.environ:
+    # counting processes write logs of their own, named after the job they're part of
+    os.environ["JOB_ID"] = f"{os.environ['JOB_ID']}_{os.getpid()}"
+
+import cv2
+
+import settings
+from main import get_detector, close_detector  # also sets up logging
+from util.frame_ring import FrameRing
+from util.image import close_crop_writer
+from util.logger import get_logger
+from util.workers import POLL_INTERVAL, get_results, raise_if_exited
+from ObjectCounter import ObjectCounter
+
+logger = get_logger()
+
+
+class ConfigFilter(logging.Filter):
+    """
+    Add the label of the config a record was logged for to its meta field.
+    """
+
+    def __init__(self, label):
+        super().__init__()
+        self.label = label
+
+    def filter(self, record):
+        record.meta = {**getattr(record, "meta", {}), "config": self.label}
+        return True
+
+
+class ClassesOfInterestDetector:
+    """
+    Detector that only keeps the detections of a config's classes of interest.
+    """
+
+    def __init__(self, detector, classes_of_interest):
+        self.detector = detector
+        self.classes_of_interest = tuple(classes_of_interest)
+
+    def get_bounding_boxes(self, image):
+        return [
+            bounding_box
+            for bounding_box in self.detector.get_bounding_boxes(image)
+            if bounding_box.type in self.classes_of_interest
+        ]
+
+
+def load_configs(path):
+    with open(path, "r") as configs_file:
+        configs = json.load(configs_file)
+    labels = set()
+    classes_of_interest = None
+    for config in configs:
+        if config["label"] in labels:
+            # results are reported by label
+            raise ValueError(f"More than one config is labelled {config['label']}")
+        labels.add(config["label"])
+        if "classes_of_interest" in config:
+            if classes_of_interest is None:
+                with open(settings.CLASSES_OF_INTEREST_PATH, "r") as coi_file:
+                    classes_of_interest = {line.strip() for line in coi_file.readlines()}
+            unknown_classes = set(config["classes_of_interest"]) - classes_of_interest
+            if unknown_classes:
+                # they would never be detected, and silently counted as zero
+                raise ValueError(
+                    f"Classes of interest {', '.join(sorted(unknown_classes))} of config "
+                    f"{config['label']} are not in CLASSES_OF_INTEREST_PATH"
+                )
+        config["counting_lines"] = [
+            {
+                "label": counting_line["label"],
+                "line": [tuple(point) for point in counting_line["line"]],
+            }
+            for counting_line in config["counting_lines"]
+        ]
+        for counting_zone in config.get("counting_zones", []):
+            counting_zone["zone"] = [tuple(point) for point in counting_zone["zone"]]
+        if config.get("droi"):
+            config["droi"] = [tuple(point) for point in config["droi"]]
+    return configs
+
+
+def count(ring, reader_index, config, results):
+    """
+    Count objects in the frames read from the ring with a config and put its counts on `results`.
+    """
+    logger.addFilter(ConfigFilter(config["label"]))
+    reader = ring.get_reader(reader_index)
+    frames_processed = 0
+    object_counter = None
+    error = None
+    detector = None
+    is_completed = False
+    started_at = time.monotonic()
+    try:
+        detector = get_detector()
+        if "classes_of_interest" in config:
+            detector = ClassesOfInterestDetector(detector, config["classes_of_interest"])
+        item = reader.get()
+        while item is not None:
+            _, timestamp, frame = item
+            # the counter keeps the frame after its slot is released
+            frame = frame.copy()
+            reader.release()
+            if object_counter is None:
+                f_height, f_width, _ = frame.shape
+                object_counter = ObjectCounter(
+                    frame,
+                    detector,
+                    settings.TRACKER,
+                    config.get("droi")
+                    or [(0, 0), (f_width, 0), (f_width, f_height), (0, f_height)],
+                    False,
+                    settings.MCDF,
+                    settings.MCTF,
+                    config.get("di", settings.DI),
+                    config["counting_lines"],
+                    False,
+                    config.get("counting_zones"),
+                    settings.COUNT_SERIES_BIN_SECONDS,
+                    settings.COUNT_SERIES_NUM_BINS,
+                )
+            object_counter.count(frame, timestamp)
+            frames_processed += 1
+            item = reader.get()
+        is_completed = True
+    except BaseException as exception:
+        # e.g SystemExit from an invalid detector or tracker
+        error = exception
+        raise
+    finally:
+        if not is_completed:
+            # skip the rest of the frames so the other counting processes aren't held up
+            reader.close()
+        ring.close()
+        close_crop_writer()
+        if detector is not None:
+            close_detector(detector)
+        result = {"label": config["label"], "frames_processed": frames_processed}
+        if error is not None:
+            result["error"] = repr(error)
+        if object_counter is not None:
+            object_counter.flush_count_series()
+            elapsed = time.monotonic() - started_at
+            result["fps"] = frames_processed / elapsed if elapsed > 0 else None
+            result["counts"] = object_counter.get_counts()
+            result["zones"] = object_counter.get_zone_counts()
+            logger.info(
+                "Processing ended.",
+                extra={
+                    "meta": {
+                        "label": "END_PROCESS",
+                        "counts": result["counts"],
+                        "zones": result["zones"],
+                        "frames_processed": frames_processed,
+                    },
+                },
+            )
+        results.put(result)
+
+
+def run(configs):
+    """
+    Decode VIDEO once into a frame ring read by a counting process per config.
+    """
+    cap = cv2.VideoCapture(settings.VIDEO)
+    retval, frame = cap.read()
+    if not retval:
+        logger.error(
+            "Invalid video source %s",
+            settings.VIDEO,
+            extra={"meta": {"label": "INVALID_VIDEO_SOURCE"}},
+        )
+        sys.exit()
+
+    # counting processes are spawned rather than forked so that each sets up its own logging
+    context = multiprocessing.get_context("spawn")
+    ring = FrameRing(
+        frame.shape, frame.dtype, settings.PIPELINE_RING_SIZE, len(configs), context
+    )
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=count,
+            args=(ring, reader_index, config, results),
+            name=f"count_{config['label']}",
+        )
+        for reader_index, config in enumerate(configs)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(
+        "Fan-out processing started.",
+        extra={
+            "meta": {
+                "label": "START_FANOUT",
+                "video": settings.VIDEO,
+                "configs": [config["label"] for config in configs],
+                "ring_size": settings.PIPELINE_RING_SIZE,
+            },
+        },
+    )
+
+    frames_decoded = 0
+    is_completed = False
+    try:
+        while retval:
+            # a counting process that died would never free its slots
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            while not ring.put(frame, frames_decoded, timestamp, POLL_INTERVAL):
+                raise_if_exited(processes)
+            frames_decoded += 1
+            retval, frame = cap.read()
+        while not ring.put_end(POLL_INTERVAL):
+            raise_if_exited(processes)
+        results_by_label = {
+            result["label"]: result for result in get_results(results, processes)
+        }
+        is_completed = True
+    finally:
+        cap.release()
+        for process in processes:
+            if not is_completed:
+                # e.g the counting processes are waiting on frames that won't be decoded
+                process.terminate()
+            process.join()
+        ring.close()
+
+    logger.info(
+        "Fan-out processing ended.",
+        extra={
+            "meta": {
+                "label": "END_FANOUT",
+                "frames_decoded": frames_decoded,
+                "frames_processed": {
+                    label: result["frames_processed"]
+                    for label, result in results_by_label.items()
+                },
+            },
+        },
+    )
+    return {
+        "video": settings.VIDEO,
+        "frames_decoded": frames_decoded,
+        "configs": [results_by_label[config["label"]] for config in configs],
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Count objects in VIDEO with several configs, decoding it once."
+    )
+    parser.add_argument("configs", help="JSON file with a list of counting configs")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(args)
+
+    result = run(load_configs(args.configs))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
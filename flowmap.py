@@ -1,5 +1,5 @@
 """
-VCS entry point.
+Flow map of how objects move in a video.
 """
 
 from dotenv import load_dotenv
@@ -7,26 +7,30 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import cv2
+import os
 import time
 import settings
 import sys
 
-from datetime import datetime
-from detectors.yolo import DarknetYOLODetector
-from detectors.yolov8 import UltralyticsYOLODetector
-from util.blob import Blob
+from main import get_detector, close_detector  # also sets up logging
 from util.debugger import mouse_callback
-from util.logger import init_logger, get_logger
+from util.flowmap import FlowField
+from util.logger import get_logger
 from util.image import take_screenshot
+from util.profiling import install_signal_profiler
+from ObjectCounter import ObjectCounter
 
 
-init_logger()
 logger = get_logger()
 
+# number of steps buffered before they're added to the flow field in one go
+FLOWMAP_BATCH_SIZE = 4096
+
 
 def run():
     """
-    Initialize object counter class and run counting loop.
+    Track objects through the video, add every step they take between frames to a flow field
+    and save it, added to the flow field of previous clips of the same camera if there is one.
     """
 
     cap = cv2.VideoCapture(settings.VIDEO)
@@ -41,56 +45,95 @@ def run():
         sys.exit()
     retval, frame = cap.read()
     f_height, f_width, _ = frame.shape
-
-    with open(settings.CLASSES_PATH, "r") as classes_file:
-        classes = [line.strip() for line in classes_file.readlines()]
-    with open(settings.CLASSES_OF_INTEREST_PATH, "r") as coi_file:
-        classes_of_interest = [line.strip() for line in coi_file.readlines()]
-
-    if settings.DETECTOR == "yolo":
-        detector = DarknetYOLODetector(
-            settings.YOLO_WEIGHTS_PATH,
-            settings.YOLO_CONFIG_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes,
-            classes_of_interest,
-        )
-    elif settings.DETECTOR == "yolov8":
-        detector = UltralyticsYOLODetector(
-            settings.YOLOV8_MODEL_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes_of_interest,
-        )
-    else:
-        logger.error(
-            "Invalid detector model, algorithm or API specified (options: yolo, yolov8)",
-            extra={"meta": {"label": "INVALID_DETECTION_ALGORITHM"}},
-        )
-        sys.exit()
+    use_droi = settings.USE_DROI
+    droi = (
+        settings.DROI
+        if use_droi
+        else [(0, 0), (f_width, 0), (f_width, f_height), (0, f_height)]
+    )
+    cell_size = settings.FLOWMAP_CELL_SIZE
+
+    flow_field = FlowField((f_width, f_height), cell_size)
+    # add the flow field of previous clips of the same camera
+    output_path = settings.FLOWMAP_OUTPUT_PATH
+    merged = False
+    if os.path.exists(output_path + ".npz"):
+        try:
+            flow_field.merge(FlowField.load(output_path + ".npz"))
+            merged = True
+        except ValueError:
+            # refuse to run rather than replace what previous clips have accumulated
+            logger.error(
+                "Existing flow map %s does not match this video's frame and cell size. "
+                "Set FLOWMAP_OUTPUT_PATH to start a new one.",
+                output_path + ".npz",
+                extra={"meta": {"label": "FLOWMAP_MISMATCH"}},
+            )
+            cap.release()
+            sys.exit()
+
+    detector = get_detector()
+    # track without counting lines, only blob positions are needed
+    object_counter = ObjectCounter(
+        frame,
+        detector,
+        settings.TRACKER,
+        droi,
+        settings.SHOW_DROI,
+        settings.MCDF,
+        settings.MCTF,
+        settings.DI,
+        [],
+        False,
+    )
 
     if not settings.HEADLESS:
         cv2.namedWindow("Debug")
         cv2.setMouseCallback(
             "Debug", mouse_callback, {"frame_width": f_width, "frame_height": f_height}
         )
-        resized_frame = cv2.resize(frame, settings.DEBUG_WINDOW_SIZE)
-        cv2.imshow("Debug", resized_frame)
-
-    font = cv2.FONT_HERSHEY_DUPLEX
-    line_type = cv2.LINE_AA
-    hud_color = (0, 255, 0)
-    colors = {
-        "car": (255, 0, 0),
-        "truck": (0, 0, 255),
-    }
-
-    start = datetime.now()
+
+    logger.info(
+        "Flow map started.",
+        extra={
+            "meta": {
+                "label": "START_FLOWMAP",
+                "flowmap_config": {
+                    "di": settings.DI,
+                    "mcdf": settings.MCDF,
+                    "mctf": settings.MCTF,
+                    "detector": settings.DETECTOR,
+                    "tracker": settings.TRACKER,
+                    "use_droi": use_droi,
+                    "droi": droi,
+                    "cell_size": cell_size,
+                },
+            },
+        },
+    )
+
+    background = frame.copy()
+    # last position and time of each tracked blob, so trajectories are never stored
+    last_positions = {}
+    starts, ends, durations = [], [], []
+
+    def add_steps():
+        if not starts:
+            return
+        flow_field.add_steps(starts, ends, durations)
+        starts.clear()
+        ends.clear()
+        durations.clear()
+
+    # profile on SIGUSR1, report memory use on SIGUSR2
+    profiler = install_signal_profiler(object_counter.get_tracking_stats)
+
     is_paused = False
-    frame_count = 0
-    blobs: list[Blob] = []
+    frames_processed = 0
     try:
         while retval:
-            # Check key press
+            profiler.tick()
+
             if not settings.HEADLESS:
                 k = cv2.waitKey(1) & 0xFF
                 if k == ord("p"):
@@ -98,85 +141,63 @@ def run():
                 if k == ord("s") and frame is not None:
                     take_screenshot(frame)
                 if k == ord("q"):
+                    logger.info("Loop stopped.", extra={"meta": {"label": "STOP_LOOP"}})
                     break
 
                 if is_paused:
                     time.sleep(0.5)
                     continue
 
-            if frame_count == 0:
-                # Create blobs
-                for box in detector.get_bounding_boxes(frame):
-                    _tracker = cv2.TrackerKCF_create()
-                    _tracker.init(frame, box.box)
-                    blobs.append(Blob(box.box, box.type, box.confidence, _tracker))
-            else:
-                # Track blobs
-                for blob in blobs:
-                    success, box = blob.tracker.update(frame)
-                    if success:
-                        blob.update(box)
-
-            frame_count += 1
-            if frame_count >= 50:
-                total_time = datetime.now() - start
-                seconds = total_time.seconds + (total_time.microseconds / 1_000_000)
-                print(f"Seconds: {seconds}")
-                print(f"FPS {frame_count / seconds}")
-                break
-
-            # Render blobs
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            object_counter.count(frame, timestamp)
+
+            positions = {}
+            for blob in object_counter.blobs:
+                positions[blob.id] = (blob.centroid, timestamp)
+                if blob.id in last_positions:
+                    last_centroid, last_timestamp = last_positions[blob.id]
+                    if timestamp > last_timestamp:
+                        starts.append(last_centroid)
+                        ends.append(blob.centroid)
+                        durations.append(timestamp - last_timestamp)
+            last_positions = positions
+            if len(starts) >= FLOWMAP_BATCH_SIZE:
+                add_steps()
+
             if not settings.HEADLESS:
-                for blob in blobs:
-                    (x, y, w, h) = [int(v) for v in blob.bounding_box]
-                    color = colors.get(blob.type, hud_color)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                    object_label = (
-                        f"I: {blob.id[:4]} T: {blob.type} ({blob.type_confidence:.2f})"
-                    )
-                    cv2.putText(
-                        frame, object_label, (x, y - 5), font, 1, color, 2, line_type
-                    )
-                resized_frame = cv2.resize(frame, settings.DEBUG_WINDOW_SIZE)
+                add_steps()
+                resized_frame = cv2.resize(
+                    flow_field.render(object_counter.visualize()),
+                    settings.DEBUG_WINDOW_SIZE,
+                )
                 cv2.imshow("Debug", resized_frame)
 
+            frames_processed += 1
             retval, frame = cap.read()
     finally:
-        # end capture, close window, close log file and video object if any
+        profiler.close()
         cap.release()
-
+        close_detector(detector)
         if not settings.HEADLESS:
-            for blob in blobs:
-                cv2.line(
-                    frame, blob.position_first_detected, blob.centroid, hud_color, 2
-                )
-                cv2.circle(frame, blob.centroid, 5, hud_color, 5)
-            resized_frame = cv2.resize(frame, settings.DEBUG_WINDOW_SIZE)
-            cv2.imshow("Debug", resized_frame)
-            cv2.waitKey()
             cv2.destroyAllWindows()
 
-
-# Create or update blobs
-# matched_blob_ids = []
-# for box, _type, _confidence in zip(*detector.get_bounding_boxes(frame)):
-#     _tracker = cv2.TrackerKCF_create()
-#     _tracker.init(frame, tuple(box))
-#     for blob in blobs:
-#         if blob.get_overlap(box) >= 0.6:
-#             if blob.id not in matched_blob_ids:
-#                 blob.num_consecutive_detection_failures = 0
-#                 matched_blob_ids.append(blob.id)
-#             blob.update(box, _type, _confidence, _tracker)
-#             break
-#     else:
-#         blobs.append(Blob(box, _type, _confidence, _tracker))
-
-# for blob in list(blobs):
-#     if blob.id not in matched_blob_ids:
-#         blob.num_consecutive_detection_failures += 1
-#     if blob.num_consecutive_detection_failures > settings.MCDF:
-#         blobs.remove(blob)
+    # only a completed run is saved over the previous clips' flow field
+    add_steps()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    flow_field.save(output_path + ".npz")
+    cv2.imwrite(output_path + ".png", flow_field.render(background))
+    logger.info(
+        "Flow map saved.",
+        extra={
+            "meta": {
+                "label": "END_FLOWMAP",
+                "path": output_path,
+                "frames_processed": frames_processed,
+                "steps": int(flow_field.count.sum()),
+                "merged": merged,
+            },
+        },
+    )
 
 
 if __name__ == "__main__":
@@ -1,29 +1,32 @@
 """
-VCS entry point.
+Heatmap of where objects are seen in a video.
 """
 
 from dotenv import load_dotenv
 
-from util.blob import Blob
-
 load_dotenv()
 
 import settings
+import os
 import sys
 import cv2
 
-from detectors.yolo import DarknetYOLODetector
-from detectors.yolov8 import UltralyticsYOLODetector
-from util.logger import init_logger
+from main import get_detector, close_detector  # also sets up logging
+from util.detection_roi import get_roi_frame
+from util.heatmap import Heatmap
 from util.logger import get_logger
+from util.profiling import install_signal_profiler
 
-init_logger()
 logger = get_logger()
 
+# number of sampled positions buffered before they're added to the heatmap in one go
+HEATMAP_BATCH_SIZE = 4096
+
 
 def run():
     """
-    Initialize object counter class and run counting loop.
+    Detect objects on every Nth frame of the video, accumulate their positions into a heatmap
+    and save it, added to the heatmap of previous clips of the same camera if there is one.
     """
 
     cap = cv2.VideoCapture(settings.VIDEO)
@@ -38,102 +41,115 @@ def run():
         sys.exit()
     retval, frame = cap.read()
     f_height, f_width, _ = frame.shape
-    detection_interval = settings.DI
-    mcdf = settings.MCDF
-    mctf = settings.MCTF
-    show_counts = settings.SHOW_COUNTS
-
-    with open(settings.CLASSES_PATH, "r") as classes_file:
-        classes = [line.strip() for line in classes_file.readlines()]
-    with open(settings.CLASSES_OF_INTEREST_PATH, "r") as coi_file:
-        classes_of_interest = [line.strip() for line in coi_file.readlines()]
-
-    if settings.DETECTOR == "yolo":
-        detector = DarknetYOLODetector(
-            settings.YOLO_WEIGHTS_PATH,
-            settings.YOLO_CONFIG_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes,
-            classes_of_interest,
-        )
-    elif settings.DETECTOR == "yolov8":
-        detector = UltralyticsYOLODetector(
-            settings.YOLOV8_MODEL_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes_of_interest,
-        )
-    else:
-        logger.error(
-            "Invalid detector model, algorithm or API specified (options: yolo, yolov8)",
-            extra={"meta": {"label": "INVALID_DETECTION_ALGORITHM"}},
-        )
-        sys.exit()
-
-    if not settings.HEADLESS:
-        cv2.namedWindow("Debug")
-        debug_window_size = settings.DEBUG_WINDOW_SIZE
-        resized_frame = cv2.resize(frame, debug_window_size)
-        cv2.imshow("Debug", resized_frame)
-        cv2.waitKey(1)
-
-    font = cv2.FONT_HERSHEY_DUPLEX
-    line_type = cv2.LINE_AA
-    hud_color = (0, 255, 0)
-    colors = {
-        "car": (255, 0, 0),
-        "truck": (0, 0, 255),
-    }
-
-    blobs: list[Blob] = []
-    for box in detector.get_bounding_boxes(frame):
-        blob = Blob(box.box, box.type, box.confidence, None)
-        blobs.append(blob)
-        (x, y, w, h) = [int(v) for v in blob.bounding_box]
-        color = hud_color if blob.type is None else colors.get(blob.type, hud_color)
-        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-        object_label = f"T: {blob.type} ({blob.type_confidence:.2f})"
-        cv2.putText(frame, object_label, (x, y - 5), font, 1, color, 2, line_type)
-
-    quarter_1 = 0
-    quarter_2 = 0
-    quarter_3 = 0
-    quarter_4 = 0
-    for blob in blobs:
-        x, y = blob.centroid
-        if x < f_width / 2 and y < f_height / 2:
-            quarter_1 += 1
-        elif y < f_height / 2:
-            quarter_2 += 1
-        elif x < f_width / 2:
-            quarter_3 += 1
+    use_droi = settings.USE_DROI
+    droi = settings.DROI if use_droi else None
+    cell_size = settings.HEATMAP_CELL_SIZE
+    sample_interval = settings.HEATMAP_SAMPLE_INTERVAL
+    mode = settings.HEATMAP_MODE
+
+    heatmap = Heatmap((f_width, f_height), cell_size)
+    # add the heatmap of previous clips of the same camera
+    output_path = settings.HEATMAP_OUTPUT_PATH
+    merged = False
+    if os.path.exists(output_path + ".npy"):
+        try:
+            heatmap.merge(Heatmap.load(output_path + ".npy", (f_width, f_height), cell_size))
+            merged = True
+        except ValueError:
+            # refuse to run rather than replace what previous clips have accumulated
+            logger.error(
+                "Existing heatmap %s does not match this video's frame and cell size. "
+                "Set HEATMAP_OUTPUT_PATH to start a new one.",
+                output_path + ".npy",
+                extra={"meta": {"label": "HEATMAP_MISMATCH"}},
+            )
+            cap.release()
+            sys.exit()
+
+    detector = get_detector()
+    background = frame.copy()
+    boxes = []
+    frame_index = 0
+
+    def add_boxes():
+        if not boxes:
+            return
+        if mode == "box":
+            heatmap.add_boxes(boxes)
         else:
-            quarter_4 += 1
-
-    print(f"Quarter 1: {quarter_1}")
-    print(f"Quarter 2: {quarter_2}")
-    print(f"Quarter 3: {quarter_3}")
-    print(f"Quarter 4: {quarter_4}")
-
-    # show counts
-    # hud_color = (255, 0, 0)
-    # offset = 1
-    # for line, objects in self.counts.items():
-    #     cv2.putText(frame, line, (10, 40 * offset), font, 1, hud_color, 2, line_type)
-    #     for label, count in objects.items():
-    #         offset += 1
-    #         cv2.putText(frame, f"{label}: {count}", (10, 40 * offset), font, 1, hud_color, 2, line_type)
-    #     offset += 2
+            heatmap.add_points([(x + w / 2, y + h / 2) for x, y, w, h in boxes])
+        boxes.clear()
+
+    logger.info(
+        "Heatmap started.",
+        extra={
+            "meta": {
+                "label": "START_HEATMAP",
+                "heatmap_config": {
+                    "detector": settings.DETECTOR,
+                    "use_droi": use_droi,
+                    "droi": droi,
+                    "cell_size": cell_size,
+                    "sample_interval": sample_interval,
+                    "mode": mode,
+                },
+            },
+        },
+    )
 
     if not settings.HEADLESS:
-        debug_window_size = settings.DEBUG_WINDOW_SIZE
-        resized_frame = cv2.resize(frame, debug_window_size)
-        cv2.imshow("Debug", resized_frame)
-        cv2.waitKey()
+        cv2.namedWindow("Debug")
 
-    # end capture, close window, close log file and video object if any
-    cap.release()
-    if not settings.HEADLESS:
-        cv2.destroyAllWindows()
+    # profile on SIGUSR1, report memory use on SIGUSR2
+    profiler = install_signal_profiler(
+        lambda: {"frames_processed": frame_index, "boxes_buffered": len(boxes)}
+    )
+
+    try:
+        while retval:
+            profiler.tick()
+
+            if frame_index % sample_interval == 0:
+                detection_frame = get_roi_frame(frame, droi) if use_droi else frame
+                boxes.extend(box.box for box in detector.get_bounding_boxes(detection_frame))
+                if len(boxes) >= HEATMAP_BATCH_SIZE:
+                    add_boxes()
+
+                if not settings.HEADLESS:
+                    add_boxes()
+                    resized_frame = cv2.resize(
+                        heatmap.render(frame), settings.DEBUG_WINDOW_SIZE
+                    )
+                    cv2.imshow("Debug", resized_frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        logger.info("Loop stopped.", extra={"meta": {"label": "STOP_LOOP"}})
+                        break
+
+            retval, frame = cap.read()
+            frame_index += 1
+    finally:
+        profiler.close()
+        cap.release()
+        close_detector(detector)
+        if not settings.HEADLESS:
+            cv2.destroyAllWindows()
+
+    # only a completed run is saved over the previous clips' heatmap
+    add_boxes()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    heatmap.save(output_path + ".npy")
+    cv2.imwrite(output_path + ".png", heatmap.render(background))
+    logger.info(
+        "Heatmap saved.",
+        extra={
+            "meta": {
+                "label": "END_HEATMAP",
+                "path": output_path,
+                "frames_processed": frame_index,
+                "merged": merged,
+            },
+        },
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""
+Inference server that loads the detector (DETECTOR) once and makes detections for Ivy processes
+on the same host that use DETECTOR="remote", running frames from different processes in batches, e.g:
+
+    python -m inference_server
+"""
+
+import settings
+import sys
+
+from main import get_detector  # also sets up logging
+from detectors.batching import BatchingDetector
+from detectors.remote import InferenceServer
+from util.logger import get_logger
+
+logger = get_logger()
+
+
+def run():
+    if settings.DETECTOR == "remote":
+        logger.error(
+            "The inference server needs a detector of its own (options: yolo, yolov8)",
+            extra={"meta": {"label": "INVALID_DETECTION_ALGORITHM"}},
+        )
+        sys.exit()
+    if not settings.INFERENCE_SERVER_AUTHKEY:
+        logger.error(
+            "INFERENCE_SERVER_AUTHKEY not set (the inference server needs a secret key for its clients)",
+            extra={"meta": {"label": "INVALID_INFERENCE_SERVER_AUTHKEY"}},
+        )
+        sys.exit()
+
+    detector = BatchingDetector(
+        get_detector(),
+        settings.INFERENCE_SERVER_BATCH_SIZE,
+        settings.INFERENCE_SERVER_BATCH_WAIT,
+    )
+
+    def log_event(label, details):
+        logger.info(
+            "Inference client %s.",
+            "connected" if label == "CLIENT_CONNECT" else "disconnected",
+            extra={"meta": {"label": label, **details}},
+        )
+
+    server = InferenceServer(
+        detector,
+        settings.INFERENCE_SERVER_ADDRESS,
+        settings.INFERENCE_SERVER_AUTHKEY,
+        log_event,
+    )
+    logger.info(
+        "Inference server started.",
+        extra={
+            "meta": {
+                "label": "START_INFERENCE_SERVER",
+                "address": settings.INFERENCE_SERVER_ADDRESS,
+                "detector": settings.DETECTOR,
+                "batch_size": settings.INFERENCE_SERVER_BATCH_SIZE,
+                "batch_wait": settings.INFERENCE_SERVER_BATCH_WAIT,
+            },
+        },
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        detector.close()
+        logger.info(
+            "Inference server stopped.",
+            extra={
+                "meta": {
+                    "label": "END_INFERENCE_SERVER",
+                    "clients": server.num_clients,
+                    "detections": server.num_detections,
+                    "detector_batches": detector.num_batches,
+                    "mean_batch_size": detector.get_mean_batch_size(),
+                },
+            },
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,136 @@
+"""
+Aggregate events from job logs.
+
+Streams one or more JSON (optionally gzip, bz2 or xz compressed) or binary event logs,
+counts events by label, time interval, counting line/zone and object class and writes
+the aggregates as CSV or JSON. Files are processed in parallel across processes.
+
+E.g python -m log_analytics data/logs/*.log --labels OBJECT_COUNT --interval 900 --output counts.csv
+"""
+
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from util.event_log import read_events
+
+
+OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+CSV_FIELDS = ["label", "interval_start", "line", "class", "count"]
+
+
+def iter_log_events(path, labels):
+    """
+    Stream the events with the given labels in a log file.
+    """
+    if path.endswith(".events"):
+        yield from read_events(path, labels)
+        return
+
+    opener = next(
+        (opener for suffix, opener in OPENERS.items() if path.endswith(suffix)), open
+    )
+    # only parse lines that mention one of the labels
+    markers = [f'"{label}"' for label in labels]
+    with opener(path, "rt") as log_file:
+        for line in log_file:
+            if not any(marker in line for marker in markers):
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("meta", {}).get("label") in labels:
+                yield event
+
+
+def aggregate_log(path, labels, interval=None):
+    """
+    Count the events with the given labels in a log file by
+    (label, interval start, counting line or zone, object class).
+    """
+    counts = {}
+    for event in iter_log_events(path, labels):
+        meta = event["meta"]
+        interval_start = (
+            int(event["created"] // interval) * interval if interval else None
+        )
+        key = (
+            meta["label"],
+            interval_start,
+            meta.get("counting_line", meta.get("counting_zone")),
+            meta.get("type"),
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def aggregate_logs(paths, labels, interval=None, processes=None):
+    """
+    Aggregate several log files in parallel and merge the results.
+    """
+    counts = {}
+    with ProcessPoolExecutor(processes) as executor:
+        for log_counts in executor.map(
+            partial(aggregate_log, labels=labels, interval=interval), paths
+        ):
+            for key, count in log_counts.items():
+                counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def get_rows(counts):
+    """
+    Flatten aggregated counts into sorted rows with the fields in `CSV_FIELDS`.
+    """
+    return [
+        dict(zip(CSV_FIELDS, (*key, count)))
+        for key, count in sorted(
+            counts.items(), key=lambda item: [(v is None, v) for v in item[0]]
+        )
+    ]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Aggregate events from job logs.")
+    parser.add_argument("paths", nargs="+", help="log files (.log, .log.gz, .events)")
+    parser.add_argument(
+        "--labels",
+        nargs="+",
+        default=["OBJECT_COUNT"],
+        help="event labels to aggregate (default: OBJECT_COUNT)",
+    )
+    parser.add_argument(
+        "--interval", type=int, help="aggregate by time intervals of this many seconds"
+    )
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--processes", type=int, help="number of worker processes")
+    args = parser.parse_args(args)
+
+    rows = get_rows(
+        aggregate_logs(args.paths, args.labels, args.interval, args.processes)
+    )
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, output, indent=4)
+            output.write("\n")
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,25 +7,175 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import settings
+import json
 import sys
 import time
+import logging
 import cv2
 
-from detectors.yolo import DarknetYOLODetector
-from detectors.yolov8 import UltralyticsYOLODetector
-from util.logger import init_logger
-from util.image import take_screenshot
+from util.logger import init_logger, is_log_enabled, get_log_queue_stats
+from util.image import take_screenshot, close_crop_writer, get_num_pending_crops
 from util.logger import get_logger
 from util.debugger import mouse_callback
+from util.recorder import VideoRecorder, create_video_writer
+from util.preview import PreviewServer
+from util.metrics import MetricsServer, Rate
+from util.timing import get_stage_timer
+from util.profiling import install_signal_profiler
+from util.checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint
 from ObjectCounter import ObjectCounter
 
 init_logger()
 logger = get_logger()
 
 
+def get_detector():
+    """
+    Create the detector specified in settings.
+    Detectors are imported when they're created, so that only the chosen one's dependencies are needed.
+    """
+    # pylint: disable=import-outside-toplevel
+    # classes are filtered by the inference server
+    if settings.DETECTOR == "remote":
+        from detectors.remote import RemoteDetector
+
+        return RemoteDetector(
+            settings.INFERENCE_SERVER_ADDRESS, settings.INFERENCE_SERVER_AUTHKEY
+        )
+    with open(settings.CLASSES_PATH, "r") as classes_file:
+        classes = [line.strip() for line in classes_file.readlines()]
+    with open(settings.CLASSES_OF_INTEREST_PATH, "r") as coi_file:
+        classes_of_interest = [line.strip() for line in coi_file.readlines()]
+
+    if settings.DETECTOR == "yolo":
+        from detectors.yolo import DarknetYOLODetector
+
+        return DarknetYOLODetector(
+            settings.YOLO_WEIGHTS_PATH,
+            settings.YOLO_CONFIG_PATH,
+            settings.CONFIDENCE_THRESHOLD,
+            classes,
+            classes_of_interest,
+        )
+    if settings.DETECTOR == "yolov8":
+        from detectors.yolov8 import UltralyticsYOLODetector
+
+        return UltralyticsYOLODetector(
+            settings.YOLOV8_MODEL_PATH,
+            settings.CONFIDENCE_THRESHOLD,
+            classes_of_interest,
+        )
+    logger.error(
+        "Invalid detector model, algorithm or API specified (options: yolo, yolov8, remote)",
+        extra={"meta": {"label": "INVALID_DETECTION_ALGORITHM"}},
+    )
+    sys.exit()
+
+
+def close_detector(detector):
+    """
+    Release what a detector holds, e.g the shared memory of a remote detector.
+    """
+    if hasattr(detector, "close"):
+        detector.close()
+
+
+def log_stage_timings(stage_timer, frames_processed):
+    """
+    Log the latencies of frame processing stages since they were last logged.
+    """
+    logger.info(
+        "Stage timings.",
+        extra={
+            "meta": {
+                "label": "STAGE_TIMINGS",
+                "frames_processed": frames_processed,
+                "stages": stage_timer.get_summary(),
+            },
+        },
+    )
+
+
+def create_metrics_server(object_counter, stage_timer, recorder=None):
+    """
+    Serve metrics read from the counters kept by the object counter, stage timer and recorder.
+    """
+    metrics_server = MetricsServer(settings.METRICS_HOST, settings.METRICS_PORT)
+    metrics_server.add(
+        "ivy_frames_processed_total",
+        "counter",
+        "Number of frames processed.",
+        lambda: object_counter.num_frames_processed,
+    )
+    metrics_server.add(
+        "ivy_processing_fps",
+        "gauge",
+        "Frames processed per second since the last scrape.",
+        Rate(lambda: object_counter.num_frames_processed),
+    )
+    metrics_server.add(
+        "ivy_frames_dropped_total",
+        "counter",
+        "Number of frames left out of the recording.",
+        lambda: [
+            ({"reason": "queue_full"}, recorder.num_dropped if recorder else 0),
+            ({"reason": "late"}, recorder.num_late if recorder else 0),
+        ],
+    )
+    metrics_server.add(
+        "ivy_log_records_dropped_total",
+        "counter",
+        "Number of log records dropped because the log queue was full.",
+        lambda: get_log_queue_stats()[1],
+    )
+    metrics_server.add(
+        "ivy_active_blobs",
+        "gauge",
+        "Number of objects being tracked.",
+        lambda: len(object_counter.blobs),
+    )
+    metrics_server.add(
+        "ivy_objects_counted_total",
+        "counter",
+        "Number of objects counted by counting line and class.",
+        lambda: [
+            ({"line": line, "class": class_name}, count)
+            for line, class_counts in object_counter.counts.copy().items()
+            for class_name, count in class_counts.copy().items()
+        ],
+    )
+    metrics_server.add(
+        "ivy_detector_invocations_total",
+        "counter",
+        "Number of times object detection was run.",
+        lambda: object_counter.num_detections,
+    )
+    metrics_server.add(
+        "ivy_stage_latency_seconds",
+        "histogram",
+        "Time spent in each stage of frame processing.",
+        lambda: [
+            ({"stage": stage}, histogram)
+            for stage, histogram in stage_timer.get_histograms().items()
+        ],
+    )
+    metrics_server.add(
+        "ivy_queue_depth",
+        "gauge",
+        "Number of items waiting in background queues.",
+        lambda: [
+            ({"queue": "log"}, get_log_queue_stats()[0]),
+            ({"queue": "recorder"}, recorder.get_queue_size() if recorder else 0),
+            ({"queue": "crop_writer"}, get_num_pending_crops()),
+        ],
+    )
+    return metrics_server
+
+
 def run():
     """
     Initialize object counter class and run counting loop.
+    Returns the object counter, with the counts of the frames processed.
     """
 
     video = settings.VIDEO
@@ -64,33 +214,43 @@ def run():
     )
     show_droi = settings.SHOW_DROI
     counting_lines = settings.COUNTING_LINES
+    counting_zones = settings.COUNTING_ZONES
     show_counts = settings.SHOW_COUNTS
 
-    with open(settings.CLASSES_PATH, "r") as classes_file:
-        classes = [line.strip() for line in classes_file.readlines()]
-    with open(settings.CLASSES_OF_INTEREST_PATH, "r") as coi_file:
-        classes_of_interest = [line.strip() for line in coi_file.readlines()]
+    detector = get_detector()
 
-    if settings.DETECTOR == "yolo":
-        detector = DarknetYOLODetector(
-            settings.YOLO_WEIGHTS_PATH,
-            settings.YOLO_CONFIG_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes,
-            classes_of_interest,
-        )
-    elif settings.DETECTOR == "yolov8":
-        detector = UltralyticsYOLODetector(
-            settings.YOLOV8_MODEL_PATH,
-            settings.CONFIDENCE_THRESHOLD,
-            classes_of_interest,
+    # resume from the last checkpoint if it was saved for the same video and counting config
+    checkpoint_path = settings.CHECKPOINT_PATH
+    checkpoint_config = json.loads(
+        json.dumps(
+            {
+                "video": video,
+                "counting_lines": counting_lines,
+                "counting_zones": counting_zones,
+            }
         )
-    else:
-        logger.error(
-            "Invalid detector model, algorithm or API specified (options: yolo, yolov8)",
-            extra={"meta": {"label": "INVALID_DETECTION_ALGORITHM"}},
+    )
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    if checkpoint is not None and checkpoint["config"] != checkpoint_config:
+        logger.warning(
+            "Checkpoint %s was saved for a different video or counting config and will be replaced.",
+            checkpoint_path,
+            extra={"meta": {"label": "CHECKPOINT_MISMATCH"}},
         )
-        sys.exit()
+        checkpoint = None
+    if checkpoint is not None:
+        # start from the frame the checkpoint was saved at, which has already been counted
+        cap.set(cv2.CAP_PROP_POS_MSEC, checkpoint["position"] * 1000)
+        retval, frame = cap.read()
+        if not retval:
+            logger.warning(
+                "Checkpoint %s is past the end of the video and will be replaced.",
+                checkpoint_path,
+                extra={"meta": {"label": "CHECKPOINT_MISMATCH"}},
+            )
+            checkpoint = None
+            cap.set(cv2.CAP_PROP_POS_MSEC, 0)
+            retval, frame = cap.read()
 
     object_counter = ObjectCounter(
         frame,
@@ -103,16 +263,56 @@ def run():
         detection_interval,
         counting_lines,
         show_counts,
+        counting_zones,
+        settings.COUNT_SERIES_BIN_SECONDS,
+        settings.COUNT_SERIES_NUM_BINS,
+        state=checkpoint["counter"] if checkpoint is not None else None,
     )
 
+    frames_processed = 0
+    timestamp = None
+    if checkpoint is not None:
+        frames_processed = checkpoint["frames_processed"]
+        timestamp = checkpoint["position"]
+        logger.info(
+            "Processing resumed from checkpoint.",
+            extra={
+                "meta": {
+                    "label": "CHECKPOINT_RESUME",
+                    "path": checkpoint_path,
+                    "position": checkpoint["position"],
+                    "frames_processed": frames_processed,
+                },
+            },
+        )
+        retval, frame = cap.read()
+
+    def save_counting_checkpoint():
+        save_checkpoint(
+            checkpoint_path,
+            {
+                "config": checkpoint_config,
+                "position": timestamp,
+                "frames_processed": frames_processed,
+                "counter": object_counter.get_state(),
+            },
+        )
+
     record = settings.RECORD
     if record:
-        # initialize video object to record counting
-        output_video = cv2.VideoWriter(
-            settings.OUTPUT_VIDEO_PATH,
-            cv2.VideoWriter_fourcc(*"mp4v"),
-            30,
-            (f_width, f_height),
+        # record counting at the source's frame rate, encoding on a background thread
+        video_frame_rate = cap.get(cv2.CAP_PROP_FPS)
+        if not video_frame_rate > 0:
+            video_frame_rate = 30
+        recorder = VideoRecorder(
+            create_video_writer(
+                settings.OUTPUT_VIDEO_PATH,
+                video_frame_rate,
+                (f_width, f_height),
+                settings.RECORD_CODEC,
+            ),
+            video_frame_rate,
+            settings.RECORD_QUEUE_SIZE,
         )
 
     logger.info(
@@ -129,6 +329,7 @@ def run():
                     "use_droi": use_droi,
                     "droi": droi,
                     "counting_lines": counting_lines,
+                    "counting_zones": counting_zones,
                 },
             },
         },
@@ -142,13 +343,58 @@ def run():
             "Debug", mouse_callback, {"frame_width": f_width, "frame_height": f_height}
         )
 
+    preview = None
+    if settings.PREVIEW_PORT:
+        # serve the counting process over HTTP, rendering frames only while someone is watching
+        preview = PreviewServer(
+            settings.PREVIEW_HOST,
+            settings.PREVIEW_PORT,
+            settings.PREVIEW_MAX_FPS,
+            settings.PREVIEW_SIZE,
+            settings.PREVIEW_QUALITY,
+        )
+        logger.info(
+            "Preview server started.",
+            extra={
+                "meta": {
+                    "label": "START_PREVIEW",
+                    "url": f"http://{settings.PREVIEW_HOST}:{preview.port}/stream",
+                },
+            },
+        )
+
+    metrics_server = None
+    if settings.METRICS_PORT:
+        metrics_server = create_metrics_server(
+            object_counter, get_stage_timer(), recorder if record else None
+        )
+        logger.info(
+            "Metrics server started.",
+            extra={
+                "meta": {
+                    "label": "START_METRICS",
+                    "url": f"http://{settings.METRICS_HOST}:{metrics_server.port}/metrics",
+                },
+            },
+        )
+
+    # profile on SIGUSR1, report memory use on SIGUSR2
+    profiler = install_signal_profiler(object_counter.get_tracking_stats)
+
     is_paused = False
     output_frame = None
-    frames_processed = 0
+    stage_timer = get_stage_timer()
+    last_stage_timings = time.monotonic()
+    last_checkpoint = time.monotonic()
+    # whether the loop ended because there are no more frames rather than being stopped,
+    # as the frame count of a video is only an estimate
+    is_video_ended = False
 
     try:
         # main loop
         while retval:
+            profiler.tick()
+
             if not headless:
                 k = cv2.waitKey(1) & 0xFF
                 if k == ord("p"):  # pause/play loop if 'p' key is pressed
@@ -172,66 +418,129 @@ def run():
                     continue
 
             _timer = cv2.getTickCount()  # set timer to calculate processing frame rate
+            _frame_timer = stage_timer.start()
+            _stage_timer = _frame_timer
 
-            object_counter.count(frame)
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            object_counter.count(frame, timestamp)
+            _stage_timer = stage_timer.stop("counting", _stage_timer)
 
-            if record or not headless:
+            is_preview_wanted = preview is not None and preview.wants_frame()
+            if record or not headless or is_preview_wanted:
                 output_frame = object_counter.visualize()
+                _stage_timer = stage_timer.stop("visualization", _stage_timer)
 
             if record:
-                output_video.write(output_frame)
+                recorder.write(output_frame, timestamp)
+
+            if is_preview_wanted:
+                preview.publish(output_frame)
 
             if not headless:
                 debug_window_size = settings.DEBUG_WINDOW_SIZE
                 resized_frame = cv2.resize(output_frame, debug_window_size)
                 cv2.imshow("Debug", resized_frame)
+            _stage_timer = stage_timer.stop("output", _stage_timer)
 
-            frames_count = round(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            processing_frame_rate = round(
-                cv2.getTickFrequency() / (cv2.getTickCount() - _timer), 2
-            )
             frames_processed += 1
-            blobs = object_counter.get_blobs()
-            logger.debug(
-                "Frame processed.",
-                extra={
-                    "meta": {
-                        "label": "FRAME_PROCESS",
-                        "frames_count": frames_count,
-                        "frames_processed": frames_processed,
-                        "video_frame_rate": round(cap.get(cv2.CAP_PROP_FPS), 2),
-                        "video_frame_size": {"width": f_width, "height": f_height},
-                        "processing_frame_rate": processing_frame_rate,
-                        "percentage_processed": round(
-                            (frames_processed / frames_count) * 100, 2
-                        ),
-                        "time_in_seconds": round(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000),
-                        "blobs": blobs,
-                        "blobs_count": len(blobs),
-                        "counts": object_counter.get_counts(),
+            if is_log_enabled(logger, logging.DEBUG, "FRAME_PROCESS"):
+                frames_count = round(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                processing_frame_rate = round(
+                    cv2.getTickFrequency() / (cv2.getTickCount() - _timer), 2
+                )
+                blobs = object_counter.get_blobs()
+                logger.debug(
+                    "Frame processed.",
+                    extra={
+                        "meta": {
+                            "label": "FRAME_PROCESS",
+                            "frames_count": frames_count,
+                            "frames_processed": frames_processed,
+                            "video_frame_rate": round(cap.get(cv2.CAP_PROP_FPS), 2),
+                            "video_frame_size": {"width": f_width, "height": f_height},
+                            "processing_frame_rate": processing_frame_rate,
+                            "percentage_processed": round(
+                                (frames_processed / frames_count) * 100, 2
+                            ),
+                            "time_in_seconds": round(
+                                cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                            ),
+                            "blobs": blobs,
+                            "blobs_count": len(blobs),
+                            "counts": object_counter.get_counts(),
+                            "zones": object_counter.get_zone_counts(),
+                        },
                     },
-                },
-            )
+                )
+            _stage_timer = stage_timer.stop("logging", _stage_timer)
+
+            if (
+                checkpoint_path
+                and time.monotonic() - last_checkpoint >= settings.CHECKPOINT_INTERVAL
+            ):
+                last_checkpoint = time.monotonic()
+                save_counting_checkpoint()
+                _stage_timer = stage_timer.stop("checkpoint", _stage_timer)
 
             retval, frame = cap.read()
+            stage_timer.stop("decoding", _stage_timer)
+            stage_timer.stop("frame", _frame_timer)
+
+            if (
+                stage_timer.enabled
+                and time.monotonic() - last_stage_timings >= settings.STAGE_TIMINGS_INTERVAL
+            ):
+                last_stage_timings = time.monotonic()
+                log_stage_timings(stage_timer, frames_processed)
+        is_video_ended = not retval
     finally:
         # end capture, close window, close log file and video object if any
+        profiler.close()
         frames_count = round(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         cap.release()
         if not headless:
             cv2.destroyAllWindows()
+        if preview is not None:
+            preview.close()
+        if metrics_server is not None:
+            metrics_server.close()
         if record:
-            output_video.release()
+            recorder.close()
+            logger.info(
+                "Recording ended.",
+                extra={
+                    "meta": {
+                        "label": "END_RECORD",
+                        "frames_written": recorder.num_written,
+                        "frames_dropped": recorder.num_dropped + recorder.num_late,
+                        "frames_duplicated": recorder.num_duplicated,
+                    },
+                },
+            )
+        object_counter.flush_count_series()
+        close_crop_writer()
+        close_detector(detector)
+        if checkpoint_path:
+            if is_video_ended:
+                remove_checkpoint(checkpoint_path)
+            elif timestamp is not None:
+                save_counting_checkpoint()
+        if stage_timer.enabled:
+            log_stage_timings(stage_timer, frames_processed)
         logger.info(
             "Processing ended.",
             extra={
                 "meta": {
                     "label": "END_PROCESS",
                     "counts": object_counter.get_counts(),
+                    "zones": object_counter.get_zone_counts(),
+                    "detections": object_counter.num_detections,
                     "completed": frames_count - frames_processed == 0,
+                    "video_ended": is_video_ended,
                 },
             },
         )
+    return object_counter
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+"""
+Count objects in several videos or streams in one process, sharing one detector whose
+detections for all of them are run in batches, e.g:
+
+    python -m multi_camera cameras.json --output counts.json
+
+where cameras.json is a list of cameras like:
+
+    [
+        {
+            "label": "north_gate",
+            "video": "./data/videos/north_gate.mp4",
+            "droi": [[0, 0], [1280, 0], [1280, 720], [0, 720]],
+            "counting_lines": [{"label": "A", "line": [[0, 400], [1280, 400]]}],
+            "di": 10
+        }
+    ]
+
+"droi" (default: the whole frame) and "di" (default: DI) are optional.
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+
+import cv2
+
+import settings
+from main import get_detector  # also sets up logging
+from detectors.batching import BatchingDetector
+from util.logger import get_logger
+from util.timing import StageTimer, set_thread_stage_timer
+from ObjectCounter import ObjectCounter
+
+logger = get_logger()
+
+# label of the camera processed by the current thread
+_camera = threading.local()
+
+
+class CameraFilter(logging.Filter):
+    """
+    Add the label of the camera a record was logged for to its meta field.
+    """
+
+    def filter(self, record):
+        label = getattr(_camera, "label", None)
+        if label is not None:
+            record.meta = {**getattr(record, "meta", {}), "camera": label}
+        return True
+
+
+def load_cameras(path):
+    with open(path, "r") as cameras_file:
+        cameras = json.load(cameras_file)
+    for camera in cameras:
+        camera["counting_lines"] = [
+            {
+                "label": counting_line["label"],
+                "line": [tuple(point) for point in counting_line["line"]],
+            }
+            for counting_line in camera["counting_lines"]
+        ]
+        if camera.get("droi"):
+            camera["droi"] = [tuple(point) for point in camera["droi"]]
+    return cameras
+
+
+def process_camera(camera, detector):
+    """
+    Count objects in a camera's video until it ends and return the counts.
+    """
+    _camera.label = camera["label"]
+    # the latencies of each camera's stages are kept apart, as its thread is timed alongside the others
+    stage_timer = StageTimer(settings.ENABLE_STAGE_TIMERS)
+    set_thread_stage_timer(stage_timer)
+    cap = cv2.VideoCapture(camera["video"])
+    retval, frame = cap.read()
+    if not retval:
+        logger.error(
+            "Invalid video source %s",
+            camera["video"],
+            extra={"meta": {"label": "INVALID_VIDEO_SOURCE"}},
+        )
+        cap.release()
+        return {"label": camera["label"], "frames_processed": 0, "counts": None}
+    f_height, f_width, _ = frame.shape
+    droi = camera.get("droi") or [
+        (0, 0),
+        (f_width, 0),
+        (f_width, f_height),
+        (0, f_height),
+    ]
+    object_counter = ObjectCounter(
+        frame,
+        detector,
+        settings.TRACKER,
+        droi,
+        False,
+        settings.MCDF,
+        settings.MCTF,
+        camera.get("di", settings.DI),
+        camera["counting_lines"],
+        False,
+    )
+
+    started_at = time.monotonic()
+    frames_processed = 0
+    try:
+        while retval:
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            object_counter.count(frame, timestamp)
+            frames_processed += 1
+            retval, frame = cap.read()
+    finally:
+        cap.release()
+        object_counter.flush_count_series()
+
+    elapsed = time.monotonic() - started_at
+    counts = object_counter.get_counts()
+    stages = stage_timer.get_summary() if stage_timer.enabled else None
+    logger.info(
+        "Processing ended.",
+        extra={
+            "meta": {
+                "label": "END_PROCESS",
+                "counts": counts,
+                "frames_processed": frames_processed,
+                "stages": stages,
+            },
+        },
+    )
+    return {
+        "label": camera["label"],
+        "frames_processed": frames_processed,
+        "fps": frames_processed / elapsed if elapsed > 0 else None,
+        "counts": counts,
+        "stages": stages,
+    }
+
+
+def run(cameras, max_batch_size, max_wait):
+    """
+    Count objects in each camera's video on a thread of its own, with one ObjectCounter per camera
+    and one detector shared by all.
+    """
+    logger.addFilter(CameraFilter())
+    detector = BatchingDetector(get_detector(), max_batch_size, max_wait)
+    logger.info(
+        "Multi-camera processing started.",
+        extra={
+            "meta": {
+                "label": "START_MULTI_CAMERA",
+                "cameras": [camera["label"] for camera in cameras],
+                "detector": settings.DETECTOR,
+                "max_batch_size": max_batch_size,
+                "max_wait": max_wait,
+            },
+        },
+    )
+
+    results = [None] * len(cameras)
+
+    def process(index):
+        try:
+            results[index] = process_camera(cameras[index], detector)
+        except BaseException as error:  # pylint: disable=broad-except
+            # e.g SystemExit from an invalid tracker, which shouldn't take the other cameras' results
+            _camera.label = cameras[index]["label"]
+            logger.exception(
+                "Processing failed.",
+                extra={"meta": {"label": "CAMERA_FAILED", "error": repr(error)}},
+            )
+            results[index] = {"label": cameras[index]["label"], "error": repr(error)}
+
+    threads = [
+        threading.Thread(target=process, args=(index,), name=f"camera_{camera['label']}")
+        for index, camera in enumerate(cameras)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        detector.close()
+
+    logger.info(
+        "Multi-camera processing ended.",
+        extra={
+            "meta": {
+                "label": "END_MULTI_CAMERA",
+                "frames_processed": sum(
+                    result.get("frames_processed", 0) for result in results
+                ),
+                "detector_batches": detector.num_batches,
+                "mean_batch_size": detector.get_mean_batch_size(),
+            },
+        },
+    )
+    return {
+        "cameras": results,
+        "detector_batches": detector.num_batches,
+        "mean_batch_size": detector.get_mean_batch_size(),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Count objects in several videos or streams with one shared detector."
+    )
+    parser.add_argument("cameras", help="JSON file with a list of camera configs")
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        help="most images run through the detector at once (default: number of cameras)",
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=0.02,
+        help="seconds a detection waits for others to batch with",
+    )
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(args)
+
+    cameras = load_cameras(args.cameras)
+    result = run(cameras, args.max_batch_size or len(cameras), args.max_wait)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
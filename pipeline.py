@@ -0,0 +1,249 @@
+"""
+Count objects in VIDEO with decoding, detection and tracking/counting in separate processes
+so that they run in parallel, e.g:
+
+    python -m pipeline
+
+Decoded frames are passed to the detection and counting processes through a ring buffer in
+shared memory (PIPELINE_RING_SIZE frames) and detections are passed to the counting process
+through a queue. Detection runs ahead of counting on the frames ObjectCounter will detect on.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+if multiprocessing.parent_process() is not None and "JOB_ID" in os.environ:
+    # stage processes write logs of their own, named after the job they're part of
+    os.environ["JOB_ID"] = f"{os.environ['JOB_ID']}_{os.getpid()}"
+
+import cv2
+
+import settings
+from main import get_detector, close_detector, log_stage_timings  # also sets up logging
+from detectors.precomputed import PrecomputedDetector
+from util.detection_roi import get_roi_frame
+from util.frame_ring import FrameRing
+from util.image import close_crop_writer
+from util.logger import get_logger
+from util.timing import get_stage_timer
+from ObjectCounter import ObjectCounter
+
+logger = get_logger()
+
+# readers of the frame ring
+DETECTION_READER = 0
+COUNTING_READER = 1
+
+
+def get_droi(frame):
+    f_height, f_width, _ = frame.shape
+    if settings.USE_DROI:
+        return settings.DROI
+    return [(0, 0), (f_width, 0), (f_width, f_height), (0, f_height)]
+
+
+def decode(ring):
+    """
+    Decoding stage: read frames of VIDEO into the frame ring.
+    """
+    cap = cv2.VideoCapture(settings.VIDEO)
+    started_at = time.monotonic()
+    frames_decoded = 0
+    try:
+        retval, frame = cap.read()
+        while retval:
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            ring.put(frame, frames_decoded, timestamp)
+            frames_decoded += 1
+            retval, frame = cap.read()
+    finally:
+        ring.put_end()
+        cap.release()
+        ring.close()
+    logger.info(
+        "Decoding ended.",
+        extra={
+            "meta": {
+                "label": "END_DECODE",
+                "frames_decoded": frames_decoded,
+                "seconds": time.monotonic() - started_at,
+            },
+        },
+    )
+
+
+def detect(ring, detections, detection_intervals):
+    """
+    Detection stage: detect objects in the frames ObjectCounter detects on, i.e the initial frame
+    and then every DI frames counted, for each of `detection_intervals`, and queue the detections
+    in frame order on each queue in `detections`.
+    """
+    reader = ring.get_reader(DETECTION_READER)
+    started_at = time.monotonic()
+    num_detections = 0
+    detector = None
+    try:
+        detector = get_detector()
+        droi = None
+        item = reader.get()
+        while item is not None:
+            frame_index, _, frame = item
+            if droi is None:
+                droi = get_droi(frame)
+            if any(frame_index % interval == 0 for interval in detection_intervals):
+                bounding_boxes = detector.get_bounding_boxes(get_roi_frame(frame, droi))
+                for queue in detections:
+                    queue.put((frame_index, bounding_boxes))
+                num_detections += 1
+            reader.release()
+            item = reader.get()
+    finally:
+        for queue in detections:
+            queue.put(None)
+        ring.close()
+        if detector is not None:
+            close_detector(detector)
+    logger.info(
+        "Detection ended.",
+        extra={
+            "meta": {
+                "label": "END_DETECT",
+                "detections": num_detections,
+                "seconds": time.monotonic() - started_at,
+            },
+        },
+    )
+
+
+def run():
+    """
+    Start the decoding and detection processes and track and count objects in this one.
+    Returns the object counter, as main.run does.
+    """
+    cap = cv2.VideoCapture(settings.VIDEO)
+    retval, frame = cap.read()
+    cap.release()
+    if not retval:
+        logger.error(
+            "Invalid video source %s",
+            settings.VIDEO,
+            extra={"meta": {"label": "INVALID_VIDEO_SOURCE"}},
+        )
+        sys.exit()
+
+    # stage processes are spawned rather than forked so that each sets up its own logging
+    context = multiprocessing.get_context("spawn")
+    ring = FrameRing(frame.shape, frame.dtype, settings.PIPELINE_RING_SIZE, 2, context)
+    detections = context.Queue()
+    processes = [
+        context.Process(target=decode, args=(ring,), name="decode"),
+        context.Process(
+            target=detect, args=(ring, [detections], [settings.DI]), name="detect"
+        ),
+    ]
+    for process in processes:
+        process.start()
+
+    logger.info(
+        "Pipeline processing started.",
+        extra={
+            "meta": {
+                "label": "START_PIPELINE",
+                "counter_config": {
+                    "di": settings.DI,
+                    "mcdf": settings.MCDF,
+                    "mctf": settings.MCTF,
+                    "detector": settings.DETECTOR,
+                    "tracker": settings.TRACKER,
+                    "droi": get_droi(frame),
+                    "counting_lines": settings.COUNTING_LINES,
+                    "counting_zones": settings.COUNTING_ZONES,
+                },
+                "ring_size": settings.PIPELINE_RING_SIZE,
+            },
+        },
+    )
+
+    reader = ring.get_reader(COUNTING_READER)
+    detector = PrecomputedDetector(detections)
+    stage_timer = get_stage_timer()
+    last_stage_timings = time.monotonic()
+    started_at = time.monotonic()
+    object_counter = None
+    frames_processed = 0
+    is_completed = False
+    try:
+        item = reader.get()
+        while item is not None:
+            _frame_timer = stage_timer.start()
+            frame_index, timestamp, frame = item
+            # the counter keeps the frame after its slot is released
+            frame = frame.copy()
+            reader.release()
+            detector.frame_index = frame_index
+            if object_counter is None:
+                object_counter = ObjectCounter(
+                    frame,
+                    detector,
+                    settings.TRACKER,
+                    get_droi(frame),
+                    False,
+                    settings.MCDF,
+                    settings.MCTF,
+                    settings.DI,
+                    settings.COUNTING_LINES,
+                    False,
+                    settings.COUNTING_ZONES,
+                    settings.COUNT_SERIES_BIN_SECONDS,
+                    settings.COUNT_SERIES_NUM_BINS,
+                )
+            object_counter.count(frame, timestamp)
+            frames_processed += 1
+            _stage_timer = stage_timer.stop("counting", _frame_timer)
+
+            item = reader.get()
+            stage_timer.stop("decoding", _stage_timer)
+            stage_timer.stop("frame", _frame_timer)
+
+            if (
+                stage_timer.enabled
+                and time.monotonic() - last_stage_timings >= settings.STAGE_TIMINGS_INTERVAL
+            ):
+                last_stage_timings = time.monotonic()
+                log_stage_timings(stage_timer, frames_processed)
+        is_completed = True
+    finally:
+        for process in processes:
+            if not is_completed:
+                # e.g the stages are waiting on frames or detections that won't be read
+                process.terminate()
+            process.join()
+        ring.close()
+        close_crop_writer()
+        if stage_timer.enabled:
+            log_stage_timings(stage_timer, frames_processed)
+        if object_counter is not None:
+            object_counter.flush_count_series()
+            elapsed = time.monotonic() - started_at
+            logger.info(
+                "Processing ended.",
+                extra={
+                    "meta": {
+                        "label": "END_PROCESS",
+                        "counts": object_counter.get_counts(),
+                        "zones": object_counter.get_zone_counts(),
+                        "detections": object_counter.num_detections,
+                        "frames_processed": frames_processed,
+                        "processing_frame_rate": round(frames_processed / elapsed, 2)
+                        if elapsed > 0
+                        else None,
+                    },
+                },
+            )
+    return object_counter
+
+
+if __name__ == "__main__":
+    run()
@@ -90,7 +90,8 @@ except ValueError:
     print("Invalid value for DI. It should be a positive integer.")
     ENVS_READY = False
 
-# Model/algorithm to use for object detection (options: yolo, tfoda, detectron2, haarcascade)
+# Model/algorithm to use for object detection (options: yolo, tfoda, detectron2, haarcascade, remote)
+# "remote" leaves detection to an inference server (see inference_server.py) shared by several processes
 DETECTOR = os.getenv("DETECTOR", "yolo")
 
 # Algorithm to use for object tracking (options: kcf, csrt)
@@ -111,6 +112,15 @@ if RECORD:
         print("Output video path not set.")
         ENVS_READY = False
 
+# Codec (FourCC) used to encode the recorded video and maximum number of frames waiting to be encoded
+# Frames are dropped instead of slowing down counting when the limit is reached
+RECORD_CODEC = os.getenv("RECORD_CODEC", "mp4v")
+try:
+    RECORD_QUEUE_SIZE = int(os.getenv("RECORD_QUEUE_SIZE", "64"))
+except ValueError:
+    print("Invalid value for RECORD_QUEUE_SIZE. It should be a positive integer.")
+    ENVS_READY = False
+
 # Run VCS without UI display
 try:
     HEADLESS = ast.literal_eval(os.getenv("HEADLESS", "False"))
@@ -118,6 +128,58 @@ except ValueError:
     print("Invalid value for HEADLESS. It should be either True or False.")
     ENVS_READY = False
 
+# Port on which to serve a preview of the counting process over HTTP (0 to disable)
+# The MJPEG stream is served at /stream and the latest frame at /snapshot.jpg
+try:
+    PREVIEW_PORT = int(os.getenv("PREVIEW_PORT", "0"))
+except ValueError:
+    print("Invalid value for PREVIEW_PORT. It should be a port number.")
+    ENVS_READY = False
+
+PREVIEW_HOST = os.getenv("PREVIEW_HOST", "127.0.0.1")
+
+# Maximum frame rate, size (width, height) and JPEG quality (0 - 100) of the preview
+try:
+    PREVIEW_MAX_FPS = float(os.getenv("PREVIEW_MAX_FPS", "5"))
+    PREVIEW_SIZE = ast.literal_eval(os.getenv("PREVIEW_SIZE", "(858, 480)"))
+    PREVIEW_QUALITY = int(os.getenv("PREVIEW_QUALITY", "70"))
+except ValueError:
+    print(
+        "Invalid value for PREVIEW_MAX_FPS, PREVIEW_SIZE and/or PREVIEW_QUALITY. "
+        "They should be a positive number, a 2-tuple: (width, height) and an integer from 0 to 100."
+    )
+    ENVS_READY = False
+
+# Path of a file to periodically save the state of counting to ("" to disable)
+# If the file exists when VCS starts, counting resumes from the saved state
+# The file is removed once the video has been processed completely
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "")
+
+# Seconds between checkpoints
+try:
+    CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "30"))
+except ValueError:
+    print("Invalid value for CHECKPOINT_INTERVAL. It should be a positive number.")
+    ENVS_READY = False
+
+# Port on which to serve metrics (frames processed, counts, latencies, etc) in the Prometheus text format (0 to disable)
+# Metrics are served at /metrics
+try:
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+except ValueError:
+    print("Invalid value for METRICS_PORT. It should be a port number.")
+    ENVS_READY = False
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Number of decoded frames the pipeline (see pipeline.py) can hold in shared memory between its
+# decoding, detection and counting processes, i.e how far decoding can run ahead of counting
+try:
+    PIPELINE_RING_SIZE = int(os.getenv("PIPELINE_RING_SIZE", "32"))
+except ValueError:
+    print("Invalid value for PIPELINE_RING_SIZE. It should be a positive integer.")
+    ENVS_READY = False
+
 # Specify one or more counting lines
 # A counting line is represented by a label and line segment
 # E.g {'label': 'A', 'line': [(667, 713), (888, 713)]}
@@ -128,6 +190,65 @@ if os.getenv("COUNTING_LINES"):
         print("Invalid value for COUNTING_LINES. It should be a list of lines.")
         ENVS_READY = False
 
+# Specify zero or more counting zones
+# A counting zone is represented by a label and a polygon in which occupancy and dwell time are measured
+# E.g {'label': 'P1', 'zone': [(100, 500), (300, 500), (300, 700), (100, 700)]}
+try:
+    COUNTING_ZONES = ast.literal_eval(os.getenv("COUNTING_ZONES", "[]"))
+except ValueError:
+    print("Invalid value for COUNTING_ZONES. It should be a list of zones.")
+    ENVS_READY = False
+
+# Widths (in seconds of video time) of the time bins in which counts are also reported
+# E.g [1, 60, 900] for counts per second, minute and quarter hour
+try:
+    COUNT_SERIES_BIN_SECONDS = ast.literal_eval(
+        os.getenv("COUNT_SERIES_BIN_SECONDS", "[]")
+    )
+except ValueError:
+    print(
+        "Invalid value for COUNT_SERIES_BIN_SECONDS. It should be a list of positive numbers."
+    )
+    ENVS_READY = False
+
+# Number of most recent time bins kept in memory for each bin width
+try:
+    COUNT_SERIES_NUM_BINS = int(os.getenv("COUNT_SERIES_NUM_BINS", "60"))
+except ValueError:
+    print("Invalid value for COUNT_SERIES_NUM_BINS. It should be a positive integer.")
+    ENVS_READY = False
+
+# Heatmap (heatmap.py) cell size in pixels and interval in frames at which detections are sampled
+try:
+    HEATMAP_CELL_SIZE = int(os.getenv("HEATMAP_CELL_SIZE", "16"))
+    HEATMAP_SAMPLE_INTERVAL = int(os.getenv("HEATMAP_SAMPLE_INTERVAL", "5"))
+except ValueError:
+    print(
+        "Invalid value for HEATMAP_CELL_SIZE and/or HEATMAP_SAMPLE_INTERVAL. They should be positive integers."
+    )
+    ENVS_READY = False
+
+# Count an object in the heatmap cell of its centroid or in every cell its bounding box covers
+HEATMAP_MODE = os.getenv("HEATMAP_MODE", "centroid")
+if HEATMAP_MODE not in ("centroid", "box"):
+    print("Invalid value for HEATMAP_MODE. It should be either centroid or box.")
+    ENVS_READY = False
+
+# Path (without extension) of the heatmap grid (.npy) and image (.png)
+# An existing grid at this path is added to, so clips of the same camera build up one heatmap
+HEATMAP_OUTPUT_PATH = os.getenv("HEATMAP_OUTPUT_PATH", "./data/heatmaps/heatmap")
+
+# Flow map (flowmap.py) cell size in pixels
+try:
+    FLOWMAP_CELL_SIZE = int(os.getenv("FLOWMAP_CELL_SIZE", "32"))
+except ValueError:
+    print("Invalid value for FLOWMAP_CELL_SIZE. It should be a positive integer.")
+    ENVS_READY = False
+
+# Path (without extension) of the flow field (.npz) and image (.png)
+# An existing flow field at this path is added to, so clips of the same camera build up one flow map
+FLOWMAP_OUTPUT_PATH = os.getenv("FLOWMAP_OUTPUT_PATH", "./data/flowmaps/flowmap")
+
 if (
     os.getenv("CLASSES_PATH")
     and os.getenv("CLASSES_OF_INTEREST_PATH")
@@ -157,28 +278,107 @@ if DETECTOR == "yolov8":
         print("YOLOV8_MODEL_PATH not set or invalid.")
         ENVS_READY = False
 
+# Address of the inference server as host:port or the path of a Unix socket,
+# and the secret key clients authenticate with
+# Requests are pickled, so anyone with the key can run code in the inference server
+INFERENCE_SERVER_ADDRESS = os.getenv("INFERENCE_SERVER_ADDRESS", "127.0.0.1:6010")
+INFERENCE_SERVER_AUTHKEY = os.getenv("INFERENCE_SERVER_AUTHKEY", "")
+if DETECTOR == "remote" and not INFERENCE_SERVER_AUTHKEY:
+    print("INFERENCE_SERVER_AUTHKEY not set. It should be the inference server's secret key.")
+    ENVS_READY = False
+
+# Most frames the inference server runs through the detector at once,
+# and seconds a frame waits for frames from other clients to batch with
+try:
+    INFERENCE_SERVER_BATCH_SIZE = int(os.getenv("INFERENCE_SERVER_BATCH_SIZE", "8"))
+    INFERENCE_SERVER_BATCH_WAIT = float(os.getenv("INFERENCE_SERVER_BATCH_WAIT", "0.01"))
+except ValueError:
+    print(
+        "Invalid value for INFERENCE_SERVER_BATCH_SIZE and/or INFERENCE_SERVER_BATCH_WAIT. "
+        "They should be a positive integer and a number of seconds."
+    )
+    ENVS_READY = False
+
 # Log destinations
+# The event logger writes the same events as the file logger in a compact binary format (see util/event_log.py)
 try:
     ENABLE_CONSOLE_LOGGER = ast.literal_eval(os.getenv("ENABLE_CONSOLE_LOGGER", "True"))
     ENABLE_FILE_LOGGER = ast.literal_eval(os.getenv("ENABLE_FILE_LOGGER", "True"))
+    ENABLE_EVENT_LOGGER = ast.literal_eval(os.getenv("ENABLE_EVENT_LOGGER", "False"))
 except ValueError:
     print(
-        "Invalid value for ENABLE_CONSOLE_LOGGER and/or "
-        "ENABLE_FILE_LOGGER. They should be either True or False."
+        "Invalid value for ENABLE_CONSOLE_LOGGER, ENABLE_FILE_LOGGER and/or "
+        "ENABLE_EVENT_LOGGER. They should be either True or False."
+    )
+    ENVS_READY = False
+
+# Write logs from a background thread instead of the frame processing loop
+try:
+    LOG_ASYNC = ast.literal_eval(os.getenv("LOG_ASYNC", "False"))
+except ValueError:
+    print("Invalid value for LOG_ASYNC. It should be either True or False.")
+    ENVS_READY = False
+
+# Maximum number of log records waiting to be written when LOG_ASYNC is on,
+# what to do when that limit is reached (options: drop, block)
+# and maximum number of records written at once
+try:
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "1000"))
+except ValueError:
+    print(
+        "Invalid value for LOG_QUEUE_SIZE and/or LOG_BATCH_SIZE. They should be positive integers."
+    )
+    ENVS_READY = False
+
+LOG_QUEUE_OVERFLOW = os.getenv("LOG_QUEUE_OVERFLOW", "drop")
+if LOG_QUEUE_OVERFLOW not in ("drop", "block"):
+    print("Invalid value for LOG_QUEUE_OVERFLOW. It should be either drop or block.")
+    ENVS_READY = False
+
+# Log only every Nth event with a given label
+# E.g {'FRAME_PROCESS': 10, 'TRACKER_UPDATE': 5}
+try:
+    LOG_SAMPLING_RATES = ast.literal_eval(os.getenv("LOG_SAMPLING_RATES", "{}"))
+except ValueError:
+    print(
+        "Invalid value for LOG_SAMPLING_RATES. It should be a dict of labels to positive integers."
     )
     ENVS_READY = False
 
 # Absolute/relative path to log files directory
-if ENABLE_FILE_LOGGER:
-    LOG_FILES_DIRECTORY = os.getenv("LOG_FILES_DIRECTORY", "./data/logs/")
+LOG_FILES_DIRECTORY = os.getenv("LOG_FILES_DIRECTORY", "./data/logs/")
+
+# Time the stages of frame processing (decoding, detection, tracking, counting, etc)
+# and log a summary of their latencies every STAGE_TIMINGS_INTERVAL seconds
+try:
+    ENABLE_STAGE_TIMERS = ast.literal_eval(os.getenv("ENABLE_STAGE_TIMERS", "True"))
+except ValueError:
+    print("Invalid value for ENABLE_STAGE_TIMERS. It should be either True or False.")
+    ENVS_READY = False
+
+try:
+    STAGE_TIMINGS_INTERVAL = float(os.getenv("STAGE_TIMINGS_INTERVAL", "60"))
+except ValueError:
+    print("Invalid value for STAGE_TIMINGS_INTERVAL. It should be a positive number.")
+    ENVS_READY = False
+
+# Seconds a CPU profile runs for when the process receives SIGUSR1
+# The profile (and memory reports requested with SIGUSR2) are written to LOG_FILES_DIRECTORY
+try:
+    PROFILE_DURATION = float(os.getenv("PROFILE_DURATION", "30"))
+except ValueError:
+    print("Invalid value for PROFILE_DURATION. It should be a positive number.")
+    ENVS_READY = False
 
 VIDEO_WRITING_DIRECTORY = os.getenv("VIDEO_WRITING_DIRECTORY", "")
 VIDEO_INPUT_DIRECTORY = os.getenv("VIDEO_INPUT_DIRECTORY", "")
 VIDEO_OUTPUT_DIRECTORY = os.getenv("VIDEO_OUTPUT_DIRECTORY", "")
 DATA_OUTPUT_DIRECTORY = os.getenv("DATA_OUTPUT_DIRECTORY", "")
 
-# Log base 64 images
-# Logging images will increase the size of your logs significantly
+# Log images of detected objects
+# Images are saved as JPEG files in <LOG_FILES_DIRECTORY>/<job id>_images/ and referenced by path in the logs
+# Logging images will use a significant amount of disk space
 # However, if you intend to do some post-processing that involves images,
 # you might want to have it on
 try:
@@ -187,6 +387,16 @@ except ValueError:
     print("Invalid value for LOG_IMAGES. It should be either True or False.")
     ENVS_READY = False
 
+# JPEG quality (0 - 100) of logged images and maximum number of images logged per detection
+try:
+    LOG_IMAGES_QUALITY = int(os.getenv("LOG_IMAGES_QUALITY", "85"))
+    LOG_IMAGES_MAX_PER_FRAME = int(os.getenv("LOG_IMAGES_MAX_PER_FRAME", "10"))
+except ValueError:
+    print(
+        "Invalid value for LOG_IMAGES_QUALITY and/or LOG_IMAGES_MAX_PER_FRAME. They should be positive integers."
+    )
+    ENVS_READY = False
+
 # Size of window used to view the object counting process
 try:
     DEBUG_WINDOW_SIZE = ast.literal_eval(os.getenv("DEBUG_WINDOW_SIZE", "(858, 480)"))
@@ -0,0 +1,209 @@
+"""
+Count objects in a long video (VIDEO) on several cores by splitting it into time ranges (shards)
+that are counted in parallel and merging their counts, e.g:
+
+    python -m sharded --processes 8 --output counts.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+if multiprocessing.parent_process() is not None and "JOB_ID" in os.environ:
+    # worker processes write logs of their own, named after the job they're part of
+    os.environ["JOB_ID"] = f"{os.environ['JOB_ID']}_{os.getpid()}"
+
+import cv2
+
+import settings
+from main import get_detector, close_detector  # also sets up logging
+from util.logger import get_logger
+from util.shards import get_shards, merge_shard_events, get_event_counts
+from ObjectCounter import ObjectCounter
+
+logger = get_logger()
+
+
+def get_video_duration(video):
+    """
+    Fetch the duration of a video file in seconds, or None if it can't be determined (e.g for streams).
+    """
+    cap = cv2.VideoCapture(video)
+    try:
+        frames_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+    if frames_count > 0 and fps > 0:
+        return frames_count / fps
+    return None
+
+
+def process_shard(shard):
+    """
+    Count objects in a shard's processing range of VIDEO and return the count events.
+    """
+    cap = cv2.VideoCapture(settings.VIDEO)
+    cap.set(cv2.CAP_PROP_POS_MSEC, shard["process_start"] * 1000)
+    retval, frame = cap.read()
+    if not retval:
+        cap.release()
+        return {"events": [], "frames_processed": 0}
+    f_height, f_width, _ = frame.shape
+    droi = (
+        settings.DROI
+        if settings.USE_DROI
+        else [(0, 0), (f_width, 0), (f_width, f_height), (0, f_height)]
+    )
+
+    events = []
+
+    def add_event(blob, line_label, timestamp):
+        events.append({"timestamp": timestamp, "line": line_label, "class": blob.type})
+
+    detector = get_detector()
+    object_counter = ObjectCounter(
+        frame,
+        detector,
+        settings.TRACKER,
+        droi,
+        False,
+        settings.MCDF,
+        settings.MCTF,
+        settings.DI,
+        settings.COUNTING_LINES,
+        False,
+        on_count=add_event,
+    )
+    frames_processed = 0
+    try:
+        while retval:
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if timestamp >= shard["process_end"]:
+                break
+            object_counter.count(frame, timestamp)
+            frames_processed += 1
+            retval, frame = cap.read()
+    finally:
+        cap.release()
+        close_detector(detector)
+
+    logger.info(
+        "Shard processed.",
+        extra={
+            "meta": {
+                "label": "SHARD_PROCESS",
+                "shard": shard,
+                "frames_processed": frames_processed,
+                "events_count": len(events),
+            },
+        },
+    )
+    return {"events": events, "frames_processed": frames_processed}
+
+
+def run(num_shards, processes, overlap, tolerance):
+    """
+    Count objects in VIDEO in `num_shards` shards on `processes` worker processes.
+    """
+    duration = get_video_duration(settings.VIDEO)
+    if duration is None:
+        logger.error(
+            "Invalid video source %s (sharding needs a video file of known duration)",
+            settings.VIDEO,
+            extra={"meta": {"label": "INVALID_VIDEO_SOURCE"}},
+        )
+        sys.exit()
+
+    if overlap > 0:
+        # shards can't be shorter than the overlaps at both their ends
+        num_shards = min(num_shards, max(int(duration / (2 * overlap)), 1))
+    shards = get_shards(duration, num_shards, overlap)
+    logger.info(
+        "Sharded processing started.",
+        extra={
+            "meta": {
+                "label": "START_SHARDED_PROCESS",
+                "duration": duration,
+                "shards_count": num_shards,
+                "overlap": overlap,
+                "tolerance": tolerance,
+            },
+        },
+    )
+
+    # workers are spawned rather than forked so that each sets up its own logging
+    # instead of inheriting open log files and listener threads
+    with ProcessPoolExecutor(processes, multiprocessing.get_context("spawn")) as executor:
+        results = list(executor.map(process_shard, shards))
+
+    shard_events = [result["events"] for result in results]
+    events = merge_shard_events(shards, shard_events, overlap, tolerance)
+    counts = get_event_counts(
+        events, [counting_line["label"] for counting_line in settings.COUNTING_LINES]
+    )
+    logger.info(
+        "Sharded processing ended.",
+        extra={
+            "meta": {
+                "label": "END_SHARDED_PROCESS",
+                "counts": counts,
+                "frames_processed": sum(result["frames_processed"] for result in results),
+            },
+        },
+    )
+    return {
+        "video": settings.VIDEO,
+        "duration": duration,
+        "shards": [
+            {
+                **shard,
+                "frames_processed": result["frames_processed"],
+                "events_count": len(result["events"]),
+            }
+            for shard, result in zip(shards, results)
+        ],
+        "counts": counts,
+        "events": events,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Count objects in VIDEO by processing time ranges of it in parallel."
+    )
+    parser.add_argument(
+        "--processes", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument(
+        "--shards", type=int, help="number of time ranges (default: number of processes)"
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=10,
+        help="seconds each shard also processes before and after its range",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2,
+        help="maximum seconds between two shards' counts of the same crossing",
+    )
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(args)
+
+    result = run(args.shards or args.processes, args.processes, args.overlap, args.tolerance)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
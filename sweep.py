@@ -0,0 +1,297 @@
+"""
+Compare counting parameters (DI, MCDF, MCTF, TRACKER and counting lines) on VIDEO in one pass,
+decoding it and running the detector on each frame only once for all of them, e.g:
+
+    python -m sweep sweep.json --processes 4 --output sweep_results.json
+
+where sweep.json lists variants explicitly and/or as a grid of values to combine, with optional
+ground truth counts per counting line to compare them with:
+
+    {
+        "variants": [{"label": "baseline"}],
+        "grid": {"di": [5, 10, 20], "mcdf": [1, 2], "tracker": ["kcf", "csrt"]},
+        "ground_truth": {"A": 120, "B": 87}
+    }
+
+Parameters a variant doesn't set are taken from settings.
+
+Frames are decoded and detected on by the stages of the pipeline (see pipeline.py), which pass them
+to worker processes through a ring buffer in shared memory and queues. Each worker counts the frames
+with its share of the variants, one ObjectCounter per variant, fed the detections it would have made.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import cv2
+
+# stage and worker processes get logs of their own when pipeline is imported
+from pipeline import decode, detect, get_droi, DETECTION_READER
+import settings
+from detectors.precomputed import PrecomputedDetector
+from util.frame_ring import FrameRing
+from util.image import close_crop_writer
+from util.logger import get_logger
+from util.sweep import get_variants, get_detection_frames_count, get_count_errors
+from util.workers import get_results
+from ObjectCounter import ObjectCounter
+
+logger = get_logger()
+
+# label of the variant being counted in this process
+_variant = {"label": None}
+
+
+class VariantFilter(logging.Filter):
+    """
+    Add the label of the variant a record was logged for to its meta field.
+    """
+
+    def filter(self, record):
+        if _variant["label"] is not None:
+            record.meta = {**getattr(record, "meta", {}), "variant": _variant["label"]}
+        return True
+
+
+def count_variants(ring, reader_index, variants, detection_intervals, detections, results):
+    """
+    Count the frames read from the ring with each variant and put their results on `results`.
+    A variant that fails is left out of the rest of the frames without stopping the others.
+    """
+    logger.addFilter(VariantFilter())
+    reader = ring.get_reader(reader_index)
+    variant_detections = [queue.Queue() for _ in variants]
+    detectors = [PrecomputedDetector(detections) for detections in variant_detections]
+    object_counters = [None] * len(variants)
+    seconds = [0.0] * len(variants)
+    errors = [None] * len(variants)
+    frames_processed = 0
+    error = None
+    is_completed = False
+    are_detections_ended = False
+    try:
+        item = reader.get()
+        while item is not None:
+            frame_index, timestamp, frame = item
+            # the counters keep the frame after its slot is released
+            frame = frame.copy()
+            reader.release()
+
+            if any(frame_index % interval == 0 for interval in detection_intervals):
+                detection = detections.get()
+                if detection is None:
+                    are_detections_ended = True
+                if detection is None or detection[0] != frame_index:
+                    raise RuntimeError(f"Detections are out of step at frame {frame_index}.")
+                for variant, detections_of_variant in zip(variants, variant_detections):
+                    if frame_index % variant["di"] == 0:
+                        detections_of_variant.put(detection)
+
+            for index, variant in enumerate(variants):
+                if errors[index] is not None:
+                    continue
+                _variant["label"] = variant["label"]
+                _timer = time.perf_counter()
+                detectors[index].frame_index = frame_index
+                try:
+                    if object_counters[index] is None:
+                        object_counters[index] = ObjectCounter(
+                            frame,
+                            detectors[index],
+                            variant["tracker"],
+                            get_droi(frame),
+                            False,
+                            variant["mcdf"],
+                            variant["mctf"],
+                            variant["di"],
+                            variant["counting_lines"],
+                            False,
+                        )
+                    object_counters[index].count(frame, timestamp)
+                except (Exception, SystemExit) as exception:  # pylint: disable=broad-except
+                    # e.g an invalid tracker, which exits
+                    errors[index] = repr(exception)
+                seconds[index] += time.perf_counter() - _timer
+            _variant["label"] = None
+            frames_processed += 1
+            item = reader.get()
+        is_completed = True
+    except BaseException as exception:
+        error = exception
+        raise
+    finally:
+        _variant["label"] = None
+        if not is_completed:
+            # let the decoder and the other workers go on, and the detection stage end
+            reader.close()
+            while not are_detections_ended and detections.get() is not None:
+                pass
+        ring.close()
+        close_crop_writer()
+        variant_results = []
+        for variant, object_counter, variant_seconds, variant_error in zip(
+            variants, object_counters, seconds, errors
+        ):
+            result = {
+                **variant,
+                "frames_processed": frames_processed,
+                "seconds": variant_seconds,
+                "fps": frames_processed / variant_seconds if variant_seconds > 0 else None,
+            }
+            if object_counter is not None:
+                result["detections"] = object_counter.num_detections
+                result["counts"] = object_counter.get_counts()
+            if variant_error is not None or error is not None:
+                result["error"] = variant_error or repr(error)
+            variant_results.append(result)
+        results.put(variant_results)
+
+
+def run(variants, processes, ground_truth=None):
+    """
+    Count objects in VIDEO with each variant, spread over `processes` worker processes.
+    """
+    cap = cv2.VideoCapture(settings.VIDEO)
+    retval, frame = cap.read()
+    cap.release()
+    if not retval:
+        logger.error(
+            "Invalid video source %s",
+            settings.VIDEO,
+            extra={"meta": {"label": "INVALID_VIDEO_SOURCE"}},
+        )
+        sys.exit()
+
+    processes = max(min(processes, len(variants)), 1)
+    detection_intervals = sorted({variant["di"] for variant in variants})
+    logger.info(
+        "Parameter sweep started.",
+        extra={
+            "meta": {
+                "label": "START_SWEEP",
+                "video": settings.VIDEO,
+                "variants_count": len(variants),
+                "processes": processes,
+                "detector": settings.DETECTOR,
+            },
+        },
+    )
+
+    # stage and worker processes are spawned rather than forked so that each sets up its own logging
+    context = multiprocessing.get_context("spawn")
+    ring = FrameRing(
+        frame.shape, frame.dtype, settings.PIPELINE_RING_SIZE, processes + 1, context
+    )
+    detections = [context.Queue() for _ in range(processes)]
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=count_variants,
+            args=(
+                ring,
+                DETECTION_READER + 1 + worker_index,
+                variants[worker_index::processes],
+                detection_intervals,
+                detections[worker_index],
+                results,
+            ),
+            name=f"sweep_{worker_index}",
+        )
+        for worker_index in range(processes)
+    ]
+    stages = [
+        context.Process(target=decode, args=(ring,), name="decode"),
+        context.Process(
+            target=detect, args=(ring, detections, detection_intervals), name="detect"
+        ),
+    ]
+    started_at = time.monotonic()
+    for process in stages + workers:
+        process.start()
+
+    is_completed = False
+    try:
+        variant_results = {
+            result["label"]: result
+            for worker_results in get_results(results, workers, stages)
+            for result in worker_results
+        }
+        is_completed = True
+    finally:
+        for process in stages + workers:
+            if not is_completed:
+                process.terminate()
+            process.join()
+        ring.close()
+    seconds = time.monotonic() - started_at
+
+    variant_results = [variant_results[variant["label"]] for variant in variants]
+    if ground_truth:
+        for result in variant_results:
+            if "counts" in result:
+                result["errors"] = get_count_errors(
+                    {line["line"]: line["count"] for line in result["counts"]["lines"]},
+                    ground_truth,
+                )
+    frames_processed = max(result["frames_processed"] for result in variant_results)
+    summary = {
+        "video": settings.VIDEO,
+        "frames_processed": frames_processed,
+        "detections": get_detection_frames_count(frames_processed, detection_intervals),
+        "seconds": seconds,
+        "variants": variant_results,
+    }
+    logger.info(
+        "Parameter sweep ended.",
+        extra={
+            "meta": {
+                "label": "END_SWEEP",
+                "frames_processed": frames_processed,
+                "detections": summary["detections"],
+                "seconds": seconds,
+            },
+        },
+    )
+    return summary
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Compare counting parameters on VIDEO, decoding and detecting once for all."
+    )
+    parser.add_argument("spec", help="JSON file with the variants to compare")
+    parser.add_argument(
+        "--processes", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(args)
+
+    with open(args.spec, "r") as spec_file:
+        spec = json.load(spec_file)
+    variants = get_variants(
+        spec,
+        {
+            "di": settings.DI,
+            "mcdf": settings.MCDF,
+            "mctf": settings.MCTF,
+            "tracker": settings.TRACKER,
+            "counting_lines": settings.COUNTING_LINES,
+        },
+    )
+    result = run(variants, args.processes, spec.get("ground_truth"))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from benchmarks.run import run_benchmark
+
+
+def test_run_benchmark():
+    result = run_benchmark((320, 240), 3, num_frames=12, di=5)
+    assert result["frames_processed"] == 12
+    assert result["detector_invocations"] == 3, "detection on the first frame and every 6th frame after"
+    assert result["stages"]["count"]["calls"] == 12
+    assert result["stages"]["visualize"]["calls"] == 12
+    assert result["stages"]["attempt_count"]["calls"] > 0
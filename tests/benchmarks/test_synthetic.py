@@ -0,0 +1,26 @@
+import numpy as np
+from benchmarks.synthetic import SyntheticScene, FakeDetector
+
+
+def test_scene_is_deterministic():
+    scene_a = SyntheticScene((320, 240), 5, seed=1)
+    scene_b = SyntheticScene((320, 240), 5, seed=1)
+    assert scene_a.get_boxes(10) == scene_b.get_boxes(10), "same seed gives same boxes"
+    assert np.array_equal(scene_a.render(10), scene_b.render(10)), "same seed gives same frames"
+    assert scene_a.get_boxes(0) != scene_a.get_boxes(10), "objects move"
+
+
+def test_boxes_are_within_frame():
+    scene = SyntheticScene((320, 240), 20, seed=2)
+    for frame_index in range(0, 100, 10):
+        for (x, y, w, h), _ in scene.get_boxes(frame_index):
+            assert x >= 0 and y >= 0 and x + w <= 320 and y + h <= 240
+
+
+def test_fake_detector():
+    scene = SyntheticScene((320, 240), 5, seed=1)
+    detector = FakeDetector(scene)
+    detector.frame_index = 7
+    boxes = detector.get_bounding_boxes(scene.render(7))
+    assert [(box.box, box.type) for box in boxes] == scene.get_boxes(7)
+    assert detector.num_invocations == 1
@@ -2,8 +2,16 @@
 Configure tests.
 '''
 
+import importlib
+import threading
+import cv2
+import numpy as np
+import pytest
 from dotenv import load_dotenv
 
+from benchmarks.run import set_offline_settings
+from benchmarks.synthetic import SyntheticScene, FakeDetector, write_video
+
 
 def pytest_configure():
     '''
@@ -12,3 +20,147 @@ def pytest_configure():
     file after command line options have been parsed.
     '''
     load_dotenv()
+    # settings without defaults are read when modules under test are imported
+    set_offline_settings()
+
+
+class SceneCounter:
+    '''
+    Count the objects of a synthetic scene frame by frame with ObjectCounter,
+    detected by a FakeDetector that's told which frame it's given.
+    '''
+
+    droi = [(0, 0), (320, 0), (320, 240), (0, 240)]
+    counting_lines = [
+        {'label': 'A', 'line': [(0, 120), (320, 120)]},
+        {'label': 'B', 'line': [(160, 0), (160, 240)]},
+    ]
+    counting_zones = [{'label': 'P', 'zone': [(0, 0), (160, 0), (160, 240), (0, 240)]}]
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.detector = FakeDetector(scene)
+
+    def create_object_counter(self, frame_index=0, **kwargs):
+        '''
+        Create an object counter starting at a frame of the scene.
+        '''
+        from ObjectCounter import ObjectCounter
+
+        self.detector.frame_index = frame_index
+        return ObjectCounter(
+            self.scene.render(frame_index), self.detector, 'kcf', self.droi, False, 2, 3, 5,
+            self.counting_lines, False, self.counting_zones, **kwargs
+        )
+
+    def count_frames(self, object_counter, frame_indexes):
+        '''
+        Count objects in frames of the scene, 30 to a second.
+        '''
+        for frame_index in frame_indexes:
+            self.detector.frame_index = frame_index
+            object_counter.count(self.scene.render(frame_index), frame_index / 30)
+
+
+@pytest.fixture
+def scene_counter():
+    '''
+    Count 6 objects moving across a 320x240 scene, over counting lines A (horizontal)
+    and B (vertical) through its middle and in zone P (its left half).
+    '''
+    return SceneCounter(SyntheticScene((320, 240), 6, seed=1))
+
+
+@pytest.fixture
+def single_object_scene_counter():
+    '''
+    Count a car moving right across the middle of the frame of `scene_counter`,
+    out of zone P and over line B at about frame 29.
+    '''
+    scene = SyntheticScene((320, 240), 1)
+    scene.sizes = np.array([[30, 30]])
+    scene.origins = np.array([[60.0, 90.0]])
+    scene.velocities = np.array([[4.0, 0.0]])
+    scene.types = ['car']
+    return SceneCounter(scene)
+
+
+class SceneDetector(FakeDetector):
+    '''
+    Detects the objects of a synthetic scene in whichever of its decoded frames an image is,
+    for detectors that are only given images, e.g behind an inference server.
+    '''
+
+    def __init__(self, scene, frames):
+        super().__init__(scene)
+        self.frames = np.stack(frames).astype(np.int16)
+
+    def get_bounding_boxes(self, image):
+        differences = np.abs(self.frames - image).reshape(len(self.frames), -1).sum(axis=1)
+        self.frame_index = int(np.argmin(differences))
+        return super().get_bounding_boxes(image)
+
+
+@pytest.fixture
+def synthetic_video(tmp_path, monkeypatch):
+    '''
+    Point the settings at a synthetic video whose objects are detected by an inference server
+    running on a thread of the test process, so the counting processes can all reach it.
+    Settings are set in the environment too, for the processes spawned to read them.
+    '''
+    import settings
+    from detectors.batching import BatchingDetector
+    from detectors.remote import InferenceServer
+
+    width, height = 320, 240
+    scene = SyntheticScene((width, height), 6, seed=1)
+    path = str(tmp_path / 'synthetic.avi')
+    write_video(scene, path, 60)
+    cap = cv2.VideoCapture(path)
+    frames = []
+    retval, frame = cap.read()
+    while retval:
+        frames.append(frame)
+        retval, frame = cap.read()
+    cap.release()
+
+    detector = BatchingDetector(SceneDetector(scene, frames), max_wait=0)
+    server = InferenceServer(detector, str(tmp_path / 'inference.sock'), 'secret')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    environment = {
+        'VIDEO': path,
+        'DETECTOR': 'remote',
+        'INFERENCE_SERVER_ADDRESS': server.address,
+        'INFERENCE_SERVER_AUTHKEY': 'secret',
+        'COUNTING_LINES': repr([
+            {'label': 'A', 'line': [(0, height // 2), (width, height // 2)]},
+            {'label': 'B', 'line': [(width // 2, 0), (width // 2, height)]},
+        ]),
+        'COUNTING_ZONES': '[]',
+        'DI': '5',
+        'MCDF': '2',
+        'MCTF': '3',
+        'TRACKER': 'kcf',
+        'USE_DROI': 'False',
+        'HEADLESS': 'True',
+        'RECORD': 'False',
+        'PREVIEW_PORT': '0',
+        'METRICS_PORT': '0',
+        'CHECKPOINT_PATH': '',
+        'WAIT_FOR_CAPTURE': 'False',
+        'ENABLE_CONSOLE_LOGGER': 'False',
+        'ENABLE_FILE_LOGGER': 'False',
+        'ENABLE_EVENT_LOGGER': 'False',
+        'LOG_IMAGES': 'False',
+    }
+    for key, value in environment.items():
+        monkeypatch.setenv(key, value)
+    importlib.reload(settings)
+    yield {'path': path, 'num_frames': len(frames), 'server': server}
+    server.close()
+    thread.join(timeout=5)
+    detector.close()
+    monkeypatch.undo()
+    importlib.reload(settings)
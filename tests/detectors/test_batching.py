@@ -0,0 +1,92 @@
+import threading
+import pytest
+from detectors import BoundingBox
+from detectors.batching import BatchingDetector
+
+
+class EchoDetector:
+    """
+    Detects one object whose box is the image (a number) it was given.
+    """
+
+    def __init__(self, batch=True):
+        self.batch_sizes = []
+        if batch:
+            self.get_bounding_boxes_batch = self._get_bounding_boxes_batch
+
+    def get_bounding_boxes(self, image):
+        self.batch_sizes.append(1)
+        return [BoundingBox((image, 0, 1, 1), "car", 1.0)]
+
+    def _get_bounding_boxes_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return [[BoundingBox((image, 0, 1, 1), "car", 1.0)] for image in images]
+
+
+def detect_concurrently(detector, images):
+    results = [None] * len(images)
+    barrier = threading.Barrier(len(images))
+
+    def detect(index):
+        barrier.wait()
+        results[index] = detector.get_bounding_boxes(images[index])
+
+    threads = [threading.Thread(target=detect, args=(index,)) for index in range(len(images))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_requests_are_batched():
+    echo_detector = EchoDetector()
+    detector = BatchingDetector(echo_detector, max_batch_size=4, max_wait=0.5)
+    results = detect_concurrently(detector, list(range(8)))
+    detector.close()
+    assert [result[0].box[0] for result in results] == list(range(8)), "each caller gets its own boxes"
+    assert sum(echo_detector.batch_sizes) == 8
+    assert max(echo_detector.batch_sizes) == 4, "batches are capped at max_batch_size"
+    assert detector.num_images == 8 and detector.get_mean_batch_size() > 1
+
+
+def test_detector_without_batch_method():
+    echo_detector = EchoDetector(batch=False)
+    detector = BatchingDetector(echo_detector, max_batch_size=4, max_wait=0.1)
+    results = detect_concurrently(detector, [3, 5])
+    detector.close()
+    assert [result[0].box[0] for result in results] == [3, 5]
+    assert echo_detector.batch_sizes == [1, 1]
+
+
+def test_errors_reach_callers():
+    class FailingDetector:
+        def get_bounding_boxes(self, image):
+            raise ValueError("bad image")
+
+    detector = BatchingDetector(FailingDetector(), max_wait=0)
+    with pytest.raises(ValueError):
+        detector.get_bounding_boxes(1)
+    detector.close()
+    with pytest.raises(RuntimeError):
+        detector.get_bounding_boxes(1)
+
+
+def test_requests_racing_close_are_answered_or_rejected():
+    detector = BatchingDetector(EchoDetector(), max_wait=0)
+    results = []
+
+    def detect(image):
+        try:
+            results.append(detector.get_bounding_boxes(image)[0].box[0])
+        except RuntimeError:
+            results.append(None)
+
+    threads = [threading.Thread(target=detect, args=(image,)) for image in range(50)]
+    for thread in threads:
+        thread.start()
+    detector.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads), "no request is left waiting"
+    assert len(results) == 50
@@ -0,0 +1,28 @@
+import queue
+import pytest
+from detectors import BoundingBox
+from detectors.precomputed import PrecomputedDetector
+
+
+def test_detections_are_returned_in_order():
+    detections = queue.Queue()
+    car = [BoundingBox((1, 2, 3, 4), "car", 0.9)]
+    detections.put((0, car))
+    detections.put((10, []))
+    detections.put(None)
+    detector = PrecomputedDetector(detections)
+    detector.frame_index = 0
+    assert detector.get_bounding_boxes(None) == car
+    detector.frame_index = 10
+    assert detector.get_bounding_boxes(None) == []
+    with pytest.raises(RuntimeError):
+        detector.get_bounding_boxes(None)
+
+
+def test_detections_out_of_step():
+    detections = queue.Queue()
+    detections.put((5, []))
+    detector = PrecomputedDetector(detections)
+    detector.frame_index = 4
+    with pytest.raises(RuntimeError):
+        detector.get_bounding_boxes(None)
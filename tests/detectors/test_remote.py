@@ -0,0 +1,126 @@
+import threading
+import numpy as np
+import pytest
+from detectors import BoundingBox
+from detectors.batching import BatchingDetector
+from detectors.remote import InferenceServer, RemoteDetector, parse_address
+
+
+class MeanDetector:
+    """
+    Detects one object whose confidence is the mean pixel value of the image, in any image but a black one.
+    """
+
+    def get_bounding_boxes(self, image):
+        if not image.any():
+            raise ValueError("black image")
+        height, width = image.shape[:2]
+        return [BoundingBox((0, 0, width, height), "car", float(image.mean()))]
+
+
+@pytest.fixture
+def server(tmp_path):
+    detector = BatchingDetector(MeanDetector(), max_batch_size=4, max_wait=0.01)
+    inference_server = InferenceServer(detector, str(tmp_path / "inference.sock"), "secret")
+    thread = threading.Thread(target=inference_server.serve_forever, daemon=True)
+    thread.start()
+    yield inference_server
+    inference_server.close()
+    thread.join(timeout=5)
+    detector.close()
+    assert not thread.is_alive(), "closing the server stops it"
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:6010") == ("127.0.0.1", 6010)
+    assert parse_address("/tmp/inference.sock") == "/tmp/inference.sock"
+
+
+def test_remote_detections(server):
+    detector = RemoteDetector(server.address, "secret")
+    small = np.full((120, 160, 3), 10, np.uint8)
+    large = np.full((240, 320, 3), 200, np.uint8)
+    assert detector.get_bounding_boxes(small) == [BoundingBox((0, 0, 160, 120), "car", 10.0)]
+    slot = detector.shared_memory
+    assert detector.get_bounding_boxes(large)[0].confidence == 200.0, "slot grows for larger frames"
+    assert detector.get_bounding_boxes(small)[0].confidence == 10.0
+    assert detector.shared_memory is not slot and detector.shared_memory.size >= large.nbytes
+    detector.close()
+    assert server.num_detections == 3
+
+
+def test_concurrent_clients(server):
+    results = {}
+
+    def detect(value):
+        detector = RemoteDetector(server.address, "secret")
+        results[value] = [
+            detector.get_bounding_boxes(np.full((60, 80, 3), value, np.uint8))[0].confidence
+            for _ in range(5)
+        ]
+        detector.close()
+
+    threads = [threading.Thread(target=detect, args=(value,)) for value in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {value: [float(value)] * 5 for value in (1, 2, 3)}, "clients get their own boxes"
+    assert server.num_clients == 3 and server.num_detections == 15
+
+
+def test_errors_reach_clients(server):
+    detector = RemoteDetector(server.address, "secret")
+    with pytest.raises(ValueError):
+        detector.get_bounding_boxes(np.zeros((60, 80, 3), np.uint8))
+    assert detector.get_bounding_boxes(np.ones((60, 80, 3), np.uint8))[0].confidence == 1.0
+    detector.close()
+
+
+def test_close_stops_client_threads(tmp_path):
+    detector = BatchingDetector(MeanDetector(), max_wait=0)
+    inference_server = InferenceServer(detector, str(tmp_path / "inference.sock"), "secret")
+    thread = threading.Thread(target=inference_server.serve_forever, daemon=True)
+    thread.start()
+    client = RemoteDetector(inference_server.address, "secret")
+    assert client.get_bounding_boxes(np.ones((60, 80, 3), np.uint8))
+    inference_server.close()
+    thread.join(timeout=5)
+    assert not any(
+        client_thread.name.startswith("inference_client_") for client_thread in threading.enumerate()
+    ), "closing the server waits for the threads of connected clients"
+    detector.close()
+    client.close()
+
+
+class UnpicklableError(Exception):
+    def __init__(self, detail, code):
+        super().__init__(detail)
+        self.code = code
+
+
+class UnsendableDetector:
+    """
+    Fails with an error that can't be unpickled on black images and returns boxes that can't be pickled on others.
+    """
+
+    def get_bounding_boxes(self, image):
+        if not image.any():
+            raise UnpicklableError("black image", 1)
+        return [lambda: None]
+
+
+def test_unsendable_replies_fail_requests(tmp_path):
+    detector = BatchingDetector(UnsendableDetector(), max_wait=0)
+    inference_server = InferenceServer(detector, str(tmp_path / "inference.sock"), "secret")
+    thread = threading.Thread(target=inference_server.serve_forever, daemon=True)
+    thread.start()
+    client = RemoteDetector(inference_server.address, "secret")
+    with pytest.raises(RuntimeError, match="black image"):
+        client.get_bounding_boxes(np.zeros((60, 80, 3), np.uint8))
+    with pytest.raises(EOFError):
+        client.get_bounding_boxes(np.ones((60, 80, 3), np.uint8))
+    client.close()
+    inference_server.close()
+    thread.join(timeout=5)
+    detector.close()
@@ -0,0 +1,76 @@
+'''
+Test counting with several configs at once.
+'''
+
+import json
+import pytest
+import settings
+
+
+def write_configs(path, configs):
+    '''
+    Write counting configs to a JSON file and return its path.
+    '''
+    with open(path, 'w') as configs_file:
+        json.dump(configs, configs_file)
+    return str(path)
+
+
+def test_configs_count_as_separate_runs(synthetic_video, tmp_path, monkeypatch):
+    import fanout
+    import main
+
+    line_a, line_b = settings.COUNTING_LINES
+    configs = fanout.load_configs(write_configs(tmp_path / 'configs.json', [
+        {'label': 'a', 'counting_lines': [line_a], 'di': 5},
+        {'label': 'b', 'counting_lines': [line_b], 'di': 10},
+    ]))
+    result = fanout.run(configs)
+
+    for config, config_result in zip(configs, result['configs']):
+        monkeypatch.setattr(settings, 'COUNTING_LINES', config['counting_lines'])
+        monkeypatch.setattr(settings, 'DI', config['di'])
+        expected = main.run()
+        assert config_result['frames_processed'] == expected.num_frames_processed
+        assert config_result['counts'] == expected.get_counts()
+        assert config_result['counts']['total_count'] > 0, 'the objects cross the counting lines'
+
+
+def test_failing_config_does_not_hold_up_the_others(synthetic_video, tmp_path):
+    import fanout
+
+    configs = fanout.load_configs(write_configs(tmp_path / 'configs.json', [
+        {'label': 'failing', 'counting_lines': settings.COUNTING_LINES, 'di': 'never'},
+        {'label': 'ok', 'counting_lines': settings.COUNTING_LINES},
+    ]))
+    failing, ok = fanout.run(configs)['configs']
+    assert 'error' in failing
+    assert 'error' not in ok and ok['frames_processed'] == synthetic_video['num_frames']
+
+
+def test_config_labels_are_unique(tmp_path):
+    import fanout
+
+    path = write_configs(tmp_path / 'configs.json', [
+        {'label': 'a', 'counting_lines': []},
+        {'label': 'a', 'counting_lines': []},
+    ])
+    with pytest.raises(ValueError):
+        fanout.load_configs(path)
+
+
+def test_classes_of_interest_can_only_be_narrowed(tmp_path, monkeypatch):
+    import fanout
+
+    coi_path = tmp_path / 'classes_of_interest.txt'
+    coi_path.write_text('car\ntruck\n')
+    monkeypatch.setattr(settings, 'CLASSES_OF_INTEREST_PATH', str(coi_path))
+    path = write_configs(tmp_path / 'configs.json', [
+        {'label': 'cars', 'counting_lines': [], 'classes_of_interest': ['car']},
+    ])
+    assert fanout.load_configs(path)[0]['classes_of_interest'] == ['car']
+    path = write_configs(tmp_path / 'configs.json', [
+        {'label': 'people', 'counting_lines': [], 'classes_of_interest': ['car', 'person']},
+    ])
+    with pytest.raises(ValueError, match='person'):
+        fanout.load_configs(path)
@@ -0,0 +1,32 @@
+'''
+Test making flow maps of videos.
+'''
+
+import pytest
+import settings
+from util.flowmap import FlowField
+
+
+def test_flow_fields_of_clips_are_merged(synthetic_video, tmp_path, monkeypatch):
+    import flowmap
+
+    output_path = str(tmp_path / 'flowmap')
+    monkeypatch.setattr(settings, 'FLOWMAP_OUTPUT_PATH', output_path)
+    flowmap.run()
+    steps = FlowField.load(output_path + '.npz').count.sum()
+    assert steps > 0
+    flowmap.run()
+    assert FlowField.load(output_path + '.npz').count.sum() == steps * 2, 'the second clip is added to the first'
+
+
+def test_mismatched_flow_field_is_kept(synthetic_video, tmp_path, monkeypatch):
+    import flowmap
+
+    output_path = str(tmp_path / 'flowmap')
+    monkeypatch.setattr(settings, 'FLOWMAP_OUTPUT_PATH', output_path)
+    previous = FlowField((64, 48), 16)
+    previous.add_steps([(10, 10)], [(12, 10)], [0.1])
+    previous.save(output_path + '.npz')
+    with pytest.raises(SystemExit):
+        flowmap.run()
+    assert FlowField.load(output_path + '.npz').count.sum() == 1, 'the previous flow field is not replaced'
@@ -0,0 +1,33 @@
+'''
+Test making heatmaps of videos.
+'''
+
+import numpy as np
+import pytest
+import settings
+from util.heatmap import Heatmap
+
+
+def test_heatmaps_of_clips_are_merged(synthetic_video, tmp_path, monkeypatch):
+    import heatmap
+
+    output_path = str(tmp_path / 'heatmap')
+    monkeypatch.setattr(settings, 'HEATMAP_OUTPUT_PATH', output_path)
+    heatmap.run()
+    grid = np.load(output_path + '.npy')
+    assert grid.sum() > 0
+    heatmap.run()
+    assert (np.load(output_path + '.npy') == grid * 2).all(), 'the second clip is added to the first'
+
+
+def test_mismatched_heatmap_is_kept(synthetic_video, tmp_path, monkeypatch):
+    import heatmap
+
+    output_path = str(tmp_path / 'heatmap')
+    monkeypatch.setattr(settings, 'HEATMAP_OUTPUT_PATH', output_path)
+    previous = Heatmap((64, 48), 16)
+    previous.add_points([(10, 10)])
+    previous.save(output_path + '.npy')
+    with pytest.raises(SystemExit):
+        heatmap.run()
+    assert (np.load(output_path + '.npy') == previous.grid).all(), 'the previous heatmap is not replaced'
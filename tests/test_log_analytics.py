@@ -0,0 +1,36 @@
+import gzip
+import json
+from log_analytics import aggregate_log, aggregate_logs, get_rows
+
+
+def _write_log(path, events):
+    with gzip.open(path, "wt") if str(path).endswith(".gz") else open(path, "w") as log_file:
+        for created, meta in events:
+            log_file.write(json.dumps({"created": created, "level": "INFO", "message": "", "meta": meta}) + "\n")
+
+
+def _object_count(line, type):
+    return {"label": "OBJECT_COUNT", "counting_line": line, "type": type}
+
+
+def test_aggregate_log(tmp_path):
+    path = str(tmp_path / "job.log")
+    _write_log(path, [
+        (10, _object_count("A", "car")),
+        (20, _object_count("A", "car")),
+        (30, {"label": "TRACKER_UPDATE", "object_id": "1"}),
+        (70, _object_count("B", "bus")),
+    ])
+    counts = aggregate_log(path, ["OBJECT_COUNT"], interval=60)
+    assert counts == {("OBJECT_COUNT", 0, "A", "car"): 2, ("OBJECT_COUNT", 60, "B", "bus"): 1}
+
+
+def test_aggregate_logs_merges_files(tmp_path):
+    paths = [str(tmp_path / "job_1.log"), str(tmp_path / "job_2.log.gz")]
+    _write_log(paths[0], [(10, _object_count("A", "car"))])
+    _write_log(paths[1], [(10, _object_count("A", "car")), (10, _object_count("A", "bus"))])
+    rows = get_rows(aggregate_logs(paths, ["OBJECT_COUNT"], processes=2))
+    assert rows == [
+        {"label": "OBJECT_COUNT", "interval_start": None, "line": "A", "class": "bus", "count": 1},
+        {"label": "OBJECT_COUNT", "interval_start": None, "line": "A", "class": "car", "count": 2},
+    ]
@@ -0,0 +1,17 @@
+'''
+Test the counting loop.
+'''
+
+import os
+import settings
+
+
+def test_checkpoint_is_removed_at_the_end_of_the_video(synthetic_video, tmp_path, monkeypatch):
+    import main
+
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    monkeypatch.setattr(settings, 'CHECKPOINT_PATH', checkpoint_path)
+    monkeypatch.setattr(settings, 'CHECKPOINT_INTERVAL', 0)
+    object_counter = main.run()
+    assert object_counter.num_frames_processed == synthetic_video['num_frames']
+    assert not os.path.exists(checkpoint_path), 'a finished video leaves no checkpoint to resume'
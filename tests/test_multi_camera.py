@@ -0,0 +1,32 @@
+'''
+Test counting several cameras in one process.
+'''
+
+import settings
+
+
+def test_cameras_are_timed_separately(synthetic_video, monkeypatch):
+    import multi_camera
+
+    monkeypatch.setattr(settings, 'ENABLE_STAGE_TIMERS', True)
+    cameras = [
+        {'label': label, 'video': synthetic_video['path'], 'counting_lines': settings.COUNTING_LINES}
+        for label in ('north', 'south')
+    ]
+    result = multi_camera.run(cameras, 2, 0.01)
+    north, south = result['cameras']
+    assert north['counts'] == south['counts'], 'cameras with the same video count the same'
+    for camera in (north, south):
+        assert camera['frames_processed'] == synthetic_video['num_frames']
+        assert camera['stages']['tracking']['count'] == synthetic_video['num_frames'], (
+            'each camera is timed on its own'
+        )
+
+
+def test_failing_camera_is_reported(synthetic_video, monkeypatch):
+    import multi_camera
+
+    monkeypatch.setattr(settings, 'TRACKER', 'invalid')
+    cameras = [{'label': 'north', 'video': synthetic_video['path'], 'counting_lines': []}]
+    result = multi_camera.run(cameras, 1, 0.01)
+    assert result['cameras'] == [{'label': 'north', 'error': 'SystemExit()'}]
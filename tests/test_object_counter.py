@@ -0,0 +1,77 @@
+'''
+Test ObjectCounter on synthetic scenes.
+'''
+
+import json
+
+
+def test_state_round_trip(scene_counter):
+    detector = scene_counter.detector
+    object_counter = scene_counter.create_object_counter(count_series_bin_seconds=(0.5,))
+    scene_counter.count_frames(object_counter, range(1, 40))
+    assert object_counter.total_count > 0, 'the objects cross the counting lines'
+    # checkpoints are saved as JSON
+    state = json.loads(json.dumps(object_counter.get_state()))
+
+    num_invocations = detector.num_invocations
+    resumed = scene_counter.create_object_counter(39, count_series_bin_seconds=(0.5,), state=state)
+    assert detector.num_invocations == num_invocations + 1, 'detection is run once on resuming'
+    assert resumed.get_counts() == object_counter.get_counts()
+    assert resumed.get_zone_counts() == object_counter.get_zone_counts()
+    assert resumed.num_frames_processed == object_counter.num_frames_processed
+    assert resumed.num_detections == object_counter.num_detections + 1
+    assert resumed.frame_count == object_counter.frame_count
+    assert resumed.count_series[0].get_state() == object_counter.count_series[0].get_state(), (
+        'count series bins are carried over'
+    )
+    resumed_blobs = {blob.id: blob for blob in resumed.blobs}
+    for blob in object_counter.blobs:
+        assert resumed_blobs[blob.id].lines_crossed == blob.lines_crossed, 'blobs are not counted again'
+
+    scene_counter.count_frames(resumed, range(40, 60))
+    assert resumed.total_count >= object_counter.total_count
+
+
+def test_get_blobs_is_a_snapshot(scene_counter):
+    object_counter = scene_counter.create_object_counter()
+    blobs = object_counter.get_blobs()
+    assert blobs
+    object_counter.blobs[0].lines_crossed.append('A')
+    assert 'A' not in blobs[0]['details']['lines_crossed'], 'blobs are copied with their lists'
+
+
+def test_zone_enter_exit_and_dwell(single_object_scene_counter):
+    scene_counter = single_object_scene_counter
+    object_counter = scene_counter.create_object_counter()
+    scene_counter.count_frames(object_counter, range(1, 20))
+    assert object_counter.get_zone_counts() == [
+        {'zone': 'P', 'occupancy': 1, 'entries': 1, 'exits': 0, 'dwell_time': 0.0, 'average_dwell_time': 0.0}
+    ]
+
+    scene_counter.count_frames(object_counter, range(20, 60))
+    (zone,) = object_counter.get_zone_counts()
+    assert (zone['occupancy'], zone['entries'], zone['exits']) == (0, 1, 1)
+    # the centroid leaves the zone when x = 160, at frame (160 - 45) / 4
+    assert abs(zone['dwell_time'] - (160 - 45) / 4 / 30) < 0.2
+    assert zone['average_dwell_time'] == zone['dwell_time']
+
+
+def test_count_aggregates(single_object_scene_counter):
+    scene_counter = single_object_scene_counter
+    object_counter = scene_counter.create_object_counter()
+    scene_counter.count_frames(object_counter, range(1, 20))
+    counts = object_counter.get_counts()
+    assert counts['total_count'] == 0
+    scene_counter.count_frames(object_counter, range(20, 25))
+    assert object_counter.get_counts() is counts, 'counts are only rebuilt after something is counted'
+
+    scene_counter.count_frames(object_counter, range(25, 60))
+    assert object_counter.get_counts() is not counts
+    assert object_counter.get_counts() == {
+        'total_count': 1,
+        'classes': [{'class': 'car', 'count': 1}],
+        'lines': [{'line': 'A', 'count': 0}, {'line': 'B', 'count': 1}],
+        'lines_by_class': [{'line': 'B', 'class': 'car', 'count': 1}],
+    }
+    assert object_counter.class_counts == {'car': 1}
+    assert object_counter.line_counts == {'A': 0, 'B': 1}
@@ -0,0 +1,20 @@
+'''
+Test the multi-process counting pipeline.
+'''
+
+import settings
+
+
+def test_pipeline_counts_as_main(synthetic_video):
+    import main
+    import pipeline
+
+    assert settings.DI > 1
+    expected = main.run()
+    assert expected.num_frames_processed == synthetic_video['num_frames']
+    assert expected.total_count > 0, 'the objects cross the counting lines'
+
+    counter = pipeline.run()
+    assert counter.num_frames_processed == expected.num_frames_processed
+    assert counter.num_detections == expected.num_detections
+    assert counter.get_counts() == expected.get_counts()
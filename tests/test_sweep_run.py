@@ -0,0 +1,30 @@
+'''
+Test the parameter sweep.
+'''
+
+import settings
+
+
+def test_failing_variant_does_not_hold_up_the_others(synthetic_video):
+    import main
+    import sweep
+
+    variants = [
+        {
+            'label': label,
+            'di': di,
+            'mcdf': settings.MCDF,
+            'mctf': settings.MCTF,
+            'tracker': tracker,
+            'counting_lines': settings.COUNTING_LINES,
+        }
+        for label, di, tracker in (('mil', 5, 'mil'), ('kcf', 5, 'kcf'), ('kcf_10', 10, 'kcf'))
+    ]
+    failing, kcf, kcf_10 = sweep.run(variants, 2)['variants']
+    assert 'error' in failing, 'the tracker is invalid'
+    for result in (kcf, kcf_10):
+        assert 'error' not in result
+        assert result['frames_processed'] == synthetic_video['num_frames']
+    expected = main.run()
+    assert kcf['counts'] == expected.get_counts()
+    assert kcf['detections'] == expected.num_detections
@@ -0,0 +1,14 @@
+import os
+from util.checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint
+
+
+def test_save_and_load_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoints" / "job.json")
+    assert load_checkpoint(path) is None, "there's no checkpoint before one is saved"
+    save_checkpoint(path, {"position": 1.5, "counts": {"A": {"car": 2}}})
+    save_checkpoint(path, {"position": 3.0, "counts": {"A": {"car": 3}}})
+    assert load_checkpoint(path) == {"position": 3.0, "counts": {"A": {"car": 3}}}, "last checkpoint is kept"
+    assert os.listdir(tmp_path / "checkpoints") == ["job.json"], "no temporary files are left behind"
+    remove_checkpoint(path)
+    remove_checkpoint(path)
+    assert load_checkpoint(path) is None
@@ -0,0 +1,83 @@
+import json
+from util.count_series import CountSeries
+
+
+def test_count_series_flushes_complete_bins():
+    flushed = []
+    series = CountSeries(60, 4, ["A", "B"], flushed.append)
+    series.advance(0.5)
+    series.add("A", "car")
+    series.add("A", "car")
+    series.advance(59.9)
+    series.add("B", "bus")
+    assert flushed == [], "no bin is flushed before it is complete"
+
+    series.advance(185)
+    assert len(flushed) == 3, "bins up to the current one are flushed"
+    assert flushed[0]["start"] == 0 and flushed[0]["end"] == 60
+    assert flushed[0]["total_count"] == 3
+    assert {"line": "A", "class": "car", "count": 2} in flushed[0]["lines_by_class"]
+    assert {"line": "B", "class": "bus", "count": 1} in flushed[0]["lines_by_class"]
+    assert flushed[1]["total_count"] == 0, "empty bins are flushed too"
+
+    series.add("A", "bus")
+    series.flush()
+    assert flushed[-1]["partial"] is True, "the bin being filled is flushed as partial"
+    assert flushed[-1]["total_count"] == 1
+
+
+def test_count_series_is_bounded():
+    series = CountSeries(1, 3, ["A"])
+    for second in range(10):
+        series.advance(second)
+        series.add("A", "car", second)
+    starts, counts = series.get_series()
+    assert list(starts) == [7, 8, 9], "only the most recent bins are kept"
+    assert list(counts[:, 0, 0]) == [7, 8, 9]
+
+
+def test_count_series_restarts_when_time_goes_backwards():
+    flushed = []
+    series = CountSeries(1, 3, ["A"], flushed.append)
+    series.advance(5)
+    series.add("A", "car")
+    series.advance(1)
+    assert flushed[-1]["start"] == 5 and flushed[-1]["partial"] is True
+    starts, _ = series.get_series()
+    assert list(starts) == [1], "a new series is started"
+
+
+def test_count_series_marks_skipped_bins():
+    flushed = []
+    series = CountSeries(1, 3, ["A"], flushed.append)
+    series.advance(5)
+    series.add("A", "car")
+    series.advance(20.5)
+    assert len(flushed) == 2
+    assert flushed[0]["start"] == 5 and flushed[0]["partial"] is False, "the bin before the jump is complete"
+    assert flushed[0]["total_count"] == 1
+    assert flushed[1]["gap"] is True, "the bins jumped over are flushed as one gap"
+    assert (flushed[1]["start"], flushed[1]["end"], flushed[1]["total_count"]) == (6, 20, 0)
+    starts, _ = series.get_series()
+    assert list(starts) == [20], "a new series is started"
+
+
+def test_count_series_state_round_trip():
+    series = CountSeries(1, 3, ["A", "B"])
+    for second in range(5):
+        series.advance(second)
+        series.add("A", "car")
+        series.add("B", "bus", second)
+    state = json.loads(json.dumps(series.get_state()))
+
+    flushed = []
+    resumed = CountSeries(1, 2, ["B", "A"], flushed.append)
+    # the resumed series has fewer bins, and lines in another order
+    resumed.restore_state(state)
+    start_times, counts = resumed.get_series()
+    assert list(start_times) == [3, 4], "the most recent bins are kept"
+    assert counts[-1, resumed.line_indices["B"], resumed.class_indices["bus"]] == 4
+    resumed.advance(5)
+    assert flushed[0]["start"] == 4 and flushed[0]["total_count"] == 5, (
+        "the bin being filled is carried over"
+    )
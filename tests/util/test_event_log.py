@@ -0,0 +1,62 @@
+import json
+import logging
+from util.event_log import EventLogHandler, read_events
+from util.logger import CustomJsonFormatter, MetaFilter
+
+
+def _log_events(tmp_path):
+    logger = logging.getLogger('test_event_log')
+    logger.setLevel(logging.DEBUG)
+    logger.addFilter(MetaFilter())
+    event_handler = EventLogHandler(str(tmp_path / 'job.events'))
+    json_handler = logging.FileHandler(str(tmp_path / 'job.log'))
+    json_handler.setFormatter(CustomJsonFormatter('%(created) %(logger) %(level) %(message)'))
+    logger.addHandler(event_handler)
+    logger.addHandler(json_handler)
+    for i in range(3):
+        logger.debug('Object tracker updated.', extra={'meta': {
+            'label': 'TRACKER_UPDATE', 'object_id': str(i), 'bounding_box': (i, 2, 30, 40), 'centroid': (15, 22),
+        }})
+        logger.info('Object counted.', extra={'meta': {
+            'label': 'OBJECT_COUNT', 'id': str(i), 'type': 'car', 'counting_line': 'A', 'counted_at': 1.5 + i,
+        }})
+    logger.info('Processing ended.', extra={'meta': {'label': 'END_PROCESS', 'counts': {'total_count': 3}}})
+    logger.info('No meta.')
+    for handler in (event_handler, json_handler):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_read_events_matches_json_log(tmp_path):
+    _log_events(tmp_path)
+    with open(tmp_path / 'job.log') as json_log:
+        json_events = [json.loads(line) for line in json_log]
+    events = list(read_events(str(tmp_path / 'job.events')))
+    assert events == json_events, 'events are read back exactly as they are written to the JSON log'
+
+
+def test_read_events_filters_by_label_and_time(tmp_path):
+    _log_events(tmp_path)
+    events = list(read_events(str(tmp_path / 'job.events'), labels=['OBJECT_COUNT']))
+    assert [event['meta']['id'] for event in events] == ['0', '1', '2']
+
+    start = events[1]['created']
+    events = list(read_events(str(tmp_path / 'job.events'), labels=['OBJECT_COUNT'], start=start))
+    assert [event['meta']['id'] for event in events] == ['1', '2']
+
+
+def test_event_log_can_be_appended_to(tmp_path):
+    _log_events(tmp_path)
+    _log_events(tmp_path)
+    events = list(read_events(str(tmp_path / 'job.events'), labels=['TRACKER_UPDATE']))
+    assert len(events) == 6, 'events from both runs are read'
+
+
+def test_truncated_record_ends_events(tmp_path):
+    _log_events(tmp_path)
+    path = tmp_path / 'job.events'
+    events = list(read_events(str(path)))
+    data = path.read_bytes()
+    for cut in (1, 4, 10):
+        path.write_bytes(data[:-cut])
+        assert list(read_events(str(path))) == events[:-1], 'the last, truncated event is left out'
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from util.flowmap import FlowField
+
+
+def test_add_steps():
+    flow_field = FlowField((40, 30), 10)
+    assert flow_field.shape == (3, 4), "grid has a cell per 10 pixels of frame"
+    flow_field.add_steps(
+        [(2, 5), (2, 5), (30, 20)], [(6, 5), (10, 5), (30, 28)], [1, 2, 2]
+    )
+    assert flow_field.count[0, 0] == 2, "steps are binned by their midpoint"
+    assert flow_field.count[2, 3] == 1, "step from (30, 20) to (30, 28) is in cell (2, 3)"
+    assert np.allclose(
+        flow_field.get_mean_direction()[0, 0], (1, 0)
+    ), "mean direction of steps to the right is (1, 0)"
+    assert np.allclose(
+        flow_field.get_mean_speed()[0, 0], 4
+    ), "speed is distance over duration"
+    assert np.allclose(
+        flow_field.get_mean_direction()[1, 1], (0, 0)
+    ), "cells without steps have no direction"
+
+
+def test_opposite_steps_cancel_out():
+    flow_field = FlowField((40, 30), 10)
+    flow_field.add_steps([(2, 5), (8, 5)], [(8, 5), (2, 5)])
+    assert np.allclose(flow_field.get_mean_direction()[0, 0], (0, 0))
+    assert np.allclose(flow_field.get_mean_speed()[0, 0], 6)
+
+
+def test_save_load_and_merge(tmp_path):
+    flow_field = FlowField((40, 30), 10)
+    flow_field.add_steps([(2, 5)], [(6, 5)])
+    path = tmp_path / "flowmap.npz"
+    flow_field.save(path)
+    loaded = FlowField.load(path)
+    assert loaded.frame_size == (40, 30) and loaded.cell_size == 10
+    flow_field.merge(loaded)
+    assert flow_field.count[0, 0] == 2, "merged flow fields are added up"
+    assert np.allclose(flow_field.get_mean_direction()[0, 0], (1, 0))
+    with pytest.raises(ValueError):
+        flow_field.merge(FlowField((40, 30), 5))
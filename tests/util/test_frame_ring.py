@@ -0,0 +1,104 @@
+import multiprocessing
+import threading
+import numpy as np
+from util.frame_ring import FrameRing
+
+
+def read_all(ring, reader_index, results):
+    reader = ring.get_reader(reader_index)
+    frames = []
+    item = reader.get()
+    while item is not None:
+        frame_index, timestamp, frame = item
+        assert (frame == frame_index).all(), "frame is read intact"
+        frames.append((frame_index, timestamp))
+        reader.release()
+        item = reader.get()
+    results.put((reader_index, frames))
+
+
+def test_readers_get_every_frame_in_order():
+    context = multiprocessing.get_context("fork")
+    ring = FrameRing((24, 32, 3), np.uint8, 4, 2, context)
+    results = context.Queue()
+    readers = [
+        context.Process(target=read_all, args=(ring, reader_index, results))
+        for reader_index in range(2)
+    ]
+    for reader in readers:
+        reader.start()
+    for frame_index in range(50):
+        ring.put(np.full((24, 32, 3), frame_index, np.uint8), frame_index, frame_index / 10)
+    ring.put_end()
+    frames = dict(results.get(timeout=10) for _ in readers)
+    for reader in readers:
+        reader.join()
+    ring.close()
+    expected = [(frame_index, frame_index / 10) for frame_index in range(50)]
+    assert frames == {0: expected, 1: expected}
+
+
+def test_writer_waits_for_slowest_reader():
+    ring = FrameRing((2, 2), np.uint8, 2, 2)
+    fast_reader, slow_reader = ring.get_reader(0), ring.get_reader(1)
+    ring.put(np.zeros((2, 2), np.uint8), 0, 0)
+    ring.put(np.ones((2, 2), np.uint8), 1, 0)
+    for _ in range(2):
+        fast_reader.get()
+        fast_reader.release()
+
+    writer = threading.Thread(target=ring.put, args=(np.full((2, 2), 2, np.uint8), 2, 0))
+    writer.start()
+    writer.join(timeout=0.2)
+    assert writer.is_alive(), "slots are not reused while a reader holds them"
+    _, _, frame = slow_reader.get()
+    assert (frame == 0).all()
+    slow_reader.release()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    _, _, frame = slow_reader.get()
+    assert (frame == 1).all(), "unreleased frames are not overwritten"
+    slow_reader.release()
+    del frame
+    ring.close()
+
+
+def test_closed_reader_does_not_hold_up_writer():
+    ring = FrameRing((2, 2), np.uint8, 2, 2)
+    stopped_reader, reader = ring.get_reader(0), ring.get_reader(1)
+    results = []
+
+    def read():
+        item = reader.get()
+        while item is not None:
+            results.append(item[0])
+            reader.release()
+            item = reader.get()
+
+    def stop():
+        stopped_reader.get()
+        stopped_reader.close()
+
+    threads = [threading.Thread(target=read), threading.Thread(target=stop)]
+    for thread in threads:
+        thread.start()
+    for frame_index in range(10):
+        ring.put(np.zeros((2, 2), np.uint8), frame_index, 0)
+    ring.put_end()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == list(range(10))
+    ring.close()
+
+
+def test_put_times_out_when_no_slot_is_free():
+    ring = FrameRing((2, 2), np.uint8, 1, 1)
+    assert ring.put(np.zeros((2, 2), np.uint8), 0, 0, timeout=0.01)
+    assert not ring.put(np.ones((2, 2), np.uint8), 1, 0, timeout=0.01), "the reader holds the only slot"
+    assert not ring.put_end(timeout=0.01)
+    reader = ring.get_reader(0)
+    assert reader.get()[0] == 0
+    reader.release()
+    assert ring.put_end(timeout=0.01)
+    assert reader.get() is None
+    ring.close()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from util.heatmap import Heatmap
+
+
+def test_add_points():
+    heatmap = Heatmap((40, 30), 10)
+    assert heatmap.grid.shape == (3, 4), "grid has a cell per 10 pixels of frame"
+    heatmap.add_points([(5, 5), (6, 7), (35, 25), (100, -10)])
+    assert heatmap.grid[0, 0] == 2, "points in the same cell are added up"
+    assert heatmap.grid[2, 3] == 1, "point (35, 25) is in cell (2, 3)"
+    assert heatmap.grid[0, 3] == 1, "points outside the frame are clamped"
+    assert heatmap.grid.sum() == 4, "every point is counted once"
+
+
+def test_add_boxes():
+    heatmap = Heatmap((40, 30), 10)
+    heatmap.add_boxes([(5, 5, 10, 10), (0, 0, 40, 30)])
+    expected = np.ones((3, 4))
+    expected[0:2, 0:2] += 1
+    assert np.array_equal(heatmap.grid, expected), "every cell a box covers is counted"
+
+
+def test_merge(tmp_path):
+    heatmap = Heatmap((40, 30), 10)
+    heatmap.add_points([(5, 5)])
+    path = tmp_path / "heatmap.npy"
+    heatmap.save(path)
+    heatmap.merge(Heatmap.load(path, (40, 30), 10))
+    assert heatmap.grid[0, 0] == 2, "merged heatmaps are added up"
+    with pytest.raises(ValueError):
+        heatmap.merge(Heatmap((40, 30), 5))
+
+
+def test_render():
+    heatmap = Heatmap((45, 30), 10)
+    background = np.zeros((30, 45, 3), dtype=np.uint8)
+    assert np.array_equal(
+        heatmap.render(background), background
+    ), "an empty heatmap leaves the background as is"
+    heatmap.add_points([(5, 5)])
+    image = heatmap.render(background)
+    assert image.shape == (30, 45, 3), "heatmap is rendered at frame size"
+    assert image[5, 5].any() and not image[25, 25].any(), "only seen cells are colored"
@@ -0,0 +1,75 @@
+import os
+import threading
+import numpy as np
+import settings
+from util.image import CropWriter, get_crop_writer, close_crop_writer
+
+
+def test_crop_writer_saves_images(tmp_path):
+    crop_writer = CropWriter(str(tmp_path), quality=90)
+    image = np.full((20, 30, 3), 127, dtype=np.uint8)
+    path = crop_writer.submit(image, 'obj')
+    image[:] = 0  # the crop writer keeps its own copy
+    crop_writer.close()
+    assert path == os.path.join(str(tmp_path), 'obj_0.jpg')
+    assert os.path.isfile(path), 'image is saved'
+    assert crop_writer.get_num_pending() == 0, 'no images are pending once saved'
+
+
+def test_crop_writer_skips_empty_images(tmp_path):
+    crop_writer = CropWriter(str(tmp_path))
+    assert crop_writer.submit(np.zeros((0, 10, 3), dtype=np.uint8), 'obj') is None
+    crop_writer.close()
+
+
+def test_crop_writer_drops_images_when_busy(tmp_path):
+    crop_writer = CropWriter(str(tmp_path), max_pending=1)
+    crop_writer._pending.acquire()
+    assert crop_writer.submit(np.zeros((10, 10, 3), dtype=np.uint8), 'obj') is None
+    crop_writer._pending.release()
+    crop_writer.close()
+
+
+def test_get_crop_writer_creates_one_crop_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'LOG_FILES_DIRECTORY', str(tmp_path))
+    crop_writers = []
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        crop_writers.append(get_crop_writer())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(crop_writer is crop_writers[0] for crop_writer in crop_writers), 'threads share a crop writer'
+    close_crop_writer()
+
+
+def test_crop_writer_counts_failed_images(tmp_path):
+    directory = tmp_path / 'images'
+    crop_writer = CropWriter(str(directory))
+    directory.rmdir()  # images can't be saved in a directory that's gone
+    crop_writer.submit(np.full((10, 10, 3), 127, dtype=np.uint8), 'obj')
+    crop_writer.close()
+    assert crop_writer.num_failed == 1
+    assert crop_writer.get_num_pending() == 0, 'failed images are not left pending'
+
+
+def test_crop_writer_counts_images_submitted_from_several_threads(tmp_path):
+    crop_writer = CropWriter(str(tmp_path), max_pending=1000)
+    image = np.full((4, 4, 3), 127, dtype=np.uint8)
+
+    def submit():
+        for _ in range(100):
+            crop_writer.submit(image, 'obj')
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    crop_writer.close()
+    assert crop_writer.num_submitted == crop_writer.num_written == 400
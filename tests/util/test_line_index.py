@@ -0,0 +1,35 @@
+import random
+from counter import _has_crossed_counting_line
+from util.line_index import CountingLineIndex
+
+
+def test_query_returns_nearby_lines():
+    counting_lines = [
+        {"label": "A", "line": [(0, 10), (100, 10)]},
+        {"label": "B", "line": [(500, 500), (600, 600)]},
+    ]
+    index = CountingLineIndex(counting_lines, cell_size=64)
+    assert [l["label"] for l in index.query((20, 0, 20, 20))] == ["A"]
+    assert [l["label"] for l in index.query((540, 540, 10, 10))] == ["B"]
+    assert index.query((300, 300, 10, 10)) == [], "no line is near box (300, 300, 10, 10)"
+
+
+def test_query_finds_every_crossed_line():
+    rng = random.Random(0)
+    counting_lines = [
+        {
+            "label": str(i),
+            "line": [
+                (rng.randint(0, 1920), rng.randint(0, 1080)),
+                (rng.randint(0, 1920), rng.randint(0, 1080)),
+            ],
+        }
+        for i in range(50)
+    ]
+    index = CountingLineIndex(counting_lines, cell_size=64)
+    for _ in range(200):
+        bbox = (rng.randint(0, 1800), rng.randint(0, 1000), rng.randint(1, 120), rng.randint(1, 80))
+        crossed = [l for l in counting_lines if _has_crossed_counting_line(bbox, l["line"])]
+        candidates = index.query(bbox)
+        assert all(l in candidates for l in crossed), "crossed lines are always candidates"
+        assert candidates == [l for l in counting_lines if l in candidates], "lines keep their order"
@@ -1,7 +1,8 @@
 import logging
+import queue
 from unittest.mock import patch
 from dotenv import load_dotenv
-from util.logger import init_logger, get_logger
+from util.logger import init_logger, get_logger, is_log_enabled, BatchQueueListener, BoundedQueueHandler
 
 
 load_dotenv()
@@ -18,3 +19,66 @@ def test_init_logger():
 def test_get_logger():
     logger = get_logger()
     assert logger == logging.getLogger('job_123'), 'logger instance is retrieved'
+
+@patch.dict('os.environ', {'JOB_ID': job_id})
+def test_is_log_enabled():
+    logger = get_logger()
+    logger.setLevel(logging.INFO)
+    assert not is_log_enabled(logger, logging.DEBUG, 'FRAME_PROCESS'), 'debug events are skipped at level info'
+    assert is_log_enabled(logger, logging.INFO, 'OBJECT_COUNT'), 'info events are logged at level info'
+
+@patch.dict('os.environ', {'JOB_ID': job_id})
+@patch.dict('settings.LOG_SAMPLING_RATES', {'FRAME_PROCESS': 3})
+def test_is_log_enabled_with_sampling():
+    logger = get_logger()
+    logger.setLevel(logging.DEBUG)
+    enabled = [is_log_enabled(logger, logging.DEBUG, 'FRAME_PROCESS') for _ in range(6)]
+    assert enabled.count(True) == 2, 'one in every 3 sampled events is logged'
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.num_flushes = 0
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def flush(self):
+        self.num_flushes += 1
+
+def test_batch_queue_listener():
+    log_queue = queue.Queue(100)
+    handler = ListHandler()
+    listener = BatchQueueListener(log_queue, [handler], batch_size=10)
+    queue_handler = BoundedQueueHandler(log_queue)
+    for i in range(25):
+        log_queue.put(logging.makeLogRecord({'msg': str(i), 'levelno': logging.INFO}))
+    listener.start()
+    queue_handler.handle(logging.makeLogRecord({'msg': 'last', 'levelno': logging.INFO}))
+    listener.stop()
+    assert [record.msg for record in handler.records] == [str(i) for i in range(25)] + ['last'], 'every record is handled in order'
+    assert handler.num_flushes < len(handler.records), 'records are flushed in batches'
+
+def test_bounded_queue_handler_drops_records_when_full():
+    queue_handler = BoundedQueueHandler(queue.Queue(2), overflow='drop')
+    for i in range(5):
+        queue_handler.handle(logging.makeLogRecord({'msg': str(i), 'levelno': logging.INFO}))
+    assert queue_handler.num_dropped == 3, 'records that do not fit in the queue are dropped'
+
+@patch.dict('os.environ', {'JOB_ID': job_id})
+def test_is_log_enabled_by_handlers():
+    logger = get_logger()
+    logger.setLevel(logging.DEBUG)
+    handler = ListHandler()
+    handler.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        assert not is_log_enabled(logger, logging.DEBUG, 'FRAME_PROCESS'), 'debug events are skipped when no handler emits them'
+        assert is_log_enabled(logger, logging.INFO, 'OBJECT_COUNT')
+        handler.setLevel(logging.DEBUG)
+        assert is_log_enabled(logger, logging.DEBUG, 'FRAME_PROCESS'), 'the level of handlers is read on every check'
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
@@ -0,0 +1,50 @@
+import urllib.request
+from util.metrics import MetricsServer, Rate
+from util.timing import Histogram
+
+
+def test_metrics_server_renders_metrics():
+    counts = {"A": {"car": 2, 'say "hi"': 1}}
+    histogram = Histogram(bounds=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    metrics_server = MetricsServer("127.0.0.1", 0)
+    try:
+        metrics_server.add("frames_total", "counter", "Frames.", lambda: 10)
+        metrics_server.add(
+            "counted_total",
+            "counter",
+            "Counts.",
+            lambda: [
+                ({"line": line, "class": class_name}, count)
+                for line, class_counts in counts.items()
+                for class_name, count in class_counts.items()
+            ],
+        )
+        metrics_server.add(
+            "latency_seconds", "histogram", "Latency.", lambda: [({"stage": "detector"}, histogram)]
+        )
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics_server.port}/metrics", timeout=10) as response:
+            text = response.read().decode("utf-8")
+    finally:
+        metrics_server.close()
+
+    lines = text.splitlines()
+    assert "# TYPE frames_total counter" in lines
+    assert "frames_total 10" in lines
+    assert 'counted_total{line="A",class="car"} 2' in lines
+    assert 'counted_total{line="A",class="say \\"hi\\""} 1' in lines, "label values are escaped"
+    assert 'latency_seconds_bucket{stage="detector",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="detector",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="detector",le="+Inf"} 3' in lines, "buckets are cumulative"
+    assert 'latency_seconds_count{stage="detector"} 3' in lines
+    assert 'latency_seconds_sum{stage="detector"} 5.55' in lines
+
+
+def test_rate():
+    value = [0]
+    rate = Rate(lambda: value[0])
+    value[0] = 100
+    assert rate() > 0, "rate is positive while the counter increases"
+    assert rate() == 0, "rate is 0 while the counter stays the same"
@@ -0,0 +1,29 @@
+import numpy as np
+import cv2
+from util.detection_roi import draw_roi
+from util.overlay import StaticOverlay
+
+
+def test_static_overlay_matches_drawing_on_each_frame():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    droi = [(40, 40), (280, 40), (300, 220), (20, 220)]
+    counting_lines = [{"label": "A", "line": [(60, 120), (260, 120)]}]
+
+    expected = frame.copy()
+    cv2.line(expected, (60, 120), (260, 120), (0, 0, 255), 3)
+    cv2.putText(expected, "A", (60, 155), cv2.FONT_HERSHEY_DUPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+    expected = draw_roi(expected, droi)
+
+    overlay = StaticOverlay(frame.shape, droi, True, counting_lines, [])
+    output = overlay.apply(frame.copy())
+    line_and_roi = np.abs(output.astype(int) - expected.astype(int))
+    # the label is anti-aliased against the frame rather than black, so allow small differences around it
+    assert np.percentile(line_and_roi, 99.5) <= 1, "overlay matches drawing the HUD on the frame"
+    assert (output[:30, :] == frame[:30, :]).all(), "pixels outside the overlay are unchanged"
+
+
+def test_static_overlay_without_droi_or_lines_leaves_frame_unchanged():
+    frame = np.full((10, 10, 3), 7, dtype=np.uint8)
+    overlay = StaticOverlay(frame.shape, [(0, 0), (9, 0), (9, 9), (0, 9)], False, [], [])
+    assert (overlay.apply(frame.copy()) == frame).all()
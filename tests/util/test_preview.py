@@ -0,0 +1,30 @@
+import threading
+import time
+import urllib.request
+import numpy as np
+import cv2
+from util.preview import PreviewServer
+
+
+def test_preview_serves_snapshots():
+    preview = PreviewServer("127.0.0.1", 0, max_fps=100, frame_size=(32, 24))
+    try:
+        assert not preview.wants_frame(), "no frames are wanted while no one is watching"
+
+        def publish_when_wanted():
+            for _ in range(500):
+                if preview.wants_frame():
+                    preview.publish(np.full((48, 64, 3), 200, dtype=np.uint8))
+                    return
+                time.sleep(0.01)
+
+        publisher = threading.Thread(target=publish_when_wanted)
+        publisher.start()
+        with urllib.request.urlopen(f"http://127.0.0.1:{preview.port}/snapshot.jpg", timeout=10) as response:
+            jpeg = response.read()
+        publisher.join()
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape == (24, 32, 3), "snapshot is resized to the preview size"
+        assert not preview.wants_frame(), "no frames are wanted once the client has left"
+    finally:
+        preview.close()
@@ -0,0 +1,43 @@
+import json
+import os
+import pstats
+import signal
+import tracemalloc
+import pytest
+from util.profiling import SignalProfiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    handlers = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    profiler = SignalProfiler(str(tmp_path), duration=60, get_state=lambda: {"blobs": 3})
+    assert profiler.install(), "handlers are installed on the main thread"
+    yield profiler
+    signal.signal(signal.SIGUSR1, handlers[0])
+    signal.signal(signal.SIGUSR2, handlers[1])
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_profile_is_toggled_by_sigusr1(profiler, tmp_path):
+    os.kill(os.getpid(), signal.SIGUSR1)
+    profiler.tick()
+    sum(i * i for i in range(10000))
+    os.kill(os.getpid(), signal.SIGUSR1)
+    profiler.tick()
+    [path] = tmp_path.glob("*.pstats")
+    assert pstats.Stats(str(path)).total_calls > 0, "profile of the loop is written"
+
+
+def test_memory_report_on_sigusr2(profiler, tmp_path):
+    os.kill(os.getpid(), signal.SIGUSR2)
+    profiler.tick()
+    os.kill(os.getpid(), signal.SIGUSR2)
+    profiler.tick()
+    first, second = [
+        json.loads(path.read_text()) for path in sorted(tmp_path.glob("*_memory.json"))
+    ]
+    assert first["state"] == {"blobs": 3}, "report includes the job's state"
+    assert first["traced_memory"] is None, "first report starts tracing"
+    assert second["traced_memory"]["current"] > 0
+    assert "top_allocations" in second and "top_growth" in second
@@ -0,0 +1,37 @@
+from util.recorder import VideoRecorder
+
+
+class FakeWriter:
+    def __init__(self):
+        self.frames = []
+        self.is_released = False
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def release(self):
+        self.is_released = True
+
+
+def test_recorder_keeps_source_timing():
+    writer = FakeWriter()
+    recorder = VideoRecorder(writer, fps=10)
+    recorder.write("a", 0.0)
+    recorder.write("b", 0.1)
+    recorder.write("c", 0.4)  # frames for 0.2 and 0.3 are missing
+    recorder.write("d", 0.4)  # same slot as the previous frame
+    recorder.write("e", 0.5)
+    recorder.close()
+    assert writer.frames == ["a", "b", "b", "b", "c", "e"], "gaps are filled with the previous frame"
+    assert recorder.num_duplicated == 2
+    assert recorder.num_late == 1
+    assert writer.is_released, "video writer is released"
+
+
+def test_recorder_limits_duplicates():
+    writer = FakeWriter()
+    recorder = VideoRecorder(writer, fps=10, max_duplicates=2)
+    recorder.write("a", 0.0)
+    recorder.write("b", 10.0)
+    recorder.close()
+    assert writer.frames == ["a", "a", "a", "b"]
@@ -0,0 +1,59 @@
+from util.shards import get_shards, merge_shard_events, get_event_counts
+
+
+def _event(timestamp, line="A", class_name="car"):
+    return {"timestamp": timestamp, "line": line, "class": class_name}
+
+
+def test_get_shards():
+    shards = get_shards(100, 4, 5)
+    assert [(shard["start"], shard["end"]) for shard in shards] == [
+        (0, 25), (25, 50), (50, 75), (75, 100)
+    ]
+    assert (shards[0]["process_start"], shards[0]["process_end"]) == (0, 30)
+    assert (shards[1]["process_start"], shards[1]["process_end"]) == (20, 55)
+    assert shards[3]["process_end"] == 100, "processing ranges end with the video"
+
+
+def test_merge_keeps_owned_events():
+    shards = get_shards(100, 2, 5)
+    events = merge_shard_events(
+        shards, [[_event(10), _event(52)], [_event(48), _event(90)]], 5, 1
+    )
+    assert [event["timestamp"] for event in events] == [10, 90], "events in warm-up ranges are left out"
+
+
+def test_merge_counts_boundary_crossings_once():
+    shards = get_shards(100, 2, 5)
+    events = merge_shard_events(
+        shards,
+        [
+            [_event(49.8), _event(50.1, "B"), _event(46)],
+            [_event(50.2), _event(49.9, "B"), _event(53, class_name="bus")],
+        ],
+        5,
+        1,
+    )
+    assert [(event["timestamp"], event["line"]) for event in events] == [
+        (46, "A"),
+        (49.8, "A"),  # counted by both shards on either side of the boundary
+        (50.1, "B"),  # counted by both shards on the wrong side of the boundary
+        (53, "A"),
+    ]
+    assert get_event_counts(events)["total_count"] == 4
+
+
+def test_get_event_counts():
+    counts = get_event_counts([_event(1), _event(2, "B"), _event(3, class_name="bus")])
+    assert counts["total_count"] == 3
+    assert {"class": "car", "count": 2} in counts["classes"]
+    assert {"line": "A", "count": 2} in counts["lines"]
+    assert {"line": "A", "class": "bus", "count": 1} in counts["lines_by_class"]
+
+
+def test_get_event_counts_of_lines_not_crossed():
+    counts = get_event_counts([_event(1)], ["A", "B"])
+    assert counts["lines"] == [{"line": "A", "count": 1}, {"line": "B", "count": 0}]
+    assert get_event_counts([], ["A"])["lines"] == [{"line": "A", "count": 0}], (
+        "lines are counted as ObjectCounter does even without events"
+    )
@@ -0,0 +1,61 @@
+import pytest
+from util.sweep import get_variants, get_detection_frames_count, get_count_errors
+
+DEFAULTS = {
+    "di": 10,
+    "mcdf": 2,
+    "mctf": 3,
+    "tracker": "kcf",
+    "counting_lines": [{"label": "A", "line": [(0, 10), (100, 10)]}],
+}
+
+
+def test_get_variants():
+    spec = {
+        "variants": [{"label": "baseline"}],
+        "grid": {"di": [5, 10], "tracker": ["kcf", "csrt"]},
+    }
+    variants = get_variants(spec, DEFAULTS)
+    assert len(variants) == 5
+    assert variants[0] == {**DEFAULTS, "label": "baseline"}, "unset parameters default"
+    assert [(variant["di"], variant["tracker"]) for variant in variants[1:]] == [
+        (5, "kcf"),
+        (5, "csrt"),
+        (10, "kcf"),
+        (10, "csrt"),
+    ]
+    assert variants[1]["label"] == "variant_1"
+
+
+def test_get_variants_normalizes_counting_lines():
+    spec = {"variants": [{"counting_lines": [{"label": "B", "line": [[0, 20], [100, 20]]}]}]}
+    assert get_variants(spec, DEFAULTS)[0]["counting_lines"] == [
+        {"label": "B", "line": [(0, 20), (100, 20)]}
+    ]
+
+
+def test_get_variants_rejects_unknown_parameters():
+    with pytest.raises(ValueError):
+        get_variants({"grid": {"droi": [[]]}}, DEFAULTS)
+    with pytest.raises(ValueError):
+        get_variants({"variants": [{"label": "a"}, {"label": "a", "di": 5}]}, DEFAULTS)
+
+
+def test_get_variants_rejects_invalid_values():
+    with pytest.raises(ValueError):
+        get_variants({"grid": {"tracker": ["kcf", "mil"]}}, DEFAULTS)
+    with pytest.raises(ValueError):
+        get_variants({"variants": [{"di": 0}]}, DEFAULTS)
+
+
+def test_get_detection_frames_count():
+    assert get_detection_frames_count(30, [10]) == 3
+    assert get_detection_frames_count(30, [5, 10]) == 6, "frames are detected on once"
+    assert get_detection_frames_count(30, [2, 3]) == 20
+
+
+def test_get_count_errors():
+    assert get_count_errors({"A": 12, "B": 5}, {"A": 10, "C": 3}) == {
+        "lines": {"A": 2, "C": -3},
+        "absolute_error": 5,
+    }
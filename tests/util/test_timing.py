@@ -0,0 +1,77 @@
+import threading
+from util.timing import Histogram, StageTimer, LATENCY_BUCKETS, get_stage_timer, set_thread_stage_timer
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.observe(0.001)
+    for _ in range(10):
+        histogram.observe(0.1)
+    assert histogram.count == 100
+    p50 = histogram.get_percentile(50)
+    assert 0.001 <= p50 < 0.001 * 1.5, "p50 is the bound of the bucket of 1ms"
+    p99 = histogram.get_percentile(99)
+    assert 0.1 <= p99 < 0.1 * 1.5, "p99 is the bound of the bucket of 100ms"
+    histogram.observe(LATENCY_BUCKETS[-1] * 2)
+    assert histogram.get_percentile(100) == LATENCY_BUCKETS[-1] * 2, "overflow is reported as the max"
+    assert Histogram().get_percentile(50) is None, "empty histograms have no percentiles"
+
+
+def test_stage_timer_summary_is_per_interval():
+    stage_timer = StageTimer()
+    for _ in range(3):
+        stage_timer.stop("stage", stage_timer.start())
+    summary = stage_timer.get_summary()
+    assert summary["stage"]["count"] == 3
+    assert set(summary["stage"]) == {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+    assert stage_timer.get_summary() == {}, "stages without new timings are left out"
+    stage_timer.stop("stage", stage_timer.start())
+    assert stage_timer.get_summary()["stage"]["count"] == 1
+    assert stage_timer.get_histograms()["stage"].count == 4, "histograms keep every timing"
+
+
+def test_disabled_stage_timer():
+    stage_timer = StageTimer(enabled=False)
+    stage_timer.stop("stage", stage_timer.start())
+    assert stage_timer.get_histograms() == {}
+    assert stage_timer.get_summary() == {}
+
+
+def test_stage_timer_from_several_threads():
+    stage_timer = StageTimer()
+
+    def time_stages():
+        for _ in range(1000):
+            stage_timer.stop("stage", stage_timer.start())
+
+    threads = [threading.Thread(target=time_stages) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stage_timer.get_histograms()["stage"].count == 4000, "no observation is lost"
+    assert stage_timer.get_summary()["stage"]["count"] == 4000
+
+
+def test_thread_stage_timer():
+    process_stage_timer = get_stage_timer()
+    thread_stage_timers = []
+
+    def time_stages():
+        set_thread_stage_timer(StageTimer())
+        thread_stage_timers.append(get_stage_timer())
+
+    thread = threading.Thread(target=time_stages)
+    thread.start()
+    thread.join()
+    assert thread_stage_timers[0] is not process_stage_timer, "the thread has a stage timer of its own"
+    assert get_stage_timer() is process_stage_timer, "other threads keep the process' stage timer"
+
+
+def test_stage_timer_max_is_per_interval():
+    stage_timer = StageTimer()
+    stage_timer.stop("stage", stage_timer.start() - 0.5)
+    assert stage_timer.get_summary()["stage"]["max_ms"] >= 500
+    stage_timer.stop("stage", stage_timer.start())
+    assert stage_timer.get_summary()["stage"]["max_ms"] < 500, "the max starts over each interval"
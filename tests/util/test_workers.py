@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+import pytest
+from util.workers import get_results, raise_if_exited
+
+
+def test_results_of_workers():
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=results.put, args=(index,)) for index in range(3)]
+    for worker in workers:
+        worker.start()
+    assert sorted(get_results(results, workers)) == [0, 1, 2]
+    for worker in workers:
+        worker.join()
+
+
+def test_worker_exiting_without_results():
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    worker = context.Process(target=os._exit, args=(1,))
+    worker.start()
+    worker.join()
+    with pytest.raises(RuntimeError):
+        raise_if_exited([worker])
+    with pytest.raises(RuntimeError):
+        get_results(results, [worker])
@@ -0,0 +1,21 @@
+from util.zone import create_zone_label_map, get_zone_index
+
+
+def test_create_zone_label_map():
+    counting_zones = [
+        {"label": "P1", "zone": [(0, 0), (9, 0), (9, 9), (0, 9)]},
+        {"label": "P2", "zone": [(20, 20), (29, 20), (29, 29), (20, 29)]},
+    ]
+    label_map = create_zone_label_map(counting_zones, (40, 30))
+    assert label_map.shape == (30, 40), "label map has the frame's height and width"
+    assert label_map[5, 5] == 1, "pixels in the first zone are labelled 1"
+    assert label_map[25, 25] == 2, "pixels in the second zone are labelled 2"
+    assert label_map[15, 15] == 0, "pixels outside every zone are labelled 0"
+
+
+def test_get_zone_index():
+    counting_zones = [{"label": "P1", "zone": [(0, 0), (9, 0), (9, 9), (0, 9)]}]
+    label_map = create_zone_label_map(counting_zones, (40, 30))
+    assert get_zone_index(label_map, (5, 5)) == 0, "point (5, 5) is in zone 0"
+    assert get_zone_index(label_map, (20, 20)) is None, "point (20, 20) is in no zone"
+    assert get_zone_index(label_map, (-5, -5)) == 0, "points outside the frame are clamped"
@@ -3,17 +3,22 @@ Functions for keeping track of detected objects in a video.
 """
 
 import cv2
+import logging
 import settings
 import sys
 
 from detectors import Detector
 from util.blob import Blob
-from util.image import get_base64_image
-from util.logger import get_logger
+from util.image import get_crop_writer
+from util.logger import get_logger, is_log_enabled
+from util.timing import get_stage_timer
 
 
 logger = get_logger()
 
+# tracking algorithms
+TRACKERS = ("csrt", "kcf")
+
 
 def _csrt_create(bounding_box, frame):
     """
@@ -43,7 +48,8 @@ def get_tracker(algorithm, bounding_box, frame):
         return _kcf_create(bounding_box, frame)
 
     logger.error(
-        "Invalid tracking algorithm specified (options: csrt, kcf)",
+        "Invalid tracking algorithm specified (options: %s)",
+        ", ".join(TRACKERS),
         extra={
             "meta": {"label": "INVALID_TRACKING_ALGORITHM"},
         },
@@ -69,8 +75,14 @@ def add_new_blobs(
     """
     Add new blobs or updates existing ones.
     """
+    stage_timer = get_stage_timer()
+    _timer = stage_timer.start()
+    bounding_boxes = detector.get_bounding_boxes(droi_frame)
+    _timer = stage_timer.stop("detector", _timer)
+
     matched_blob_ids = []
-    for box in detector.get_bounding_boxes(droi_frame):
+    num_crops = 0  # number of object images logged for this frame
+    for box in bounding_boxes:
         _tracker = get_tracker(tracker, box.box, frame)
 
         for blob in blobs:
@@ -80,37 +92,48 @@ def add_new_blobs(
                     matched_blob_ids.append(blob.id)
                 blob.update(box.box, box.type, box.confidence, _tracker)
 
-                blob_update_log_meta = {
-                    "label": "BLOB_UPDATE",
+                if is_log_enabled(logger, logging.DEBUG, "BLOB_UPDATE"):
+                    blob_update_log_meta = {
+                        "label": "BLOB_UPDATE",
+                        "object_id": blob.id,
+                        "bounding_box": blob.bounding_box,
+                        "type": blob.type,
+                        "type_confidence": blob.type_confidence,
+                    }
+                    if (
+                        settings.LOG_IMAGES
+                        and num_crops < settings.LOG_IMAGES_MAX_PER_FRAME
+                    ):
+                        num_crops += 1
+                        blob_update_log_meta["image_path"] = get_crop_writer().submit(
+                            blob.get_box_image(frame), blob.id
+                        )
+                    logger.debug("Blob updated.", extra={"meta": blob_update_log_meta})
+                break
+        else:
+            blob = Blob(box.box, box.type, box.confidence, _tracker)
+            blobs.append(blob)
+
+            if is_log_enabled(logger, logging.DEBUG, "BLOB_CREATE"):
+                blog_create_log_meta = {
+                    "label": "BLOB_CREATE",
                     "object_id": blob.id,
                     "bounding_box": blob.bounding_box,
                     "type": blob.type,
                     "type_confidence": blob.type_confidence,
                 }
-                if settings.LOG_IMAGES:
-                    blob_update_log_meta["image"] = get_base64_image(
-                        blob.get_box_image(frame)
+                if (
+                    settings.LOG_IMAGES
+                    and num_crops < settings.LOG_IMAGES_MAX_PER_FRAME
+                ):
+                    num_crops += 1
+                    blog_create_log_meta["image_path"] = get_crop_writer().submit(
+                        blob.get_box_image(frame), blob.id
                     )
-                logger.debug("Blob updated.", extra={"meta": blob_update_log_meta})
-                break
-        else:
-            blob = Blob(box.box, box.type, box.confidence, _tracker)
-            blobs.append(blob)
-
-            blog_create_log_meta = {
-                "label": "BLOB_CREATE",
-                "object_id": blob.id,
-                "bounding_box": blob.bounding_box,
-                "type": blob.type,
-                "type_confidence": blob.type_confidence,
-            }
-            if settings.LOG_IMAGES:
-                blog_create_log_meta["image"] = get_base64_image(
-                    blob.get_box_image(frame)
-                )
-            logger.debug("Blob created.", extra={"meta": blog_create_log_meta})
+                logger.debug("Blob created.", extra={"meta": blog_create_log_meta})
 
     blobs = _remove_stray_blobs(blobs, matched_blob_ids, mcdf)
+    stage_timer.stop("blob_matching", _timer)
     return blobs
 
 
@@ -136,17 +159,18 @@ def update_blob_tracker(blob: Blob, frame):
     if success:
         blob.num_consecutive_tracking_failures = 0
         blob.update(box)
-        logger.debug(
-            "Object tracker updated.",
-            extra={
-                "meta": {
-                    "label": "TRACKER_UPDATE",
-                    "object_id": blob.id,
-                    "bounding_box": blob.bounding_box,
-                    "centroid": blob.centroid,
+        if is_log_enabled(logger, logging.DEBUG, "TRACKER_UPDATE"):
+            logger.debug(
+                "Object tracker updated.",
+                extra={
+                    "meta": {
+                        "label": "TRACKER_UPDATE",
+                        "object_id": blob.id,
+                        "bounding_box": blob.bounding_box,
+                        "centroid": blob.centroid,
+                    },
                 },
-            },
-        )
+            )
     else:
         blob.num_consecutive_tracking_failures += 1
 
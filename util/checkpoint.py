@@ -0,0 +1,41 @@
+"""
+Checkpoints of a counting job's state, so that an interrupted job can resume where it left off.
+"""
+
+import json
+import os
+import pathlib
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Write a checkpoint as JSON. The checkpoint is written to a temporary file that then replaces
+    the previous one, so a crash mid-write never leaves a partial checkpoint behind.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, separators=(",", ":"))
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint, or return None if there is none.
+    """
+    try:
+        with open(path, "r") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def remove_checkpoint(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,172 @@
+"""
+Time-bucketed count series i.e per-line, per-class counts in fixed-width time bins.
+"""
+
+import numpy as np
+
+
+class CountSeries:
+    """
+    Keeps the most recent `num_bins` bins of `bin_seconds` each in a preallocated ring buffer.
+    Bins are indexed by video timestamp and handed to `on_flush` as soon as they are complete,
+    so memory use stays bounded no matter how long a job runs.
+    """
+
+    def __init__(self, bin_seconds, num_bins, line_labels, on_flush=None):
+        self.bin_seconds = bin_seconds
+        self.num_bins = num_bins
+        self.line_labels = list(line_labels)
+        self.line_indices = {label: i for i, label in enumerate(self.line_labels)}
+        self.class_names = []
+        self.class_indices = {}
+        self.on_flush = on_flush
+        # counts[slot, line, class] where slot is the absolute bin index modulo num_bins
+        self.counts = np.zeros((num_bins, len(self.line_labels), 4), dtype=np.uint32)
+        self.first_bin = None  # absolute index of the oldest bin in the current series
+        self.current_bin = None  # absolute index of the bin being filled
+
+    def _get_class_index(self, class_name):
+        if class_name not in self.class_indices:
+            if len(self.class_names) == self.counts.shape[2]:
+                # classes are few and known early on, so growing is rare
+                self.counts = np.concatenate(
+                    (self.counts, np.zeros_like(self.counts)), axis=2
+                )
+            self.class_indices[class_name] = len(self.class_names)
+            self.class_names.append(class_name)
+        return self.class_indices[class_name]
+
+    def _start_series(self, bin_index):
+        self.counts.fill(0)
+        self.first_bin = bin_index
+        self.current_bin = bin_index
+
+    def advance(self, timestamp):
+        """
+        Move the series to the bin containing `timestamp` (in seconds), flushing every bin before it.
+        A timestamp that goes backwards (e.g a reconnected stream) starts a new series, flushing the
+        bin being filled as partial. One that jumps over more than `num_bins` bins (e.g after seeking)
+        starts a new series too, after flushing the bin being filled and then a single gap record
+        for the bins skipped, rather than every one of them.
+        """
+        bin_index = int(timestamp // self.bin_seconds)
+        if self.current_bin is None:
+            self._start_series(bin_index)
+            return
+        if bin_index == self.current_bin:
+            return
+        if bin_index < self.current_bin:
+            self.flush()
+            self._start_series(bin_index)
+            return
+        if bin_index - self.current_bin > self.num_bins:
+            self._flush_bin(self.current_bin, partial=False)
+            self._flush_gap(self.current_bin + 1, bin_index)
+            self._start_series(bin_index)
+            return
+        while self.current_bin < bin_index:
+            self._flush_bin(self.current_bin, partial=False)
+            self.current_bin += 1
+            self.counts[self.current_bin % self.num_bins] = 0
+        self.first_bin = max(self.first_bin, self.current_bin - self.num_bins + 1)
+
+    def add(self, line_label, class_name, count=1):
+        """
+        Add a count to the current bin.
+        """
+        class_index = self._get_class_index(class_name)
+        slot = self.current_bin % self.num_bins
+        self.counts[slot, self.line_indices[line_label], class_index] += count
+
+    def _flush_bin(self, bin_index, partial):
+        if self.on_flush is None:
+            return
+        counts = self.counts[bin_index % self.num_bins]
+        lines_by_class = [
+            {
+                "line": self.line_labels[line_index],
+                "class": self.class_names[class_index],
+                "count": int(counts[line_index, class_index]),
+            }
+            for line_index, class_index in zip(*np.nonzero(counts))
+        ]
+        self.on_flush(
+            {
+                "bin_seconds": self.bin_seconds,
+                "start": bin_index * self.bin_seconds,
+                "end": (bin_index + 1) * self.bin_seconds,
+                "partial": partial,
+                "gap": False,
+                "total_count": int(counts.sum()),
+                "lines_by_class": lines_by_class,
+            }
+        )
+
+    def _flush_gap(self, first_bin, end_bin):
+        # the skipped bins, from `first_bin` up to but not including `end_bin`, had no frames to count
+        if self.on_flush is None:
+            return
+        self.on_flush(
+            {
+                "bin_seconds": self.bin_seconds,
+                "start": first_bin * self.bin_seconds,
+                "end": end_bin * self.bin_seconds,
+                "partial": False,
+                "gap": True,
+                "total_count": 0,
+                "lines_by_class": [],
+            }
+        )
+
+    def flush(self):
+        """
+        Flush the (incomplete) bin currently being filled e.g at the end of a video.
+        """
+        if self.current_bin is not None:
+            self._flush_bin(self.current_bin, partial=True)
+
+    def get_series(self):
+        """
+        Return the start times (in seconds) and counts (bins x lines x classes) of the bins held,
+        oldest first.
+        """
+        if self.current_bin is None:
+            return np.empty(0), self.counts[:0, :, : len(self.class_names)]
+        bin_indices = np.arange(self.first_bin, self.current_bin + 1)
+        counts = self.counts[bin_indices % self.num_bins, :, : len(self.class_names)]
+        return bin_indices * self.bin_seconds, counts
+
+    def get_state(self):
+        """
+        Fetch the bins held as JSON serializable data, to resume the series with `restore_state`.
+        """
+        _, counts = self.get_series()
+        return {
+            "bin_seconds": self.bin_seconds,
+            "first_bin": self.first_bin,
+            "current_bin": self.current_bin,
+            "line_labels": self.line_labels,
+            "class_names": list(self.class_names),
+            "counts": counts.tolist(),
+        }
+
+    def restore_state(self, state):
+        """
+        Resume the series from a state fetched with `get_state`, keeping the most recent `num_bins`
+        bins of it. Counts of lines the series doesn't have are left out.
+        """
+        self.counts.fill(0)
+        self.first_bin = state["first_bin"]
+        self.current_bin = state["current_bin"]
+        if self.current_bin is None:
+            return
+        self.first_bin = max(self.first_bin, self.current_bin - self.num_bins + 1)
+        class_indices = [self._get_class_index(class_name) for class_name in state["class_names"]]
+        for bin_index, bin_counts in enumerate(state["counts"], state["first_bin"]):
+            if bin_index < self.first_bin:
+                continue
+            for line_label, line_counts in zip(state["line_labels"], bin_counts):
+                if line_label in self.line_indices:
+                    self.counts[
+                        bin_index % self.num_bins, self.line_indices[line_label], class_indices
+                    ] = line_counts
@@ -0,0 +1,169 @@
+'''
+Compact binary event log.
+
+An event log file starts with `MAGIC` and is followed by length-prefixed records,
+each with a `RECORD_HEADER` (record kind, payload length):
+- schema records hold a msgpack array [schema id, label, meta keys] and are written
+  the first time an event with a new label or set of meta keys is logged
+- event records hold an `EVENT_HEADER` (created, schema id, level number) followed by a
+  msgpack array [logger, message, meta values, extra fields]
+so field names are written once per schema instead of once per event, and readers can
+filter events by label and time without decoding them.
+'''
+
+import logging
+import os
+import struct
+import msgpack
+
+
+MAGIC = b'IVYEVT01'
+RECORD_HEADER = struct.Struct('<BI')
+EVENT_HEADER = struct.Struct('<dHB')
+SCHEMA_RECORD = 0
+EVENT_RECORD = 1
+
+
+def _default(obj):
+    '''
+    Convert objects msgpack can't serialize the same way the JSON log formatter does.
+    '''
+    if hasattr(obj, 'tolist'): # numpy arrays
+        return obj.tolist()
+    return str(obj)
+
+class EventLogHandler(logging.Handler):
+    '''
+    Write log records to a binary event log file.
+    '''
+    def __init__(self, file_path, autoflush=True):
+        super(EventLogHandler, self).__init__()
+        self.file_path = file_path
+        self.autoflush = autoflush # flush after every record, otherwise leave flushing to the caller
+        self.schemas = {} # (label, meta keys) -> schema id
+        self.stream = open(file_path, 'ab', buffering=1 << 20)
+        if self.stream.tell() == 0:
+            self.stream.write(MAGIC)
+        else:
+            self._load_schemas()
+        self.packer = msgpack.Packer(default=_default)
+
+    def _load_schemas(self):
+        for schema_id, label, keys in iter_schemas(self.file_path):
+            self.schemas[(label, tuple(keys))] = schema_id
+
+    def _write_record(self, kind, payload):
+        self.stream.write(RECORD_HEADER.pack(kind, len(payload)))
+        self.stream.write(payload)
+
+    def _get_schema_id(self, label, keys):
+        schema_id = self.schemas.get((label, keys))
+        if schema_id is None:
+            schema_id = len(self.schemas)
+            self.schemas[(label, keys)] = schema_id
+            self._write_record(SCHEMA_RECORD, self.packer.pack([schema_id, label, list(keys)]))
+        return schema_id
+
+    def emit(self, record):
+        try:
+            meta = getattr(record, 'meta', {})
+            label = meta.get('label')
+            schema_id = self._get_schema_id(label, tuple(meta))
+            values = [value for key, value in meta.items() if key != 'label']
+            extra = {}
+            if record.exc_info:
+                extra['exc_info'] = logging.Formatter().formatException(record.exc_info)
+            elif record.exc_text:
+                extra['exc_info'] = record.exc_text
+            payload = EVENT_HEADER.pack(record.created, schema_id, record.levelno) + self.packer.pack(
+                [record.name, record.getMessage(), values, extra]
+            )
+            self._write_record(EVENT_RECORD, payload)
+            if self.autoflush:
+                self.stream.flush()
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.stream and not self.stream.closed:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream and not self.stream.closed:
+                self.stream.close()
+        finally:
+            self.release()
+        super(EventLogHandler, self).close()
+
+def _iter_records(event_log_file):
+    '''
+    Iterate over the (kind, length) of the records in an event log file, leaving the file at the start
+    of each record's payload. A truncated record at the end of the file, e.g one cut short by a crash
+    or still being written, ends the records.
+    '''
+    if event_log_file.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Not an event log file.')
+    file_size = os.fstat(event_log_file.fileno()).st_size
+    while True:
+        header = event_log_file.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        kind, length = RECORD_HEADER.unpack(header)
+        if event_log_file.tell() + length > file_size:
+            return
+        yield kind, length
+
+def iter_schemas(file_path):
+    '''
+    Iterate over the (schema id, label, meta keys) schemas defined in an event log file.
+    '''
+    with open(file_path, 'rb') as event_log_file:
+        for kind, length in _iter_records(event_log_file):
+            if kind == SCHEMA_RECORD:
+                yield msgpack.unpackb(event_log_file.read(length))
+            else:
+                event_log_file.seek(length, 1)
+
+def read_events(file_path, labels=None, start=None, end=None):
+    '''
+    Stream the events in an event log file, optionally only those with one of the given labels
+    and created within [start, end). Events are yielded as dicts in the same shape as the JSON log lines.
+    '''
+    labels = set(labels) if labels is not None else None
+    schemas = {} # schema id -> (label, meta keys, whether events with the schema are wanted)
+    with open(file_path, 'rb') as event_log_file:
+        for kind, length in _iter_records(event_log_file):
+            if kind == SCHEMA_RECORD:
+                schema_id, label, keys = msgpack.unpackb(event_log_file.read(length))
+                schemas[schema_id] = (label, keys, labels is None or label in labels)
+                continue
+
+            created, schema_id, levelno = EVENT_HEADER.unpack(event_log_file.read(EVENT_HEADER.size))
+            label, keys, is_wanted = schemas[schema_id]
+            if (
+                not is_wanted
+                or (start is not None and created < start)
+                or (end is not None and created >= end)
+            ):
+                event_log_file.seek(length - EVENT_HEADER.size, 1)
+                continue
+
+            logger_name, message, values, extra = msgpack.unpackb(
+                event_log_file.read(length - EVENT_HEADER.size), strict_map_key=False
+            )
+            values = iter(values)
+            event = {
+                'created': created,
+                'logger': logger_name,
+                'level': logging.getLevelName(levelno),
+                'message': message,
+            }
+            event.update(extra)
+            event['meta'] = {key: label if key == 'label' else next(values) for key in keys}
+            yield event
@@ -0,0 +1,146 @@
+"""
+Flow maps i.e which way and how fast objects move in each part of a video.
+"""
+
+import math
+import numpy as np
+import cv2
+
+
+FLOW_FIELDS = ("sum_dx", "sum_dy", "sum_speed", "count")
+FLOW_ARROW_COLOR = (0, 255, 0)
+
+
+class FlowField:
+    """
+    Sums of the displacement and speed of object steps (moves from one position to the next)
+    in each cell of a grid of `cell_size` pixel cells over a frame.
+    Only sums are kept, so fields of different clips merge by adding them up and the mean
+    direction, speed and number of steps of a cell can be derived at any time.
+    """
+
+    def __init__(self, frame_size, cell_size, fields=None):
+        f_width, f_height = frame_size
+        self.frame_size = tuple(frame_size)
+        self.cell_size = cell_size
+        self.shape = (math.ceil(f_height / cell_size), math.ceil(f_width / cell_size))
+        if fields is None:
+            fields = {
+                "sum_dx": np.zeros(self.shape, dtype=np.float64),
+                "sum_dy": np.zeros(self.shape, dtype=np.float64),
+                "sum_speed": np.zeros(self.shape, dtype=np.float64),
+                "count": np.zeros(self.shape, dtype=np.int64),
+            }
+        self.sum_dx = fields["sum_dx"]
+        self.sum_dy = fields["sum_dy"]
+        self.sum_speed = fields["sum_speed"]
+        self.count = fields["count"]
+        for name in FLOW_FIELDS:
+            if getattr(self, name).shape != self.shape:
+                raise ValueError(
+                    f"Flow field {name} of shape {getattr(self, name).shape} does not match "
+                    f"frame size {frame_size} and cell size {cell_size}."
+                )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a flow field saved with `save`.
+        """
+        with np.load(path) as data:
+            return cls(
+                tuple(int(v) for v in data["frame_size"]),
+                int(data["cell_size"]),
+                {name: data[name] for name in FLOW_FIELDS},
+            )
+
+    def add_steps(self, starts, ends, durations=None):
+        """
+        Add steps from (x, y) start to (x, y) end positions, each binned in the cell of its midpoint.
+        Speeds are in pixels per unit of `durations` (per step if no durations are given).
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        displacements = ends - starts
+        distances = np.hypot(displacements[:, 0], displacements[:, 1])
+        speeds = (
+            distances
+            if durations is None
+            else distances / np.asarray(durations, dtype=np.float64)
+        )
+
+        rows, columns = self.shape
+        midpoints = (starts + ends) / 2
+        column_indices = np.clip(
+            np.floor_divide(midpoints[:, 0], self.cell_size).astype(np.intp), 0, columns - 1
+        )
+        row_indices = np.clip(
+            np.floor_divide(midpoints[:, 1], self.cell_size).astype(np.intp), 0, rows - 1
+        )
+        cells = np.ravel_multi_index((row_indices, column_indices), self.shape)
+        size = rows * columns
+
+        # unit directions so that the mean direction of a cell isn't dominated by its fastest steps
+        with np.errstate(invalid="ignore", divide="ignore"):
+            directions = np.where(
+                distances[:, np.newaxis] > 0, displacements / distances[:, np.newaxis], 0
+            )
+        self.sum_dx += np.bincount(cells, directions[:, 0], size).reshape(self.shape)
+        self.sum_dy += np.bincount(cells, directions[:, 1], size).reshape(self.shape)
+        self.sum_speed += np.bincount(cells, speeds, size).reshape(self.shape)
+        self.count += np.bincount(cells, minlength=size).reshape(self.shape)
+
+    def merge(self, other):
+        """
+        Add the steps of another flow field of the same frame and cell size e.g from another clip of the same camera.
+        """
+        if other.frame_size != self.frame_size or other.cell_size != self.cell_size:
+            raise ValueError("Only flow fields with the same frame and cell size can be merged.")
+        for name in FLOW_FIELDS:
+            getattr(self, name)[...] += getattr(other, name)
+
+    def get_mean_direction(self):
+        """
+        Fetch the mean (dx, dy) direction of each cell as an array of shape (rows, columns, 2).
+        Its length is 1 for cells where objects all move the same way and shrinks towards 0
+        the more their directions disagree.
+        """
+        count = np.maximum(self.count, 1)[..., np.newaxis]
+        return np.stack((self.sum_dx, self.sum_dy), axis=-1) / count
+
+    def get_mean_speed(self):
+        """
+        Fetch the mean speed of each cell.
+        """
+        return self.sum_speed / np.maximum(self.count, 1)
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            frame_size=np.array(self.frame_size),
+            cell_size=np.array(self.cell_size),
+            **{name: getattr(self, name) for name in FLOW_FIELDS},
+        )
+
+    def render(self, background, min_count=1):
+        """
+        Draw an arrow for each cell with at least `min_count` steps, pointing in the cell's mean
+        direction and scaled by how consistent that direction is.
+        """
+        output = background.copy()
+        directions = self.get_mean_direction()
+        arrow_length = self.cell_size * 0.9
+        for row, column in zip(*np.nonzero(self.count >= min_count)):
+            dx, dy = directions[row, column]
+            center_x = (column + 0.5) * self.cell_size
+            center_y = (row + 0.5) * self.cell_size
+            start = (
+                round(center_x - dx * arrow_length / 2),
+                round(center_y - dy * arrow_length / 2),
+            )
+            end = (
+                round(center_x + dx * arrow_length / 2),
+                round(center_y + dy * arrow_length / 2),
+            )
+            cv2.arrowedLine(output, start, end, FLOW_ARROW_COLOR, 1, cv2.LINE_AA, tipLength=0.3)
+        return output
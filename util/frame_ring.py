@@ -0,0 +1,142 @@
+"""
+Ring buffer of video frames in shared memory, for passing frames between processes without
+pickling them. One process writes frames and one or more readers (in other processes) each read
+every frame, in order. A slot is reused once all readers have released its frame, so the writer
+blocks when the slowest reader is `num_slots` frames behind.
+"""
+
+import collections
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+class FrameRing:
+    def __init__(self, shape, dtype, num_slots, num_readers=1, context=None):
+        context = context or multiprocessing.get_context()
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.num_slots = num_slots
+        self.num_readers = num_readers
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        # frames, followed by the index and timestamp of the frame in each slot
+        self._shared_memory = SharedMemory(
+            create=True, size=num_slots * frame_size + num_slots * 2 * 8
+        )
+        self._is_owner = True
+        self._free = context.Semaphore(num_slots)
+        self._filled = [context.Semaphore(0) for _ in range(num_readers)]
+        self._refs = context.Array("i", num_slots)  # number of readers yet to release each slot
+        self._position = 0  # number of frames written
+        self._attach()
+
+    def _attach(self):
+        buffer = self._shared_memory.buf
+        self._frames = np.ndarray((self.num_slots, *self.shape), self.dtype, buffer)
+        self._meta = np.ndarray(
+            (self.num_slots, 2), np.float64, buffer, offset=self._frames.nbytes
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_frames"], state["_meta"]
+        state["_is_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def _write(self, frame, index, timestamp, timeout):
+        if not self._free.acquire(timeout=timeout):
+            return False
+        slot = self._position % self.num_slots
+        if frame is not None:
+            self._frames[slot] = frame
+        self._meta[slot] = (index, timestamp)
+        self._refs[slot] = self.num_readers
+        self._position += 1
+        for filled in self._filled:
+            filled.release()
+        return True
+
+    def put(self, frame, index, timestamp, timeout=None):
+        """
+        Copy a frame into the next slot, waiting for one to be free for up to `timeout` seconds
+        (default: as long as it takes). Returns False if none was, without writing the frame.
+        """
+        return self._write(frame, index, timestamp, timeout)
+
+    def put_end(self, timeout=None):
+        """
+        Mark the end of the frames, after which readers get None.
+        Returns False if no slot was free within `timeout` seconds, as `put` does.
+        """
+        return self._write(None, -1, 0, timeout)
+
+    def get_reader(self, reader_index):
+        return FrameReader(self, reader_index)
+
+    def _release(self, slot):
+        with self._refs.get_lock():
+            self._refs[slot] -= 1
+            if self._refs[slot] == 0:
+                self._free.release()
+
+    def close(self):
+        """
+        Detach from the shared memory, and free it if this is the ring's creator.
+        Frames returned by readers can't be used after this.
+        """
+        self._frames = self._meta = None
+        try:
+            self._shared_memory.close()
+        except BufferError:
+            pass  # a frame is still referenced, the memory is unmapped once it's gone
+        if self._is_owner:
+            self._shared_memory.unlink()
+
+
+class FrameReader:
+    """
+    One reader's position in a FrameRing.
+    """
+
+    def __init__(self, ring, reader_index):
+        self.ring = ring
+        self.reader_index = reader_index
+        self._position = 0  # number of frames read
+        self._held = collections.deque()  # slots read but not yet released
+
+    def get(self):
+        """
+        Wait for the next frame and return its index, timestamp and the frame itself (a view
+        of its slot, valid until it is released), or None once the writer has ended.
+        """
+        ring = self.ring
+        ring._filled[self.reader_index].acquire()
+        slot = self._position % ring.num_slots
+        self._position += 1
+        index, timestamp = ring._meta[slot]
+        if index < 0:
+            ring._release(slot)
+            return None
+        self._held.append(slot)
+        return int(index), float(timestamp), ring._frames[slot]
+
+    def release(self):
+        """
+        Release the oldest frame read, letting the writer reuse its slot.
+        """
+        self.ring._release(self._held.popleft())
+
+    def close(self):
+        """
+        Release the frames read and skip the rest, so that a reader that stops early
+        doesn't hold up the writer and the other readers.
+        """
+        while self._held:
+            self.release()
+        while self.get() is not None:
+            self.release()
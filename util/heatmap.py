@@ -0,0 +1,114 @@
+"""
+Heatmaps of where objects are seen in a video.
+"""
+
+import math
+import numpy as np
+import cv2
+
+
+class Heatmap:
+    """
+    Number of times objects have been seen in each cell of a grid of `cell_size` pixel cells over a frame.
+    Positions are binned in bulk with NumPy, so large batches are cheap to add.
+    """
+
+    def __init__(self, frame_size, cell_size, grid=None):
+        f_width, f_height = frame_size
+        self.frame_size = frame_size
+        self.cell_size = cell_size
+        self.shape = (math.ceil(f_height / cell_size), math.ceil(f_width / cell_size))
+        if grid is None:
+            grid = np.zeros(self.shape, dtype=np.float64)
+        elif grid.shape != self.shape:
+            raise ValueError(
+                f"Heatmap grid of shape {grid.shape} does not match frame size {frame_size} "
+                f"and cell size {cell_size}."
+            )
+        self.grid = grid
+
+    @classmethod
+    def load(cls, path, frame_size, cell_size):
+        """
+        Load a heatmap grid saved with `save`.
+        """
+        return cls(frame_size, cell_size, np.load(path))
+
+    def _get_cells(self, xs, ys):
+        rows, columns = self.shape
+        column_indices = np.clip(
+            np.floor_divide(xs, self.cell_size).astype(np.intp), 0, columns - 1
+        )
+        row_indices = np.clip(
+            np.floor_divide(ys, self.cell_size).astype(np.intp), 0, rows - 1
+        )
+        return row_indices, column_indices
+
+    def add_points(self, points):
+        """
+        Add (x, y) points e.g object centroids.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        row_indices, column_indices = self._get_cells(points[:, 0], points[:, 1])
+        self.grid += np.bincount(
+            np.ravel_multi_index((row_indices, column_indices), self.shape),
+            minlength=self.grid.size,
+        ).reshape(self.shape)
+
+    def add_boxes(self, boxes):
+        """
+        Add (x, y, w, h) bounding boxes, counting every cell a box covers.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        x, y, w, h = boxes.T
+        row_start, column_start = self._get_cells(x, y)
+        row_end, column_end = self._get_cells(
+            x + np.maximum(w - 1, 0), y + np.maximum(h - 1, 0)
+        )
+        # mark the corners of each box in a difference grid and integrate it
+        rows, columns = self.shape
+        difference = np.zeros((rows + 1, columns + 1), dtype=np.float64)
+        np.add.at(difference, (row_start, column_start), 1)
+        np.add.at(difference, (row_start, column_end + 1), -1)
+        np.add.at(difference, (row_end + 1, column_start), -1)
+        np.add.at(difference, (row_end + 1, column_end + 1), 1)
+        self.grid += difference.cumsum(axis=0).cumsum(axis=1)[:rows, :columns]
+
+    def merge(self, other):
+        """
+        Add the counts of another heatmap of the same frame and cell size e.g from another clip of the same camera.
+        """
+        if other.frame_size != self.frame_size or other.cell_size != self.cell_size:
+            raise ValueError("Only heatmaps with the same frame and cell size can be merged.")
+        self.grid += other.grid
+
+    def save(self, path):
+        np.save(path, self.grid)
+
+    def render(self, background=None, alpha=0.6):
+        """
+        Colorize the heatmap to frame size, blended over a background frame if one is given.
+        """
+        f_width, f_height = self.frame_size
+        peak = self.grid.max()
+        levels = (
+            np.zeros(self.shape, dtype=np.uint8)
+            if peak == 0
+            else np.round(self.grid / peak * 255).astype(np.uint8)
+        )
+        colors = cv2.applyColorMap(levels, cv2.COLORMAP_JET)
+        colors = cv2.resize(
+            colors,
+            (self.shape[1] * self.cell_size, self.shape[0] * self.cell_size),
+            interpolation=cv2.INTER_NEAREST,
+        )[:f_height, :f_width]
+        if background is None:
+            return colors
+        output = background.copy()
+        mask = cv2.resize(
+            (self.grid > 0).astype(np.uint8),
+            (self.shape[1] * self.cell_size, self.shape[0] * self.cell_size),
+            interpolation=cv2.INTER_NEAREST,
+        )[:f_height, :f_width].astype(bool)
+        output[mask] = cv2.addWeighted(colors, alpha, background, 1 - alpha, 0)[mask]
+        return output
@@ -1,9 +1,13 @@
 import cv2
-import base64
+import itertools
 import pathlib
+import threading
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import settings
+from .job import get_job_id
 from .logger import get_logger
 
 
@@ -22,13 +26,94 @@ def take_screenshot(frame):
         'meta': {'label': 'SCREENSHOT_CAPTURE', 'path': screenshot_path},
     })
 
-def get_base64_image(image):
+class CropWriter:
     '''
-    Convert image to base 64.
+    Encode images (e.g object crops) and save them as JPEG files on a pool of worker threads.
     '''
-    try:
-        _, image_buffer = cv2.imencode('.jpg', image)
-        image_str = base64.b64encode(image_buffer).decode('utf-8')
-        return image_str # Prefix with data URI scheme "data:image/jpeg;base64," to display.
-    except:
-        return None
+    def __init__(self, directory, quality=85, max_pending=64, num_workers=2):
+        self.directory = directory
+        pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+        self.quality = quality
+        self._ids = itertools.count()
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(num_workers, thread_name_prefix='crop-writer')
+        self.num_submitted = 0
+        self.num_written = 0
+        self.num_failed = 0 # images that couldn't be saved, which are counted as written too
+        self._counts_lock = threading.Lock() # images are submitted from several threads, e.g cameras
+
+    def submit(self, image, name):
+        '''
+        Queue a copy of an image to be saved as <name>_<n>.jpg and return the path it will be saved to.
+        Returns None if the image is empty or too many images are already waiting to be saved.
+        '''
+        if image is None or image.size == 0:
+            return None
+        if not self._pending.acquire(blocking=False):
+            return None
+        path = os.path.join(self.directory, f'{name}_{next(self._ids)}.jpg')
+        with self._counts_lock:
+            self.num_submitted += 1
+        future = self._executor.submit(self._write, image.copy(), path)
+        future.add_done_callback(self._done)
+        return path
+
+    def _write(self, image, path):
+        if not cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+            raise OSError(f'Could not write {path}')
+
+    def _done(self, future):
+        error = future.exception()
+        with self._counts_lock:
+            self.num_written += 1
+            if error is not None:
+                self.num_failed += 1
+        self._pending.release()
+        if error is not None:
+            logger.warning('Crop not saved: %s', error, extra={
+                'meta': {'label': 'CROP_WRITE_FAILED'},
+            })
+
+    def get_num_pending(self):
+        '''
+        Fetch the number of images waiting to be saved.
+        '''
+        with self._counts_lock:
+            return self.num_submitted - self.num_written
+
+    def close(self):
+        '''
+        Wait for queued images to be saved.
+        '''
+        self._executor.shutdown(wait=True)
+
+_crop_writer = None
+_crop_writer_lock = threading.Lock() # so threads logging crops at once create a single crop writer
+
+def get_num_pending_crops():
+    '''
+    Fetch the number of images the current job's crop writer has yet to save, if it's been created.
+    '''
+    crop_writer = _crop_writer
+    return 0 if crop_writer is None else crop_writer.get_num_pending()
+
+def get_crop_writer():
+    '''
+    Fetch the crop writer for the current job, creating it if it doesn't exist.
+    '''
+    global _crop_writer # pylint: disable=global-statement
+    with _crop_writer_lock:
+        if _crop_writer is None:
+            directory = os.path.join(settings.LOG_FILES_DIRECTORY, get_job_id() + '_images')
+            _crop_writer = CropWriter(directory, settings.LOG_IMAGES_QUALITY)
+        return _crop_writer
+
+def close_crop_writer():
+    '''
+    Wait for queued crops to be saved, if any.
+    '''
+    global _crop_writer # pylint: disable=global-statement
+    with _crop_writer_lock:
+        crop_writer, _crop_writer = _crop_writer, None
+    if crop_writer is not None:
+        crop_writer.close()
@@ -0,0 +1,66 @@
+"""
+Spatial index of counting lines.
+"""
+
+import math
+
+
+class CountingLineIndex:
+    """
+    Uniform grid over the frame in which every cell lists the counting lines passing near it,
+    so only lines close to a bounding box need to be tested for crossings.
+    """
+
+    def __init__(self, counting_lines, cell_size=64):
+        self.counting_lines = counting_lines
+        self.cell_size = cell_size
+        self.cells = {}  # (column, row) -> indices of counting lines in the cell
+        for index, counting_line in enumerate(counting_lines):
+            for cell in self._get_segment_cells(*counting_line["line"]):
+                self.cells.setdefault(cell, []).append(index)
+
+    def _get_segment_cells(self, point1, point2):
+        """
+        Fetch the cells a line segment passes through.
+        """
+        (x1, y1), (x2, y2) = sorted((point1, point2))
+        if x1 == x2:
+            yield from self._get_cells(x1, min(y1, y2), x2, max(y1, y2))
+            return
+        slope = (y2 - y1) / (x2 - x1)
+        for column in range(
+            math.floor(x1 / self.cell_size), math.floor(x2 / self.cell_size) + 1
+        ):
+            # part of the segment within the column
+            x_start = max(x1, column * self.cell_size)
+            x_end = min(x2, (column + 1) * self.cell_size)
+            y_start = y1 + slope * (x_start - x1)
+            y_end = y1 + slope * (x_end - x1)
+            # pad for floating point error so points on a row boundary land in both rows
+            yield from self._get_cells(
+                x_start,
+                min(y_start, y_end) - 1e-6,
+                x_start,
+                max(y_start, y_end) + 1e-6,
+            )
+
+    def _get_cells(self, x_min, y_min, x_max, y_max):
+        column_min = math.floor(x_min / self.cell_size)
+        column_max = math.floor(x_max / self.cell_size)
+        row_min = math.floor(y_min / self.cell_size)
+        row_max = math.floor(y_max / self.cell_size)
+        for column in range(column_min, column_max + 1):
+            for row in range(row_min, row_max + 1):
+                yield column, row
+
+    def query(self, bbox):
+        """
+        Fetch the counting lines that may intersect a bounding box, in their configured order.
+        """
+        x, y, w, h = bbox
+        indices = set()
+        for cell in self._get_cells(x, y, x + w, y + h):
+            line_indices = self.cells.get(cell)
+            if line_indices:
+                indices.update(line_indices)
+        return [self.counting_lines[index] for index in sorted(indices)]
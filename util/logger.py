@@ -3,12 +3,18 @@ VCS logger.
 '''
 
 import os
+import atexit
+import itertools
 import logging
 import pathlib
+import queue
+import threading
+from logging.handlers import QueueHandler
 from pythonjsonlogger import jsonlogger
 
 import settings
 from .job import get_job_id
+from .event_log import EventLogHandler
 
 
 class MetaFilter(logging.Filter):
@@ -30,16 +36,109 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
         log_record['logger'] = record.name
         log_record['level'] = record.levelname
 
+class BufferedFileHandler(logging.FileHandler):
+    '''
+    File handler that writes through a large buffer and leaves flushing to its caller,
+    so that records can be written to disk in batches.
+    '''
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=1 << 20, encoding=self.encoding)
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+
+class BoundedQueueHandler(QueueHandler):
+    '''
+    Queue handler for a bounded queue that either drops records or blocks when the queue is full.
+    '''
+    def __init__(self, _queue, overflow='drop'):
+        super(BoundedQueueHandler, self).__init__(_queue)
+        self.overflow = overflow
+        self.num_dropped = 0
+        self._num_dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._num_dropped_lock:
+                self.num_dropped += 1
+
+class BatchQueueListener:
+    '''
+    Take records off a queue on a dedicated thread and pass them to handlers in batches,
+    flushing each handler once per batch.
+    '''
+    _sentinel = None
+
+    def __init__(self, _queue, handlers, batch_size=1000):
+        self.queue = _queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name='log-listener', daemon=True)
+        self._thread.start()
+
+    def _monitor(self):
+        is_stopping = False
+        while not is_stopping:
+            records = []
+            record = self.queue.get()
+            while True:
+                if record is self._sentinel:
+                    is_stopping = True
+                    break
+                records.append(record)
+                if len(records) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.handle(records)
+
+    def handle(self, records):
+        for handler in self.handlers:
+            for record in records:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            handler.flush()
+
+    def stop(self):
+        '''
+        Write out every queued record and stop the listener thread.
+        '''
+        if self._thread is not None:
+            self.queue.put(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+_queue_handler = None
+_queue_listener = None
+
 def init_logger():
     '''
     Setup logger.
     '''
+    global _queue_handler, _queue_listener # pylint: disable=global-statement
 
     job_id = get_job_id()
 
     logger = logging.getLogger(job_id)
     logger.addFilter(MetaFilter())
     logger.setLevel(logging.DEBUG)
+    handlers = []
+    log_async = settings.LOG_ASYNC
 
     enable_console_logger = settings.ENABLE_CONSOLE_LOGGER
     if enable_console_logger:
@@ -47,18 +146,105 @@ def init_logger():
         stream_handler.setLevel(logging.INFO) # https://docs.python.org/3/library/logging.html#logging-levels
         stream_formatter = logging.Formatter('[%(asctime)-15s] %(levelname)-8s: %(message)s %(meta)s')
         stream_handler.setFormatter(stream_formatter)
-        logger.addHandler(stream_handler)
+        handlers.append(stream_handler)
 
     enable_file_logger = settings.ENABLE_FILE_LOGGER
     if enable_file_logger:
         log_files_directory = settings.LOG_FILES_DIRECTORY
         pathlib.Path(log_files_directory).mkdir(parents=True, exist_ok=True)
         file_path = os.path.join(log_files_directory, job_id + '.log')
-        file_handler = logging.FileHandler(file_path)
+        # with async logging the listener thread flushes the file once per batch of records
+        file_handler = BufferedFileHandler(file_path) if log_async else logging.FileHandler(file_path)
         file_handler.setLevel(logging.DEBUG)
         file_formatter = CustomJsonFormatter('%(created) %(logger) %(level) %(message)')
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    enable_event_logger = settings.ENABLE_EVENT_LOGGER
+    if enable_event_logger:
+        log_files_directory = settings.LOG_FILES_DIRECTORY
+        pathlib.Path(log_files_directory).mkdir(parents=True, exist_ok=True)
+        file_path = os.path.join(log_files_directory, job_id + '.events')
+        event_handler = EventLogHandler(file_path, autoflush=not log_async)
+        event_handler.setLevel(logging.DEBUG)
+        handlers.append(event_handler)
+
+    if log_async and handlers:
+        # format and write records on a listener thread, off the frame processing path
+        log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+        _queue_handler = BoundedQueueHandler(log_queue, settings.LOG_QUEUE_OVERFLOW)
+        # only queue records that at least one of the handlers will emit
+        _queue_handler.setLevel(min(handler.level for handler in handlers))
+        logger.addHandler(_queue_handler)
+        _queue_listener = BatchQueueListener(log_queue, handlers, settings.LOG_BATCH_SIZE)
+        _queue_listener.start()
+        atexit.register(stop_logger)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
+def stop_logger():
+    '''
+    Flush and stop asynchronous logging, if enabled.
+    '''
+    global _queue_handler, _queue_listener # pylint: disable=global-statement
+    if _queue_listener is None:
+        return
+    if _queue_handler.num_dropped:
+        logger = get_logger()
+        record = logger.makeRecord(
+            logger.name, logging.WARNING, __file__, 0, 'Log records dropped.', None, None,
+            extra={'meta': {'label': 'LOG_RECORDS_DROPPED', 'count': _queue_handler.num_dropped}},
+        )
+        _queue_handler.queue.put(_queue_handler.prepare(record))
+    _queue_listener.stop()
+    get_logger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _queue_listener = None
+
+def get_log_queue_stats():
+    '''
+    Fetch the number of log records waiting to be written and the number dropped so far when logging asynchronously.
+    Reads the queue without taking its lock, so it can be called from another thread at any time.
+    '''
+    queue_handler = _queue_handler
+    if queue_handler is None:
+        return 0, 0
+    return len(queue_handler.queue.queue), queue_handler.num_dropped
+
+_sampling_counters = {}
+
+def _get_handlers_level(logger):
+    '''
+    Fetch the lowest level that a handler of the logger or of the loggers it propagates to emits records at,
+    or that of `logging.lastResort` if there are no handlers.
+    '''
+    level = None
+    while logger is not None:
+        for handler in logger.handlers:
+            level = handler.level if level is None else min(level, handler.level)
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    if level is None:
+        return logging.lastResort.level if logging.lastResort else logging.CRITICAL + 1
+    return level
+
+def is_log_enabled(logger, level, label):
+    '''
+    Check if an event with the given level and label would be logged, so its payload is only built when needed
+    i.e the logger is enabled for the level and at least one handler would emit it.
+    Events whose label has a sampling rate N in `settings.LOG_SAMPLING_RATES` are logged once every N calls.
+    '''
+    if not logger.isEnabledFor(level) or level < _get_handlers_level(logger):
+        return False
+    sampling_rate = settings.LOG_SAMPLING_RATES.get(label, 1)
+    if sampling_rate <= 1:
+        return True
+    counter = _sampling_counters.get(label)
+    if counter is None:
+        counter = _sampling_counters.setdefault(label, itertools.count())
+    return next(counter) % sampling_rate == 0
 
 def get_logger():
     '''
@@ -0,0 +1,126 @@
+"""
+Metrics of a running process in the Prometheus text format, served over HTTP.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items())
+        + "}"
+    )
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Rate:
+    """
+    Rate at which a counter increases per second, measured between consecutive calls.
+    """
+
+    def __init__(self, get_value):
+        self.get_value = get_value
+        self._last = (time.monotonic(), get_value())
+
+    def __call__(self):
+        now, value = time.monotonic(), self.get_value()
+        last_time, last_value = self._last
+        self._last = (now, value)
+        return (value - last_value) / (now - last_time) if now > last_time else 0.0
+
+
+class MetricsServer:
+    """
+    Serve metrics at /metrics. Each metric is read by a collector function when the metrics
+    are scraped, so the process being measured only has to keep its counters up to date
+    and pays nothing for being watched. Collectors run on the server's threads and should
+    only read values (copying containers that may change while they're being read).
+
+    A collector returns a number, or a list of (labels, value) samples where the value is a
+    number or, for histograms, a `util.timing.Histogram`.
+    """
+
+    def __init__(self, host, port):
+        self.metrics = []  # (name, type, help, collector)
+        metrics_server = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_server.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def add(self, name, metric_type, help_text, collector):
+        """
+        Add a metric of type counter, gauge or histogram.
+        """
+        self.metrics.append((name, metric_type, help_text, collector))
+
+    def render(self):
+        lines = []
+        for name, metric_type, help_text, collector in self.metrics:
+            samples = collector()
+            if not isinstance(samples, list):
+                samples = [({}, samples)]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                if metric_type == "histogram":
+                    lines.extend(self._render_histogram(name, labels, value))
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(name, labels, histogram):
+        lines = []
+        cumulative_count = 0
+        counts = list(histogram.counts)
+        for bound, count in zip(histogram.bounds + (float("inf"),), counts):
+            cumulative_count += count
+            bucket_labels = {**labels, "le": _format_value(float(bound))}
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative_count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative_count}")
+        return lines
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
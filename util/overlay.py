@@ -0,0 +1,104 @@
+"""
+Static overlay i.e the parts of the HUD that don't change between frames.
+"""
+
+import numpy as np
+import cv2
+
+
+DROI_COLOR = (0, 255, 255)
+DROI_ALPHA = 0.3
+COUNTING_LINE_COLOR = (0, 0, 255)
+COUNTING_ZONE_COLOR = (255, 0, 255)
+
+
+def _draw_counting_lines_and_zones(image, counting_lines, counting_zones, color=None):
+    """
+    Draw counting lines, their labels and the outlines of counting zones in their colors
+    or, if a color is given, all in that color.
+    """
+    font = cv2.FONT_HERSHEY_DUPLEX
+    line_type = cv2.LINE_AA
+    for counting_line in counting_lines:
+        line_color = color or COUNTING_LINE_COLOR
+        cv2.line(image, counting_line["line"][0], counting_line["line"][1], line_color, 3)
+        cl_label_origin = (
+            counting_line["line"][0][0],
+            counting_line["line"][0][1] + 35,
+        )
+        cv2.putText(
+            image,
+            counting_line["label"],
+            cl_label_origin,
+            font,
+            1,
+            line_color,
+            2,
+            line_type,
+        )
+    for counting_zone in counting_zones:
+        polygon = np.array([counting_zone["zone"]], dtype=np.int32)
+        cv2.polylines(image, polygon, True, color or COUNTING_ZONE_COLOR, 3)
+
+
+class StaticOverlay:
+    """
+    The detection ROI tint, counting lines and counting zone outlines rendered once into a color
+    image and an alpha mask, which are then blended into each frame in one operation restricted
+    to the region the overlay covers.
+    """
+
+    def __init__(self, frame_shape, droi, show_droi, counting_lines, counting_zones):
+        f_height, f_width = frame_shape[:2]
+
+        # Anti-aliased drawing on black gives colors premultiplied by coverage,
+        # and the same drawing in white on a mask gives the coverage itself.
+        hud = np.zeros((f_height, f_width, 3), dtype=np.uint8)
+        _draw_counting_lines_and_zones(hud, counting_lines, counting_zones)
+        hud_mask = np.zeros((f_height, f_width), dtype=np.uint8)
+        _draw_counting_lines_and_zones(
+            hud_mask, counting_lines, counting_zones, color=255
+        )
+        hud_alpha = hud_mask.astype(np.float32)[..., np.newaxis] / 255
+
+        droi_alpha = np.zeros((f_height, f_width, 1), dtype=np.float32)
+        if show_droi:
+            cv2.fillPoly(
+                droi_alpha, np.array([droi], dtype=np.int32), DROI_ALPHA
+            )
+
+        # The ROI tint is blended over the HUD, so
+        # output = frame * (1 - alpha) + color
+        # where 1 - alpha = (1 - hud_alpha) * (1 - droi_alpha)
+        # and color = hud * (1 - droi_alpha) + DROI_COLOR * droi_alpha
+        inverse_alpha = (1 - hud_alpha) * (1 - droi_alpha)
+        color = hud.astype(np.float32) * (1 - droi_alpha) + np.array(
+            DROI_COLOR, dtype=np.float32
+        ) * droi_alpha
+
+        ys, xs = np.nonzero(inverse_alpha[..., 0] < 1)
+        if len(ys) == 0:
+            self.region = None
+            return
+        self.region = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+        # 8-bit fixed point so that blending runs on OpenCV's vectorized saturating arithmetic
+        self.inverse_alpha = np.round(
+            np.repeat(inverse_alpha[self.region], 3, axis=2) * 255
+        ).astype(np.uint8)
+        self.color = np.round(color[self.region]).astype(np.uint8)
+
+    def apply(self, frame):
+        """
+        Blend the overlay into a frame in place.
+        """
+        if self.region is None:
+            return frame
+        frame_region = frame[self.region]
+        np.copyto(
+            frame_region,
+            cv2.add(
+                cv2.multiply(frame_region, self.inverse_alpha, scale=1 / 255),
+                self.color,
+            ),
+        )
+        return frame
@@ -0,0 +1,144 @@
+"""
+Preview of the object counting process over HTTP, for headless deployments.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+
+
+class PreviewServer:
+    """
+    Serve an MJPEG stream (/stream) and the latest frame (/snapshot.jpg) of the counting process.
+    The counting loop should only render and publish frames when `wants_frame` says so i.e while
+    a client is connected and no more often than `max_fps`, so the preview costs nothing when no
+    one is watching. Frames are resized and JPEG-encoded on the server's threads.
+    """
+
+    def __init__(self, host, port, max_fps=5, frame_size=None, quality=70):
+        self.max_fps = max_fps
+        self.frame_size = frame_size  # (width, height) of served frames, None to keep the frame's size
+        self.quality = quality
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._jpeg = None  # (frame id, encoded frame) of the last frame encoded
+        self._num_clients = 0
+        self._last_published = 0.0
+
+        preview = self
+
+        class PreviewRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path in ("/", "/stream"):
+                    preview._serve_stream(self)
+                elif self.path == "/snapshot.jpg":
+                    preview._serve_snapshot(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), PreviewRequestHandler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="preview-server", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def wants_frame(self):
+        """
+        Check if the counting loop should render and publish a frame.
+        """
+        return (
+            self._num_clients > 0
+            and time.monotonic() - self._last_published >= 1 / self.max_fps
+        )
+
+    def publish(self, frame):
+        """
+        Make a frame available to clients. The frame must not be modified after it's published.
+        """
+        with self._condition:
+            self._frame = frame
+            self._frame_id += 1
+            self._last_published = time.monotonic()
+            self._condition.notify_all()
+
+    def _wait_for_frame(self, last_frame_id, timeout):
+        """
+        Wait for a frame newer than `last_frame_id` and return its id and JPEG encoding,
+        or the id and encoding of the latest frame if none arrives in time.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frame_id != last_frame_id, timeout
+            )
+            frame, frame_id = self._frame, self._frame_id
+            if frame is None:
+                return frame_id, None
+            if self._jpeg is not None and self._jpeg[0] == frame_id:
+                return self._jpeg
+
+        if self.frame_size:
+            frame = cv2.resize(frame, self.frame_size)
+        _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        jpeg = jpeg.tobytes()
+        with self._condition:
+            self._jpeg = (frame_id, jpeg)
+        return frame_id, jpeg
+
+    def _add_client(self, num):
+        with self._condition:
+            self._num_clients += num
+
+    def _serve_stream(self, request):
+        self._add_client(1)
+        try:
+            request.send_response(200)
+            request.send_header(
+                "Content-Type", "multipart/x-mixed-replace; boundary=frame"
+            )
+            request.send_header("Cache-Control", "no-cache")
+            request.end_headers()
+            frame_id = None
+            while True:
+                new_frame_id, jpeg = self._wait_for_frame(frame_id, 5)
+                if jpeg is None or new_frame_id == frame_id:
+                    continue
+                frame_id = new_frame_id
+                request.wfile.write(
+                    b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+                    % len(jpeg)
+                )
+                request.wfile.write(jpeg)
+                request.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self._add_client(-1)
+
+    def _serve_snapshot(self, request):
+        self._add_client(1)
+        try:
+            _, jpeg = self._wait_for_frame(self._frame_id, 5)
+        finally:
+            self._add_client(-1)
+        if jpeg is None:
+            request.send_error(503, "No frame available yet")
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", "image/jpeg")
+        request.send_header("Content-Length", str(len(jpeg)))
+        request.end_headers()
+        request.wfile.write(jpeg)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
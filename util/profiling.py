@@ -0,0 +1,185 @@
+"""
+On-demand profiling of a running process, triggered by signals:
+
+- SIGUSR1 starts a CPU profile that's written as a .pstats file after PROFILE_DURATION seconds
+  (or when SIGUSR1 is sent again).
+- SIGUSR2 writes a JSON report of memory use: the top allocations (tracing starts with the first
+  signal, so send it twice to see what grows), and the state of the job e.g number of blobs and trackers.
+"""
+
+import cProfile
+import itertools
+import json
+import os
+import pathlib
+import signal
+import threading
+import time
+import tracemalloc
+
+import settings
+from .job import get_job_id
+from .logger import get_logger
+
+
+logger = get_logger()
+NUM_TOP_ALLOCATIONS = 50
+
+
+class SignalProfiler:
+    """
+    Profile the thread that calls `tick` (i.e the main loop) on request. Signal handlers only set flags,
+    the work is done in `tick` between iterations of the loop, so the job never stops.
+    """
+
+    def __init__(self, directory, duration=30, get_state=None):
+        self.directory = directory
+        self.duration = duration
+        self.get_state = get_state  # function returning a dict describing the job, included in memory reports
+        self._profile = None
+        self._profile_deadline = None
+        self._is_profile_toggle_requested = False
+        self._is_memory_report_requested = False
+        self._last_snapshot = None
+        self._file_ids = itertools.count()
+
+    def install(self):
+        """
+        Handle SIGUSR1 and SIGUSR2 where they exist (i.e not on Windows) and can be handled
+        (i.e on the main thread). Returns whether the handlers were installed.
+        """
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGUSR1, self._request_profile_toggle)
+        signal.signal(signal.SIGUSR2, self._request_memory_report)
+        return True
+
+    def _request_profile_toggle(self, signum, frame):  # pylint: disable=unused-argument
+        self._is_profile_toggle_requested = True
+
+    def _request_memory_report(self, signum, frame):  # pylint: disable=unused-argument
+        self._is_memory_report_requested = True
+
+    def _get_path(self, suffix):
+        pathlib.Path(self.directory).mkdir(parents=True, exist_ok=True)
+        return os.path.join(
+            self.directory,
+            f"{get_job_id()}_{time.strftime('%Y%m%dT%H%M%S')}_{next(self._file_ids)}{suffix}",
+        )
+
+    def tick(self):
+        """
+        Start or stop profiling and write memory reports as requested. Call once per loop iteration.
+        """
+        if self._is_profile_toggle_requested:
+            self._is_profile_toggle_requested = False
+            if self._profile is None:
+                self.start_profile()
+            else:
+                self.stop_profile()
+        elif self._profile is not None and time.monotonic() >= self._profile_deadline:
+            self.stop_profile()
+
+        if self._is_memory_report_requested:
+            self._is_memory_report_requested = False
+            self.write_memory_report()
+
+    def start_profile(self):
+        self._profile = cProfile.Profile()
+        self._profile_deadline = time.monotonic() + self.duration
+        logger.info(
+            "Profiling started.",
+            extra={"meta": {"label": "PROFILE_START", "duration": self.duration}},
+        )
+        self._profile.enable()
+
+    def stop_profile(self):
+        """
+        Stop profiling and write the profile to a .pstats file (read it with `python -m pstats <path>`).
+        """
+        self._profile.disable()
+        path = self._get_path(".pstats")
+        self._profile.dump_stats(path)
+        self._profile = None
+        logger.info(
+            "Profiling ended.", extra={"meta": {"label": "PROFILE_END", "path": path}}
+        )
+        return path
+
+    def close(self):
+        """
+        Write out a profile still running e.g when the loop ends before it's due.
+        """
+        if self._profile is not None:
+            self.stop_profile()
+
+    def write_memory_report(self):
+        """
+        Write the job's state and, if memory allocations are being traced, the top allocations
+        and the allocations that grew most since the last report. Starts tracing if it isn't on.
+        """
+        report = {
+            "created": time.time(),
+            "state": self.get_state() if self.get_state else {},
+        }
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced_memory"] = {"current": current, "peak": peak}
+            report["top_allocations"] = [
+                {
+                    "location": str(stat.traceback),
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:NUM_TOP_ALLOCATIONS]
+            ]
+            if self._last_snapshot is not None:
+                report["top_growth"] = [
+                    {
+                        "location": str(stat.traceback),
+                        "size_diff": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in snapshot.compare_to(self._last_snapshot, "lineno")[
+                        :NUM_TOP_ALLOCATIONS
+                    ]
+                ]
+            self._last_snapshot = snapshot
+        else:
+            tracemalloc.start()
+            # baseline for the next report's growth
+            self._last_snapshot = tracemalloc.take_snapshot()
+            report["traced_memory"] = None
+
+        path = self._get_path("_memory.json")
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        logger.info(
+            "Memory report written.",
+            extra={
+                "meta": {
+                    "label": "MEMORY_REPORT",
+                    "path": path,
+                    "is_tracing": report["traced_memory"] is not None,
+                },
+            },
+        )
+        return path
+
+
+def install_signal_profiler(get_state=None):
+    """
+    Create a signal profiler writing to LOG_FILES_DIRECTORY and install its signal handlers.
+    """
+    profiler = SignalProfiler(
+        settings.LOG_FILES_DIRECTORY, settings.PROFILE_DURATION, get_state
+    )
+    if profiler.install():
+        logger.info(
+            "Profiling signal handlers installed.",
+            extra={"meta": {"label": "PROFILER_INSTALL", "pid": os.getpid()}},
+        )
+    return profiler
@@ -0,0 +1,90 @@
+"""
+Video recording off the frame processing path.
+"""
+
+import queue
+import threading
+import cv2
+
+
+def create_video_writer(path, fps, frame_size, codec="mp4v"):
+    """
+    Create an OpenCV video writer for frames of the given (width, height).
+    """
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, frame_size)
+
+
+class VideoRecorder:
+    """
+    Write frames to a video on a background thread.
+
+    Frames are placed in the output by their timestamp in the source video so the recording keeps
+    the source's timing: a frame that arrives after its slot has been filled is dropped and the
+    previous frame is repeated for slots no frame arrived for (up to `max_duplicates` in a row).
+    Frames are dropped rather than waited for when the queue is full, so recording never stalls counting.
+    """
+
+    def __init__(self, writer, fps, queue_size=64, max_duplicates=None):
+        self.writer = writer
+        self.fps = fps
+        self.max_duplicates = (
+            max_duplicates if max_duplicates is not None else max(int(fps), 1)
+        )
+        self.queue = queue.Queue(queue_size)
+        self.num_written = 0
+        self.num_dropped = 0  # frames dropped because the queue was full
+        self.num_late = 0  # frames dropped because their slot was already filled
+        self.num_duplicated = 0
+        self._next_index = None  # output slot of the next frame
+        self._last_frame = None
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def write(self, frame, timestamp):
+        """
+        Queue a frame with its timestamp (in seconds) in the source video.
+        The frame must not be modified after it's queued.
+        """
+        try:
+            self.queue.put_nowait((frame, timestamp))
+        except queue.Full:
+            self.num_dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, timestamp = item
+            index = round(timestamp * self.fps)
+            if self._next_index is None:
+                self._next_index = index
+            if index < self._next_index:
+                self.num_late += 1
+                continue
+
+            num_missing = min(index - self._next_index, self.max_duplicates)
+            for _ in range(num_missing):
+                self.writer.write(
+                    frame if self._last_frame is None else self._last_frame
+                )
+            self.num_duplicated += num_missing
+            self.writer.write(frame)
+            self.num_written += num_missing + 1
+            self._last_frame = frame
+            self._next_index = index + 1
+
+    def get_queue_size(self):
+        """
+        Fetch the number of frames waiting to be written.
+        Reads the queue without taking its lock, so it can be called from another thread at any time.
+        """
+        return len(self.queue.queue)
+
+    def close(self):
+        """
+        Write out queued frames and release the video writer.
+        """
+        self.queue.put(None)
+        self._thread.join()
+        self.writer.release()
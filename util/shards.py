@@ -0,0 +1,117 @@
+"""
+Splitting a video into time ranges (shards) that are counted separately, and merging their counts.
+"""
+
+
+def get_shards(duration, num_shards, overlap):
+    """
+    Split [0, duration) seconds into `num_shards` equal ranges. A shard owns the counts of its range
+    but processes it widened by `overlap` seconds on both sides, so objects already in the frame at
+    the start of its range are being tracked by then and the counts around its boundaries can be
+    matched with those of its neighbours.
+    """
+    bounds = [duration * index / num_shards for index in range(num_shards + 1)]
+    return [
+        {
+            "index": index,
+            "start": bounds[index],
+            "end": bounds[index + 1],
+            "process_start": max(bounds[index] - overlap, 0),
+            "process_end": min(bounds[index + 1] + overlap, duration),
+        }
+        for index in range(num_shards)
+    ]
+
+
+def _match_events(left_events, right_events, tolerance):
+    """
+    Pair up events of two shards that are the same crossing i.e of the same line and class
+    at most `tolerance` seconds apart, nearest first.
+    """
+    pairs = []
+    unmatched = list(right_events)
+    for left_event in sorted(left_events, key=lambda event: event["timestamp"]):
+        candidates = [
+            right_event
+            for right_event in unmatched
+            if right_event["line"] == left_event["line"]
+            and right_event["class"] == left_event["class"]
+            and abs(right_event["timestamp"] - left_event["timestamp"]) <= tolerance
+        ]
+        if candidates:
+            right_event = min(
+                candidates,
+                key=lambda event: abs(event["timestamp"] - left_event["timestamp"]),
+            )
+            unmatched.remove(right_event)
+            pairs.append((left_event, right_event))
+    return pairs
+
+
+def merge_shard_events(shards, shard_events, overlap, tolerance):
+    """
+    Merge the count events ({timestamp, line, class}) of shards into one list of events in time order.
+
+    Each shard keeps the events in the range it owns. Both shards at a boundary count the objects that
+    cross a line in the overlap around it, at slightly different times, so their events there are
+    matched up: a crossing counted by both shards is kept once even when the two counts fall on
+    different sides of the boundary (or both on the wrong side), and a crossing only one shard
+    counted is kept if that shard owns it.
+    """
+    kept = {}  # id of event -> event, for events that will be in the merged list
+    for shard, events in zip(shards, shard_events):
+        for event in events:
+            if shard["start"] <= event["timestamp"] < shard["end"]:
+                kept[id(event)] = event
+
+    for left_shard, left_events, right_events in zip(
+        shards, shard_events, shard_events[1:]
+    ):
+        boundary = left_shard["end"]
+
+        def is_near_boundary(event):
+            return boundary - overlap <= event["timestamp"] < boundary + overlap
+
+        pairs = _match_events(
+            [event for event in left_events if is_near_boundary(event)],
+            [event for event in right_events if is_near_boundary(event)],
+            tolerance,
+        )
+        for left_event, right_event in pairs:
+            if id(left_event) in kept and id(right_event) in kept:
+                del kept[id(right_event)]
+            elif id(left_event) not in kept and id(right_event) not in kept:
+                kept[id(left_event)] = left_event
+
+    return sorted(kept.values(), key=lambda event: event["timestamp"])
+
+
+def get_event_counts(events, line_labels=()):
+    """
+    Format counts of events the way `ObjectCounter.get_counts` does, where the lines labelled
+    `line_labels` are counted even if no object crossed them.
+    """
+    class_counts = {}
+    line_counts = {line_label: 0 for line_label in line_labels}
+    counts = {line_label: {} for line_label in line_labels}
+    for event in events:
+        class_counts[event["class"]] = class_counts.get(event["class"], 0) + 1
+        line_counts[event["line"]] = line_counts.get(event["line"], 0) + 1
+        counts_by_class = counts.setdefault(event["line"], {})
+        counts_by_class[event["class"]] = counts_by_class.get(event["class"], 0) + 1
+    return {
+        "total_count": len(events),
+        "classes": [
+            {"class": class_name, "count": class_count}
+            for class_name, class_count in class_counts.items()
+        ],
+        "lines": [
+            {"line": line_label, "count": line_count}
+            for line_label, line_count in line_counts.items()
+        ],
+        "lines_by_class": [
+            {"line": line_label, "class": class_name, "count": class_count}
+            for line_label, counts_by_class in counts.items()
+            for class_name, class_count in counts_by_class.items()
+        ],
+    }
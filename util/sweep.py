@@ -0,0 +1,86 @@
+"""
+Variants of counting parameters compared in a parameter sweep, and their errors against ground truth.
+"""
+
+import itertools
+
+from tracker import TRACKERS
+
+SWEEP_PARAMETERS = ("di", "mcdf", "mctf", "tracker", "counting_lines")
+
+
+def _normalize_counting_lines(counting_lines):
+    return [
+        {
+            "label": counting_line["label"],
+            "line": [tuple(point) for point in counting_line["line"]],
+        }
+        for counting_line in counting_lines
+    ]
+
+
+def get_variants(spec, defaults):
+    """
+    List the variants of a sweep spec, i.e its explicit "variants" followed by every combination of
+    the values in its "grid", each a dict of SWEEP_PARAMETERS (taken from `defaults` where a variant
+    doesn't set them) and a label.
+    """
+    variants = [dict(variant) for variant in spec.get("variants", [])]
+    grid = spec.get("grid", {})
+    if grid:
+        names = list(grid)
+        variants += [
+            dict(zip(names, values))
+            for values in itertools.product(*(grid[name] for name in names))
+        ]
+
+    labelled_variants = []
+    labels = set()
+    for index, variant in enumerate(variants):
+        label = variant.pop("label", None) or f"variant_{index}"
+        if label in labels:
+            raise ValueError(f"More than one variant is labelled {label}")
+        labels.add(label)
+        unknown = set(variant) - set(SWEEP_PARAMETERS)
+        if unknown:
+            raise ValueError(
+                f"Unknown parameters {sorted(unknown)} in variant {label} "
+                f"(options: {', '.join(SWEEP_PARAMETERS)})"
+            )
+        variant = {**defaults, **variant, "label": label}
+        if variant["tracker"] not in TRACKERS:
+            raise ValueError(
+                f"Invalid tracker {variant['tracker']} in variant {label} (options: {', '.join(TRACKERS)})"
+            )
+        for name in ("di", "mcdf", "mctf"):
+            if not isinstance(variant[name], int) or variant[name] < (1 if name == "di" else 0):
+                raise ValueError(f"Invalid {name} {variant[name]} in variant {label}")
+        variant["counting_lines"] = _normalize_counting_lines(variant["counting_lines"])
+        labelled_variants.append(variant)
+    return labelled_variants
+
+
+def get_detection_frames_count(num_frames, detection_intervals):
+    """
+    Count the frames detection is run on for any of the detection intervals,
+    i.e the frames whose index is a multiple of one of them.
+    """
+    return sum(
+        1
+        for frame_index in range(num_frames)
+        if any(frame_index % interval == 0 for interval in detection_intervals)
+    )
+
+
+def get_count_errors(line_counts, ground_truth):
+    """
+    Compare the counts of each counting line ({line: count}) with the ground truth counts.
+    """
+    errors = {
+        line: line_counts.get(line, 0) - true_count
+        for line, true_count in ground_truth.items()
+    }
+    return {
+        "lines": errors,
+        "absolute_error": sum(abs(error) for error in errors.values()),
+    }
@@ -0,0 +1,203 @@
+"""
+Low overhead timing of the stages of frame processing.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+import settings
+
+
+# upper bounds (in seconds) of latency histogram buckets, from 10µs to ~10s in steps of √2
+LATENCY_BUCKETS = tuple(10e-6 * 2 ** (i / 2) for i in range(41))
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Counts of observations in fixed buckets. Percentiles are estimated as the upper bound
+    of the bucket they fall in, which is within a factor of √2 of the exact value.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket counts observations over every bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def add(self, histogram):
+        """
+        Add the observations of another histogram with the same bounds to this one.
+        """
+        # copied first as the other histogram may be observing from another thread
+        counts = list(histogram.counts)
+        for index, count in enumerate(counts):
+            self.counts[index] += count
+        self.count += sum(counts)
+        self.sum += histogram.sum
+        self.max = max(self.max, histogram.max)
+
+    def get_percentile(self, percentile, counts=None):
+        """
+        Estimate a percentile of the observations, or of the given bucket counts e.g of an interval.
+        """
+        counts = counts or self.counts
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = total * percentile / 100
+        cumulative_count = 0
+        for index, count in enumerate(counts):
+            cumulative_count += count
+            if cumulative_count >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+
+class StageTimer:
+    """
+    Latency histograms of named stages. Time a stage with
+
+        start = stage_timer.start()
+        ...
+        start = stage_timer.stop("stage", start)
+
+    where `stop` returns the time it was called so consecutive stages can be timed with one call each.
+    Disabled timers do nothing but return 0. Stages can be timed from several threads at once:
+    each thread keeps histograms of its own so timing takes no lock, and they're added up when read.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._local = threading.local()
+        # (histograms, interval maxes) of each thread that timed a stage, only updated by that thread
+        self._thread_stages = []
+        # number of summaries made, which each interval max is tagged with
+        self._interval = 0
+        # bucket counts, count and sum of each stage at the last summary
+        self._last_summary = {}
+        self._lock = threading.Lock()
+
+    def _add_thread_stages(self):
+        stages = self._local.stages = ({}, {})
+        with self._lock:
+            self._thread_stages.append(stages)
+        return stages
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0
+
+    def stop(self, stage, start):
+        if not self.enabled:
+            return 0
+        now = time.perf_counter()
+        duration = now - start
+        stages = getattr(self._local, "stages", None)
+        if stages is None:
+            stages = self._add_thread_stages()
+        histograms, interval_max = stages
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = Histogram()
+        histogram.observe(duration)
+        interval = self._interval
+        last_interval, last_max = interval_max.get(stage, (None, 0))
+        if last_interval != interval or duration > last_max:
+            interval_max[stage] = (interval, duration)
+        return now
+
+    def get_histograms(self):
+        """
+        Fetch the histogram of each stage, added up over the threads that timed it.
+        A stage being timed while it's read may be missing its latest observation.
+        """
+        with self._lock:
+            thread_stages = list(self._thread_stages)
+        merged_histograms = {}
+        for histograms, _ in thread_stages:
+            for stage, histogram in histograms.copy().items():
+                if stage not in merged_histograms:
+                    merged_histograms[stage] = Histogram(histogram.bounds)
+                merged_histograms[stage].add(histogram)
+        return merged_histograms
+
+    def get_summary(self):
+        """
+        Summarize the latency of each stage (in milliseconds) since the last summary.
+        """
+        with self._lock:
+            return self._get_summary()
+
+    def _get_summary(self):
+        histograms = {}
+        interval_max = {}
+        for thread_histograms, thread_interval_max in self._thread_stages:
+            for stage, histogram in thread_histograms.copy().items():
+                if stage not in histograms:
+                    histograms[stage] = Histogram(histogram.bounds)
+                histograms[stage].add(histogram)
+            for stage, (interval, duration) in thread_interval_max.copy().items():
+                if interval == self._interval:
+                    interval_max[stage] = max(duration, interval_max.get(stage, 0))
+        # timings of the new interval start their max over, without this thread writing to theirs
+        self._interval += 1
+        summary = {}
+        for stage, histogram in histograms.items():
+            last_counts, last_count, last_sum = self._last_summary.get(
+                stage, ([0] * len(histogram.counts), 0, 0.0)
+            )
+            count = histogram.count - last_count
+            if count == 0:
+                continue
+            counts = [now - last for now, last in zip(histogram.counts, last_counts)]
+            stage_summary = {
+                "count": count,
+                "mean_ms": round((histogram.sum - last_sum) / count * 1000, 3),
+            }
+            for percentile in PERCENTILES:
+                stage_summary[f"p{percentile}_ms"] = round(
+                    histogram.get_percentile(percentile, counts) * 1000, 3
+                )
+            stage_summary["max_ms"] = round(interval_max.get(stage, 0) * 1000, 3)
+            summary[stage] = stage_summary
+            self._last_summary[stage] = (histogram.counts, histogram.count, histogram.sum)
+        return summary
+
+
+_stage_timer = None
+_stage_timer_lock = threading.Lock()
+# stage timers of threads that time their stages apart from the rest of the process
+_thread_stage_timers = threading.local()
+
+
+def set_thread_stage_timer(stage_timer):
+    """
+    Time the stages run on the current thread with `stage_timer` instead of the process' stage timer,
+    e.g so that each camera processed on a thread of its own has latencies of its own.
+    Pass None to go back to the process' stage timer.
+    """
+    _thread_stage_timers.stage_timer = stage_timer
+
+
+def get_stage_timer():
+    """
+    Fetch the current thread's stage timer if it has one, otherwise the process' stage timer,
+    enabled by the ENABLE_STAGE_TIMERS setting.
+    """
+    global _stage_timer
+    stage_timer = getattr(_thread_stage_timers, "stage_timer", None)
+    if stage_timer is not None:
+        return stage_timer
+    if _stage_timer is None:
+        with _stage_timer_lock:
+            if _stage_timer is None:
+                _stage_timer = StageTimer(settings.ENABLE_STAGE_TIMERS)
+    return _stage_timer
@@ -0,0 +1,45 @@
+"""
+Waiting on worker processes without hanging when one of them dies.
+"""
+
+import queue
+
+# seconds between checks of whether processes are still alive
+POLL_INTERVAL = 1.0
+
+
+def raise_if_exited(processes):
+    """
+    Raise RuntimeError if any of the processes has exited, e.g when it's still expected to read frames.
+    """
+    for process in processes:
+        if process.exitcode is not None:
+            raise RuntimeError(
+                f"Process {process.name} exited unexpectedly (exit code {process.exitcode})."
+            )
+
+
+def get_results(results, workers, stages=()):
+    """
+    Wait for one result from each worker process on the `results` queue. Raise RuntimeError if a worker
+    exits without putting its result, e.g after a crash, or a stage process the workers depend on fails.
+    """
+    collected = []
+    while len(collected) < len(workers):
+        try:
+            collected.append(results.get(timeout=POLL_INTERVAL))
+            continue
+        except queue.Empty:
+            pass
+        for stage in stages:
+            if stage.exitcode not in (None, 0):
+                raise RuntimeError(
+                    f"Process {stage.name} exited unexpectedly (exit code {stage.exitcode})."
+                )
+        if sum(worker.exitcode is not None for worker in workers) > len(collected):
+            # a worker's result is in the queue by the time it has exited, unless it crashed
+            try:
+                collected.append(results.get(timeout=POLL_INTERVAL))
+            except queue.Empty:
+                raise RuntimeError("A worker process exited without its results.") from None
+    return collected
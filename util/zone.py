@@ -0,0 +1,37 @@
+"""
+Utilities for counting zones i.e polygonal areas (parking bays, waiting areas etc.)
+in which object occupancy and dwell time are measured.
+"""
+
+import numpy as np
+import cv2
+
+
+NO_ZONE = 0
+
+
+def create_zone_label_map(counting_zones, frame_size):
+    """
+    Rasterize counting zone polygons into an integer label image of the given (width, height).
+    Pixels inside the i-th zone hold i + 1, pixels outside every zone hold `NO_ZONE`.
+    Where zones overlap, the zone listed last wins.
+    """
+    f_width, f_height = frame_size
+    dtype = np.uint8 if len(counting_zones) < 255 else np.uint16
+    label_map = np.full((f_height, f_width), NO_ZONE, dtype=dtype)
+    for index, counting_zone in enumerate(counting_zones):
+        polygon = np.array([counting_zone["zone"]], dtype=np.int32)
+        cv2.fillPoly(label_map, polygon, index + 1)
+    return label_map
+
+
+def get_zone_index(label_map, point):
+    """
+    Fetch the index of the zone containing a point or None if the point is not in any zone.
+    Points outside the frame are clamped to its edges.
+    """
+    f_height, f_width = label_map.shape
+    x = min(max(int(point[0]), 0), f_width - 1)
+    y = min(max(int(point[1]), 0), f_height - 1)
+    label = label_map[y, x]
+    return None if label == NO_ZONE else int(label) - 1